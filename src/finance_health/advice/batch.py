@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..settings.config import get_config
+from ..storage.loader import scan_session
+from ..storage.report_io import advice_current, save_advice_result
+from ..storage.sessions import list_sessions
+from ..utils.logging import setup_logger
+from .graph import AdviceEngine
+
+logger = setup_logger(__name__)
+
+# Threads building prompts (Polars work, runs ahead of generation)
+BATCH_PREP_WORKERS = 4
+# Prepared prompts waiting for a generation slot; bounds how far preparation runs ahead
+BATCH_QUEUE_SIZE = 8
+BATCH_RETRIES = 2
+BATCH_BACKOFF_S = 5.0
+# Wall-clock budget per session across all attempts and backoff; no retry starts past it
+BATCH_SESSION_DEADLINE_S = 300.0
+
+_DONE = object()
+
+
+@dataclass
+class SessionOutcome:
+    session_id: str
+    status: str  # 'ok' | 'skipped' | 'no_data' | 'failed' | 'timeout'
+    attempts: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchSummary:
+    outcomes: List[SessionOutcome] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for o in self.outcomes:
+            counts[o.status] = counts.get(o.status, 0) + 1
+        return counts
+
+    def format(self) -> str:
+        generated = [o for o in self.outcomes if o.status == "ok"]
+        rate = len(generated) / self.seconds * 60 if self.seconds else 0.0
+        mean = sum(o.seconds for o in generated) / len(generated) if generated else 0.0
+        lines = [
+            f"{len(self.outcomes)} session(s) in {self.seconds:.1f}s: "
+            + ", ".join(f"{k} {v}" for k, v in sorted(self.counts().items())),
+            f"throughput {rate:.1f} sessions/min, mean generation {mean:.1f}s",
+        ]
+        lines += [f"  {o.session_id}: {o.status} after {o.attempts} attempt(s): {o.error}"
+                  for o in self.outcomes if o.status in ("failed", "timeout")]
+        return "\n".join(lines)
+
+
+def generate_batch(
+    session_ids: Sequence[str],
+    retries: int = BATCH_RETRIES,
+    force: bool = False,
+    deadline_s: float = BATCH_SESSION_DEADLINE_S,
+) -> BatchSummary:
+    """Generate and save advice for many sessions.
+
+    Prompts are built in parallel and handed to generation through a bounded queue;
+    as many generations run at once as OLLAMA_MAX_CONCURRENCY allows. Each request is
+    bounded by OLLAMA_TIMEOUT_S (utils.llm); failed attempts, including the fallback
+    text when Ollama is unreachable, are retried ``retries`` times with backoff and
+    never saved, so the next run tries the session again. A retry that could not start
+    within ``deadline_s`` of the session's first attempt is not made, so one stuck
+    session cannot hold a generation slot for the whole retry schedule.
+    Sessions whose saved advice matches their current data are skipped unless
+    ``force``, so an interrupted batch resumes by running it again.
+    """
+    started = time.perf_counter()
+    engine = AdviceEngine()
+    consumers = max(1, get_config().ollama_max_concurrency)
+    pending: "queue.Queue[Any]" = queue.Queue(maxsize=BATCH_QUEUE_SIZE)
+    outcomes: List[SessionOutcome] = []
+    lock = threading.Lock()
+
+    def record(outcome: SessionOutcome) -> None:
+        with lock:
+            outcomes.append(outcome)
+        logger.info("[%d/%d] %s: %s", len(outcomes), len(session_ids), outcome.session_id, outcome.status)
+
+    def prepare(session_id: str) -> None:
+        try:
+            if not force and advice_current(session_id):
+                record(SessionOutcome(session_id, "skipped"))
+                return
+            df = scan_session(session_id)
+            if df is None:
+                record(SessionOutcome(session_id, "no_data"))
+                return
+            hs, user_prompt = engine.build_prompt(df, session_id)
+            # The prefetch backend's tool outputs too, so generation only runs the model
+            context = engine.prefetch(session_id)
+        except Exception as e:
+            record(SessionOutcome(session_id, "failed", error=f"prepare: {e}"))
+            return
+        pending.put((session_id, df, hs, user_prompt, context))  # blocks while generation is behind
+
+    def generate() -> None:
+        while (item := pending.get()) is not _DONE:
+            session_id, df, hs, user_prompt, context = item
+            outcome = SessionOutcome(session_id, "failed")
+            t0 = time.perf_counter()
+            while outcome.attempts <= retries:
+                outcome.attempts += 1
+                try:
+                    result = engine.complete(df, session_id, hs, user_prompt, context)
+                    if result.fallback:
+                        raise RuntimeError("Ollama is not available")
+                    save_advice_result(session_id, result)
+                    outcome.status, outcome.error = "ok", None
+                    break
+                except TimeoutError as e:
+                    outcome.status, outcome.error = "timeout", str(e)
+                except Exception as e:
+                    outcome.status, outcome.error = "failed", str(e)
+                if outcome.attempts <= retries:
+                    backoff = BATCH_BACKOFF_S * outcome.attempts
+                    if time.perf_counter() - t0 + backoff >= deadline_s:
+                        outcome.error = f"{outcome.error} (session deadline {deadline_s:g}s reached)"
+                        break
+                    time.sleep(backoff)
+            outcome.seconds = time.perf_counter() - t0
+            record(outcome)
+
+    generators = [threading.Thread(target=generate, name=f"advice-gen-{i}") for i in range(consumers)]
+    for t in generators:
+        t.start()
+    with ThreadPoolExecutor(max_workers=BATCH_PREP_WORKERS) as pool:
+        list(pool.map(prepare, dict.fromkeys(session_ids)))
+    for _ in generators:
+        pending.put(_DONE)
+    for t in generators:
+        t.join()
+    return BatchSummary(outcomes=outcomes, seconds=time.perf_counter() - started)
+
+
+def _main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m finance_health.advice.batch", description="Generate advice for many sessions."
+    )
+    parser.add_argument("session_ids", nargs="*", help="sessions to process (default: all sessions)")
+    parser.add_argument("--retries", type=int, default=BATCH_RETRIES)
+    parser.add_argument("--deadline", type=float, default=BATCH_SESSION_DEADLINE_S,
+                        help="seconds per session after which no retry is started")
+    parser.add_argument("--force", action="store_true", help="regenerate advice that is already current")
+    args = parser.parse_args(argv)
+    session_ids = args.session_ids or [s.id for s in list_sessions()]
+    summary = generate_batch(session_ids, retries=args.retries, force=args.force, deadline_s=args.deadline)
+    print(summary.format())
+
+
+if __name__ == "__main__":
+    _main()
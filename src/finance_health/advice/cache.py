@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..settings.config import get_config
+from ..utils.logging import setup_logger
+from .prompts import BACKEND_PROMPTS, EXAMPLE_ASSISTANT, EXAMPLE_USER, SYSTEM_PROMPT
+
+logger = setup_logger(__name__)
+
+# Entries kept under DATA_DIR/advice_cache; the least recently used are evicted first
+ADVICE_CACHE_MAX_ENTRIES = 128
+
+
+def _cache_dir() -> Path:
+    return get_config().data_dir / "advice_cache"
+
+
+def advice_cache_key(user_prompt: str, backend: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Digest of everything that determines the advice: the summarized inputs in
+    ``user_prompt`` (for the prefetch backend, the tool outputs it is given), the prompts (including the backend's own instructions and tool
+    output format), model, backend and generation options.
+
+    The prompt holds only aggregates, so another session with identical summaries
+    shares the entry and any change in the data yields a new key.
+    """
+    cfg = get_config()
+    payload = {
+        "user_prompt": user_prompt,
+        "prompts": [SYSTEM_PROMPT, EXAMPLE_USER, EXAMPLE_ASSISTANT, *BACKEND_PROMPTS.get(backend, [])],
+        "model": cfg.ollama_model,
+        "backend": backend,
+        "options": options or {
+            "num_predict": cfg.ollama_num_predict,
+            "num_ctx": cfg.ollama_num_ctx,
+            "temperature": cfg.ollama_temperature,
+        },
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_cached_advice(key: str) -> Optional[str]:
+    """Cached advice markdown for ``key``, or None. A hit marks the entry as recently used."""
+    path = _cache_dir() / f"{key}.json"
+    try:
+        entry = json.loads(path.read_text())
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return entry.get("advice_markdown") or None
+
+
+def save_cached_advice(key: str, advice_markdown: str) -> None:
+    if not advice_markdown.strip():
+        return
+    cache_dir = _cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{key}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"model": get_config().ollama_model, "advice_markdown": advice_markdown}))
+    tmp.replace(path)
+    _evict(cache_dir)
+
+
+def _evict(cache_dir: Path) -> None:
+    entries = sorted(cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime_ns, reverse=True)
+    for stale in entries[ADVICE_CACHE_MAX_ENTRIES:]:
+        stale.unlink(missing_ok=True)
+    if len(entries) > ADVICE_CACHE_MAX_ENTRIES:
+        logger.info("Evicted %d advice cache entries", len(entries) - ADVICE_CACHE_MAX_ENTRIES)
@@ -1,15 +1,25 @@
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, Optional, Tuple
 import polars as pl
 
 from ..settings.config import get_config
-from ..analytics.metrics import compute_kpis, monthly_cashflow, category_breakdown
-from ..analytics.scoring import compute_health_score
-from ..analytics.insights import top_expense_transactions, recurring_candidates, subscription_merchants
+from ..utils.llm import get_llm
+from ..utils.prompt_builder import TableSection, fit_tables, prompt_budget
+from ..analytics.engine import compute_report_aggregates
+from ..analytics.metrics import Frame
+from ..analytics.scoring import HealthScore
+from ..storage.aggregates import scan_aggregates
+from ..analytics.insights import top_expense_transactions, subscription_merchants
+from ..analytics.anomalies import detect_anomalies
+from ..analytics.forecast import forecast_cashflow
+from ..analytics.recurring import detect_recurring
+from ..analytics.scenarios import rank_scenarios, top_scenarios
+from .cache import advice_cache_key, load_cached_advice, save_cached_advice
 from .prompts import SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
-from .sanitize import sanitize_output
+from .sanitize import StreamSanitizer, sanitize_output
 
 
 @dataclass
@@ -17,86 +27,255 @@ class AdviceResult:
     score: float
     components: dict[str, float]
     advice_markdown: str
+    fallback: bool = False  # FALLBACK_ADVICE because Ollama is not available; not worth saving
+
+
+@dataclass
+class AdviceStream:
+    score: float
+    components: dict[str, float]
+    chunks: Iterator[str]  # sanitized Markdown, in order; consuming it runs the generation
+    fallback: bool = False
+
+
+FALLBACK_ADVICE = (
+    "Ollama client not available. Install and run Ollama to get AI advice.\n\n"
+    "Quick tips:\n"
+    "- Increase savings rate by 5–10% via auto-transfers.\n"
+    "- Reduce top 2 discretionary categories by 15%.\n"
+    "- Review recurring charges and cancel unused subscriptions.\n"
+)
 
 
 class AdviceEngine:
+    # Raw columns the prompt's insight tables read; everything else comes from aggregates
+    INSIGHT_COLUMNS = ["date", "merchant", "category", "description", "amount", "amount_base", "is_transfer"]
+    ANOMALY_PROMPT_COLUMNS = ["kind", "date", "merchant", "category", "amount", "baseline"]
+    FORECAST_PROMPT_COLUMNS = ["month", "income", "expense", "net", "net_lo", "net_hi"]
+    SCENARIO_PROMPT_COLUMNS = ["scenario", "saved_monthly", "savings_rate", "score", "score_delta"]
+    RECURRING_PROMPT_COLUMNS = ["merchant", "cadence", "last_amount", "amount_drift", "monthly_cost", "next_date", "active"]
+    # Tables appended after the template, in prompt order
+    PROMPT_SECTIONS = {
+        "top_tx": "Top individual expenses",
+        "recurring": "Recurring charges",
+        "subs": "Subscriptions by merchant",
+        "anomalies": "Anomalies",
+        "forecast": "Cashflow forecast, 80% interval",
+        "scenarios": "What-if scenarios, best first",
+    }
+
     def __init__(self):
         self.cfg = get_config()
 
-    def _format_df(self, df: pl.DataFrame, limit: int = 12) -> str:
-        if df.is_empty():
-            return "<empty>"
-        # Avoid optional tabulate dependency; use CSV for compactness
-        return df.head(limit).to_pandas().to_csv(index=False)
-
-    def _direct_ollama(self, user_prompt: str, hs) -> "AdviceResult":
-        try:
-            from ollama import Client  # lazy import
-        except Exception:
-            return AdviceResult(
-                score=hs.score,
-                components=hs.components,
-                advice_markdown=(
-                    "Ollama client not available. Install and run Ollama to get AI advice.\n\n"
-                    "Quick tips:\n"
-                    "- Increase savings rate by 5–10% via auto-transfers.\n"
-                    "- Reduce top 2 discretionary categories by 15%.\n"
-                    "- Review recurring charges and cancel unused subscriptions.\n"
-                ),
-            )
-
-        client = Client(host=self.cfg.ollama_host)
-        resp = client.chat(
-            model=self.cfg.ollama_model,
-            messages=[
+    def _chat_kwargs(self, user_prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self.cfg.ollama_model,
+            "messages": [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt},
             ],
-            options={
+            "options": {
                 "num_predict": self.cfg.ollama_num_predict,
                 "num_ctx": self.cfg.ollama_num_ctx,
                 "temperature": self.cfg.ollama_temperature,
             },
-            stream=False,
-        )
+        }
+
+    def _direct_ollama(self, user_prompt: str, hs, cache_key: str | None = None) -> "AdviceResult":
+        llm = get_llm()
+        if llm is None:
+            return AdviceResult(score=hs.score, components=hs.components, advice_markdown=FALLBACK_ADVICE, fallback=True)
+
+        resp = llm.chat(**self._chat_kwargs(user_prompt), stream=False)
         advice_text = resp.get("message", {}).get("content", "").strip()
         advice_text = sanitize_output(advice_text)
+        if cache_key:
+            save_cached_advice(cache_key, advice_text)
         return AdviceResult(score=hs.score, components=hs.components, advice_markdown=advice_text)
 
-    def generate(self, df: pl.DataFrame, session_id: str | None = None) -> AdviceResult:
-        hs = compute_health_score(df)
-        cats = category_breakdown(df)
-        monthly = monthly_cashflow(df)
-        kpis = compute_kpis(df)
+    def _stream_ollama(self, user_prompt: str, cache_key: str) -> Iterator[str]:
+        cached = load_cached_advice(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        llm = get_llm()
+        if llm is None:
+            yield FALLBACK_ADVICE
+            return
+
+        sanitizer = StreamSanitizer()
+        shown = []
+        for part in llm.chat(**self._chat_kwargs(user_prompt), stream=True):
+            text = sanitizer.feed(part.get("message", {}).get("content", ""))
+            if text:
+                shown.append(text)
+                yield text
+        tail = sanitizer.finish()
+        if tail:
+            shown.append(tail)
+            yield tail
+        save_cached_advice(cache_key, "".join(shown))
+
+    def build_prompt(self, df: Frame, session_id: str | None = None) -> Tuple[HealthScore, str]:
+        """Health score and the summarized user prompt for ``df`` (no generation)."""
+        facts = scan_aggregates(session_id) if session_id else None
+        agg = compute_report_aggregates(facts if facts is not None else df)
+        hs, cats, monthly, kpis = agg.score, agg.categories, agg.monthly, agg.kpis
 
         # Build additional context for specificity
-        top_tx = top_expense_transactions(df, limit=8).to_pandas().to_csv(index=False)
-        recurr = recurring_candidates(df, min_count=2, limit=10).to_pandas().to_csv(index=False)
-        subs = subscription_merchants(df, limit=10).to_pandas().to_csv(index=False)
-
-        user_prompt = USER_PROMPT_TEMPLATE.format(
-            metrics=(
-                f"total_income: {kpis.total_income:.2f}, "
-                f"total_expense: {kpis.total_expense:.2f}, "
-                f"net_cashflow: {kpis.net_cashflow:.2f}, "
-                f"savings_rate: {kpis.savings_rate:.2f}"
+        rows = df.lazy().select(self.INSIGHT_COLUMNS).collect()
+        recurring = detect_recurring(rows)
+        forecast = forecast_cashflow(facts if facts is not None else df, recurring, horizon=3)
+        ranked = top_scenarios(rank_scenarios(agg, rows, recurring), limit=8)
+        sections = {
+            "categories": TableSection(cats, weight=2.0, max_rows=10, min_rows=3, rollup=True),
+            "monthly": TableSection(monthly, weight=2.0, max_rows=12, min_rows=3, keep="tail"),
+            "top_tx": TableSection(top_expense_transactions(rows, limit=8), max_rows=8),
+            "recurring": TableSection(recurring.select(self.RECURRING_PROMPT_COLUMNS), max_rows=10),
+            "subs": TableSection(subscription_merchants(rows, limit=10), max_rows=10, rollup=True),
+            "anomalies": TableSection(detect_anomalies(rows, limit=10).select(self.ANOMALY_PROMPT_COLUMNS), max_rows=10),
+            "forecast": TableSection(
+                forecast.select(self.FORECAST_PROMPT_COLUMNS) if not forecast.is_empty() else forecast, max_rows=3
             ),
-            categories=self._format_df(cats, limit=10),
-            monthly=self._format_df(monthly, limit=12),
-            score=hs.score,
-        ) + (
-            "\n\nTop individual expenses (CSV):\n" + top_tx +
-            "\nRecurring charge candidates (CSV):\n" + recurr +
-            "\nSubscriptions by merchant (CSV):\n" + subs
-        )
+            "scenarios": TableSection(ranked.select(self.SCENARIO_PROMPT_COLUMNS), weight=2.0, max_rows=8, min_rows=3),
+        }
 
-        if self.cfg.advice_backend == "langchain":
+        def render(tables: Dict[str, str]) -> str:
+            return USER_PROMPT_TEMPLATE.format(
+                metrics=(
+                    f"total_income: {kpis.total_income:.2f}, "
+                    f"total_expense: {kpis.total_expense:.2f}, "
+                    f"net_cashflow: {kpis.net_cashflow:.2f}, "
+                    f"savings_rate: {kpis.savings_rate:.2f}"
+                ),
+                categories=tables.get("categories", ""),
+                monthly=tables.get("monthly", ""),
+                score=hs.score,
+            ) + "\n" + "".join(
+                f"\n{title} (CSV):\n{tables.get(name, '')}" for name, title in self.PROMPT_SECTIONS.items()
+            )
+
+        # Tables share what the context window leaves after the system prompt and the reply
+        budget = prompt_budget(self.cfg.ollama_num_ctx, self.cfg.ollama_num_predict, SYSTEM_PROMPT)
+        user_prompt = render(fit_tables(sections, budget, fixed_text=render({})))
+        return hs, user_prompt
+
+    def prefetch(self, session_id: str | None) -> Optional[Dict[str, str]]:
+        """The tool outputs the prefetch backend generates from, gathered ahead of
+        complete(); None for other backends or when the agent cannot be loaded."""
+        if self.cfg.advice_backend != "prefetch" or not session_id:
+            return None
+        try:
+            from .prefetch_agent import prefetch_outputs
+        except ImportError:
+            return None
+        return prefetch_outputs(session_id)
+
+    def _cache_key(self, user_prompt: str, context: Optional[Dict[str, str]]) -> Optional[str]:
+        """Advice cache key over what the backend actually generates from, or None when
+        that is not known before generating (nothing is cached then)."""
+        backend = self.cfg.advice_backend
+        if backend == "langchain":
+            # The ReAct agent picks its own tool calls, so its inputs are only known afterwards
+            return None
+        if backend == "prefetch":
+            # The agent sees the tool outputs, not the summarized prompt
+            return advice_cache_key(json.dumps(context, sort_keys=True), backend) if context is not None else None
+        return advice_cache_key(user_prompt, backend)
+
+    def generate(self, df: Frame, session_id: str | None = None) -> AdviceResult:
+        hs, user_prompt = self.build_prompt(df, session_id)
+        return self.complete(df, session_id, hs, user_prompt)
+
+    def complete(
+        self,
+        df: Frame,
+        session_id: str | None,
+        hs: HealthScore,
+        user_prompt: str,
+        context: Optional[Dict[str, str]] = None,
+    ) -> AdviceResult:
+        """Generate advice for a prompt from build_prompt, using the advice cache and backend.
+        ``context`` is the output of prefetch() for the same session, if already gathered."""
+        if context is None:
+            context = self.prefetch(session_id)
+        # Unchanged inputs (from this or any other session) reuse the earlier generation
+        cache_key = self._cache_key(user_prompt, context)
+        cached = load_cached_advice(cache_key) if cache_key is not None else None
+        if cached is not None:
+            return AdviceResult(score=hs.score, components=hs.components, advice_markdown=cached)
+
+        if self.cfg.advice_backend in {"prefetch", "langchain"}:
             try:
-                from .langchain_agent import LangChainAdviceAgent  # lazy import to avoid hard dependency
-                agent = LangChainAdviceAgent()
-                res = agent.generate(df, session_id=session_id)
-                return AdviceResult(score=res.score, components=res.components, advice_markdown=res.advice_markdown)
+                # lazy imports to avoid a hard dependency on LangChain
+                if self.cfg.advice_backend == "prefetch":
+                    from .prefetch_agent import PrefetchAdviceAgent
+
+                    res = PrefetchAdviceAgent().generate(df, session_id=session_id, outputs=context)
+                else:
+                    from .langchain_agent import LangChainAdviceAgent
+
+                    # The ReAct agent chooses its own tool calls, so there is nothing to hand over
+                    res = LangChainAdviceAgent().generate(df, session_id=session_id)
+                if cache_key is not None:
+                    save_cached_advice(cache_key, res.advice_markdown)
+                # The score from build_prompt, so every backend reports the same one
+                return AdviceResult(score=hs.score, components=hs.components, advice_markdown=res.advice_markdown)
             except Exception:
-                return self._direct_ollama(user_prompt, hs)
+                fallback_key = advice_cache_key(user_prompt, "ollama_direct")
+                cached = load_cached_advice(fallback_key)
+                if cached is not None:
+                    return AdviceResult(score=hs.score, components=hs.components, advice_markdown=cached)
+                return self._direct_ollama(user_prompt, hs, fallback_key)
         else:
-            return self._direct_ollama(user_prompt, hs)
+            return self._direct_ollama(user_prompt, hs, cache_key)
+
+    def _stream_prefetch(
+        self, agent, session_id: str, context: Dict[str, str], user_prompt: str, cache_key: str
+    ) -> Iterator[str]:
+        cached = load_cached_advice(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        shown = []
+        try:
+            for text in agent.stream(session_id, outputs=context):
+                shown.append(text)
+                yield text
+        except Exception:
+            if shown:
+                raise
+            # As in complete(): nothing was shown yet, so the direct backend answers instead
+            yield from self._stream_ollama(user_prompt, advice_cache_key(user_prompt, "ollama_direct"))
+            return
+        save_cached_advice(cache_key, "".join(shown))
+
+    def stream(self, df: Frame, session_id: str | None = None) -> AdviceStream:
+        """Advice as sanitized chunks, for incremental display; the score is available immediately.
+
+        ``ollama_direct`` and ``prefetch`` stream tokens as they are generated. The
+        ReAct agent of the ``langchain`` backend only returns complete answers, so its
+        advice is generated here and yielded as one chunk.
+        """
+        hs, user_prompt = self.build_prompt(df, session_id)
+        if self.cfg.advice_backend == "langchain":
+            res = self.complete(df, session_id, hs, user_prompt)
+            return AdviceStream(
+                score=res.score, components=res.components, chunks=iter([res.advice_markdown]), fallback=res.fallback
+            )
+        if self.cfg.advice_backend == "prefetch" and session_id:
+            try:
+                from .prefetch_agent import PrefetchAdviceAgent, prefetch_outputs
+
+                agent = PrefetchAdviceAgent()
+            except ImportError:
+                agent = None
+            if agent is not None:
+                context = prefetch_outputs(session_id)
+                cache_key = self._cache_key(user_prompt, context)
+                chunks = self._stream_prefetch(agent, session_id, context, user_prompt, cache_key)
+                return AdviceStream(score=hs.score, components=hs.components, chunks=chunks)
+        cache_key = advice_cache_key(user_prompt, "ollama_direct")
+        if get_llm() is None and load_cached_advice(cache_key) is None:
+            return AdviceStream(score=hs.score, components=hs.components, chunks=iter([FALLBACK_ADVICE]), fallback=True)
+        return AdviceStream(score=hs.score, components=hs.components, chunks=self._stream_ollama(user_prompt, cache_key))
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
 import json
-from typing import Any
+from typing import Any, Optional
 import polars as pl
 
 from langchain_core.tools import tool
 
-from ..storage.loader import load_normalized_df
-from ..analytics.metrics import compute_kpis, monthly_cashflow, category_breakdown, top_merchants
-from ..analytics.scoring import compute_health_score as _compute_health_score
+from ..storage.aggregates import scan_aggregates
+from ..storage.loader import scan_session
+from ..analytics.engine import ReportAggregates, compute_report_aggregates
+from ..analytics.anomalies import detect_anomalies
+from ..analytics.forecast import forecast_cashflow
+from ..analytics.recurring import detect_recurring
+from ..analytics.scenarios import rank_scenarios, top_scenarios
 from ..storage.report_io import load_report, save_report
+from ..storage.session_cache import memoize
+from ..utils.prompt_builder import to_csv
+from .prompts import TOOL_DECIMALS
 
 
 def _df_to_csv(df: pl.DataFrame, limit: int | None = None) -> str:
@@ -17,14 +24,47 @@ def _df_to_csv(df: pl.DataFrame, limit: int | None = None) -> str:
         return ""
     if limit is not None:
         df = df.head(limit)
-    return df.to_pandas().to_csv(index=False)
+    return to_csv(df, decimals=TOOL_DECIMALS)
+
+
+# Raw columns the row-level tools read (amount_base and is_transfer: see analytics.metrics)
+ROW_COLUMNS = ["date", "merchant", "category", "amount", "amount_base", "is_transfer"]
+
+
+def _facts(session_id: str) -> pl.DataFrame:
+    # Materialized monthly facts; a session without data yields an empty frame (zero KPIs)
+    def load() -> pl.DataFrame:
+        facts = scan_aggregates(session_id)
+        return facts.collect() if facts is not None else pl.DataFrame()
+    return memoize(session_id, "facts", load)
+
+
+def _aggregates(session_id: str, merchant_limit: int = 10) -> ReportAggregates:
+    return memoize(
+        session_id,
+        f"aggregates:{merchant_limit}",
+        lambda: compute_report_aggregates(_facts(session_id), merchant_limit=merchant_limit),
+    )
+
+
+def _rows(session_id: str) -> Optional[pl.DataFrame]:
+    def load() -> Optional[pl.DataFrame]:
+        rows = scan_session(session_id, columns=ROW_COLUMNS)
+        return rows.collect() if rows is not None else None
+    return memoize(session_id, "rows", load)
+
+
+def _recurring(session_id: str) -> pl.DataFrame:
+    def load() -> pl.DataFrame:
+        rows = _rows(session_id)
+        return detect_recurring(rows) if rows is not None else pl.DataFrame()
+    return memoize(session_id, "recurring", load)
 
 
 @tool("get_kpis", return_direct=False)
 def get_kpis(session_id: str) -> str:
     """Return basic KPIs for the given session as JSON string with keys: total_income, total_expense, net_cashflow, savings_rate."""
-    df = load_normalized_df(session_id)
-    k = compute_kpis(df)
+    k = _aggregates(session_id).kpis
     return json.dumps({
         "total_income": k.total_income,
         "total_expense": k.total_expense,
@@ -36,8 +76,7 @@ def get_kpis(session_id: str) -> str:
 @tool("get_monthly_cashflow_csv", return_direct=False)
 def get_monthly_cashflow_csv(session_id: str, months: int = 12) -> str:
     """Return monthly cashflow table as CSV with columns: month, income, expense, net."""
-    df = load_normalized_df(session_id)
-    m = monthly_cashflow(df)
+    m = _aggregates(session_id).monthly
     if months:
         m = m.tail(months)
     return _df_to_csv(m)
@@ -46,8 +85,7 @@ def get_monthly_cashflow_csv(session_id: str, months: int = 12) -> str:
 @tool("get_top_categories_csv", return_direct=False)
 def get_top_categories_csv(session_id: str, limit: int = 10) -> str:
     """Return top categories/merchants by spend as CSV with columns: category_or_merchant, spend."""
-    df = load_normalized_df(session_id)
-    c = category_breakdown(df)
+    c = _aggregates(session_id).categories
     if limit:
         c = c.head(limit)
     return _df_to_csv(c)
@@ -56,16 +94,58 @@ def get_top_categories_csv(session_id: str, limit: int = 10) -> str:
 @tool("get_top_merchants_csv", return_direct=False)
 def get_top_merchants_csv(session_id: str, limit: int = 10) -> str:
     """Return top merchants by spend as CSV with columns: merchant, spend, tx_count."""
-    df = load_normalized_df(session_id)
-    t = top_merchants(df, limit=limit)
+    t = _aggregates(session_id, merchant_limit=limit).merchants
     return _df_to_csv(t)
 
 
+@tool("get_recurring_charges_csv", return_direct=False)
+def get_recurring_charges_csv(session_id: str, limit: int = 10) -> str:
+    """Return detected recurring charges as CSV with columns: merchant, cadence, last_amount, amount_drift, monthly_cost, next_date, active."""
+    if _rows(session_id) is None:
+        return ""
+    r = _recurring(session_id).select([
+        "merchant", "cadence", "last_amount", "amount_drift", "monthly_cost", "next_date", "active",
+    ])
+    return _df_to_csv(r, limit=limit)
+
+
+@tool("get_anomalies_csv", return_direct=False)
+def get_anomalies_csv(session_id: str, limit: int = 10) -> str:
+    """Return flagged anomalies (unusual charges, large new merchants, category and fee spikes) as CSV with columns: kind, date, merchant, category, amount, baseline."""
+    rows = _rows(session_id)
+    if rows is None:
+        return ""
+    a = memoize(session_id, f"anomalies:{limit}", lambda: detect_anomalies(rows, limit=limit))
+    return _df_to_csv(a.select(["kind", "date", "merchant", "category", "amount", "baseline"]))
+
+
+@tool("get_cashflow_forecast_csv", return_direct=False)
+def get_cashflow_forecast_csv(session_id: str, months: int = 3) -> str:
+    """Return projected monthly cashflow as CSV with columns: month, income, expense, net, net_lo, net_hi (80% interval)."""
+    if _rows(session_id) is None:
+        return ""
+    f = forecast_cashflow(_facts(session_id), _recurring(session_id), horizon=max(1, min(months, 6)))
+    if f.is_empty():
+        return ""
+    return _df_to_csv(f.select(["month", "income", "expense", "net", "net_lo", "net_hi"]))
+
+
+@tool("get_scenarios_csv", return_direct=False)
+def get_scenarios_csv(session_id: str, limit: int = 8) -> str:
+    """Return what-if savings scenarios (category cuts, merchant cuts, cancelled subscriptions), best first, as CSV with columns: scenario, saved_monthly, savings_rate, score, score_delta."""
+    rows = _rows(session_id)
+    if rows is None:
+        return ""
+    ranked = memoize(
+        session_id, "scenarios", lambda: rank_scenarios(_aggregates(session_id), rows, _recurring(session_id))
+    )
+    return _df_to_csv(top_scenarios(ranked, limit=limit).select(["scenario", "saved_monthly", "savings_rate", "score", "score_delta"]))
+
+
 @tool("compute_health_score", return_direct=False)
 def compute_health_score(session_id: str) -> str:
     """Compute overall health score and return JSON with keys: score and components."""
-    df = load_normalized_df(session_id)
-    hs = _compute_health_score(df)
+    hs = _aggregates(session_id).score
     return json.dumps({"score": hs.score, "components": hs.components})
 
 
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import polars as pl
+from pydantic import ValidationError
+from rapidfuzz import fuzz, process
+
+from ..analytics.query import QuerySpec, run_query
+from ..parsing.interfaces import CATEGORIES
+from ..settings.config import get_config
+from ..utils.llm import get_llm
+from ..utils.logging import setup_logger
+from ..utils.text import normalized_key
+
+logger = setup_logger(__name__)
+
+# Translations kept in DATA_DIR/query_cache.json; the least recently used are evicted first
+QUERY_CACHE_MAX_ENTRIES = 512
+# token_sort_ratio a cached question needs to be reused for a differently worded one
+QUERY_MATCH_THRESHOLD = 90
+# Differing words must be near-spellings of each other (typos), never other names or numbers
+QUERY_TYPO_RATIO = 80
+# Model replies that failed validation are sent back once with the error
+QUERY_TRANSLATE_ATTEMPTS = 2
+
+# Words that do not change what is asked; dropped before matching
+_FILLER = {
+    "a", "an", "the", "please", "my", "me", "i", "we", "our", "can", "could", "you", "tell", "show",
+    "give", "what", "whats", "was", "is", "were", "are", "did", "do", "does", "have", "has", "at", "on",
+    "to", "for", "of", "in", "during", "there", "with",
+}
+
+QUERY_SYSTEM_PROMPT = (
+    "You translate questions about a person's bank transactions into a JSON query spec. "
+    "Reply with one JSON object only, using only these fields (omit fields you do not need):\n"
+    "- measure: 'spending' (money out, reported positive), 'income' (money in) or 'net' (in minus out)\n"
+    "- aggregate: 'sum' (how much), 'count' (how many), 'mean' (average), 'min' or 'max'\n"
+    "- merchants: merchant or payee names from the question, as written (e.g. [\"uber\"])\n"
+    f"- categories: any of {', '.join(CATEGORIES)}\n"
+    "- accounts: account names from the question\n"
+    "- min_amount / max_amount: bounds on the size of single transactions\n"
+    "- month (1-12) and year: a calendar month or year; give year only if the question names one\n"
+    "- period: this_month, last_month, last_3_months, last_6_months, last_12_months, this_year or last_year\n"
+    "- start / end: explicit ISO dates (YYYY-MM-DD), only when the question gives exact dates\n"
+    "- group_by: up to two of month, year, weekday, category, merchant, account (for 'per'/'by'/'each'/'top')\n"
+    "- limit: rows to return for grouped results (1-100)\n"
+    "Never combine period with month, year, start or end."
+)
+
+QUERY_EXAMPLES = [
+    ("How much did I spend on Uber in March?", {"merchants": ["uber"], "month": 3}),
+    ("Top 5 merchants by spending last year", {"group_by": ["merchant"], "limit": 5, "period": "last_year"}),
+    ("How many grocery purchases over $100 per month?",
+     {"aggregate": "count", "categories": ["groceries"], "min_amount": 100, "group_by": ["month"]}),
+]
+
+
+@dataclass(frozen=True)
+class Translation:
+    spec: QuerySpec
+    source: str  # 'cache' | 'similar' | 'model'
+    matched: Optional[str] = None  # the cached question that was reused
+
+
+@dataclass(frozen=True)
+class QueryAnswer:
+    question: str
+    translation: Translation
+    result: pl.DataFrame
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase words without punctuation or filler, e.g. 'How much did I spend on Uber?'
+    -> 'how much spend uber'."""
+    return " ".join(w for w in normalized_key(question).split() if w not in _FILLER)
+
+
+def _typos_only(a: str, b: str) -> bool:
+    # Every word that differs must be a misspelling of a word on the other side
+    wa, wb = set(a.split()), set(b.split())
+    for words, other in ((wa - wb, wb), (wb - wa, wa)):
+        for w in words:
+            if any(c.isdigit() for c in w):
+                return False
+            if not any(fuzz.ratio(w, o) >= QUERY_TYPO_RATIO for o in other):
+                return False
+    return True
+
+
+class _TranslationCache:
+    """Question -> spec, persisted as one JSON file and held in memory."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def lookup(self, key: str, model: str) -> Optional[Translation]:
+        with self._lock:
+            entries = {k: e for k, e in self._load().items() if e.get("model") == model}
+            matched = key if key in entries else None
+            source = "cache"
+            if matched is None and entries:
+                best = process.extractOne(
+                    key, list(entries), scorer=fuzz.token_sort_ratio, score_cutoff=QUERY_MATCH_THRESHOLD
+                )
+                if best is not None and _typos_only(key, best[0]):
+                    matched, source = best[0], "similar"
+            if matched is None:
+                return None
+            entry = entries[matched]
+            # Persisted, so eviction follows use across restarts and not just insertion
+            entry["used"] = time.time()
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("Could not update %s: %s", self.path, e)
+        try:
+            spec = QuerySpec.model_validate(entry["spec"])
+        except ValidationError:
+            return None  # written by an older spec version
+        return Translation(spec=spec, source=source, matched=entry.get("question"))
+
+    def store(self, key: str, question: str, model: str, spec: QuerySpec) -> None:
+        with self._lock:
+            entries = self._load()
+            entries[key] = {
+                "question": question,
+                "model": model,
+                "spec": spec.model_dump(mode="json", exclude_defaults=True),
+                "used": time.time(),
+            }
+            for stale in sorted(entries, key=lambda k: entries[k].get("used", 0))[:-QUERY_CACHE_MAX_ENTRIES]:
+                del entries[stale]
+            self._save()
+
+    def _save(self) -> None:
+        # Called with the lock held
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._load()))
+        tmp.replace(self.path)
+
+
+_caches: Dict[Path, _TranslationCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _cache() -> _TranslationCache:
+    path = get_config().data_dir / "query_cache.json"
+    with _caches_lock:
+        return _caches.setdefault(path, _TranslationCache(path))
+
+
+def _messages(question: str) -> list[Dict[str, str]]:
+    messages = [{"role": "system", "content": QUERY_SYSTEM_PROMPT}]
+    for q, spec in QUERY_EXAMPLES:
+        messages.append({"role": "user", "content": q})
+        messages.append({"role": "assistant", "content": json.dumps(spec)})
+    messages.append({"role": "user", "content": question})
+    return messages
+
+
+def translate_question(question: str) -> Translation:
+    """Query spec for ``question``: from the cache when the same (or the same up to filler
+    words, word order and typos) question was translated before, else from the model.
+
+    Raises ValueError when the model is unavailable or gives no valid spec.
+    """
+    cfg = get_config()
+    key = normalize_question(question)
+    if not key:
+        raise ValueError("Ask a question about your transactions.")
+    cache = _cache()
+    cached = cache.lookup(key, cfg.ollama_model)
+    if cached is not None:
+        logger.info("Query translation from %s: %r -> %r", cached.source, question, cached.matched)
+        return cached
+
+    llm = get_llm()
+    if llm is None:
+        raise ValueError("Ollama is not available to translate the question.")
+    messages = _messages(question)
+    options = {"temperature": 0, "num_ctx": cfg.ollama_num_ctx, "num_predict": 256}
+    error: Exception | None = None
+    for _ in range(QUERY_TRANSLATE_ATTEMPTS):
+        resp = llm.chat(model=cfg.ollama_model, messages=messages, options=options, format="json")
+        content = resp.get("message", {}).get("content", "")
+        try:
+            spec = QuerySpec.model_validate_json(content)
+        except ValidationError as e:
+            error = e
+            messages += [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": f"That spec is invalid: {e}. Reply with a corrected JSON object."},
+            ]
+            continue
+        cache.store(key, question, cfg.ollama_model, spec)
+        return Translation(spec=spec, source="model")
+    raise ValueError(f"Could not translate the question: {error}")
+
+
+def answer_question(session_id: str, question: str) -> QueryAnswer:
+    """Translate ``question`` and run it over the session's transactions."""
+    translation = translate_question(question)
+    return QueryAnswer(question=question, translation=translation, result=run_query(session_id, translation.spec))
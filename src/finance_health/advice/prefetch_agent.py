@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+
+from ..settings.config import get_config
+from ..analytics.metrics import Frame
+from ..utils.llm import get_llm
+from ..utils.logging import setup_logger
+from .langchain_agent import LangChainAdviceResult
+from .langchain_tools import (
+    get_kpis,
+    get_monthly_cashflow_csv,
+    get_top_categories_csv,
+    get_top_merchants_csv,
+    get_recurring_charges_csv,
+    get_anomalies_csv,
+    get_cashflow_forecast_csv,
+    get_scenarios_csv,
+    compute_health_score,
+)
+from .prompts import PREFETCH_INSTRUCTIONS, PREFETCH_SECTION_TEMPLATE, SYSTEM_PROMPT
+from .sanitize import StreamSanitizer, sanitize_output
+
+logger = setup_logger(__name__)
+
+# Every data tool is run up front with its default arguments
+DATA_TOOLS = [
+    get_kpis,
+    compute_health_score,
+    get_monthly_cashflow_csv,
+    get_top_categories_csv,
+    get_top_merchants_csv,
+    get_recurring_charges_csv,
+    get_anomalies_csv,
+    get_cashflow_forecast_csv,
+    get_scenarios_csv,
+]
+PREFETCH_WORKERS = 4
+# Generations that may request extra tool calls before the answer must be written
+MAX_TOOL_ROUNDS = 2
+
+
+def prefetch_outputs(session_id: str) -> Dict[str, str]:
+    """Output of every data tool for the session, keyed by tool name."""
+    with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as pool:
+        futures = {t.name: pool.submit(t.invoke, {"session_id": session_id}) for t in DATA_TOOLS}
+    outputs = {}
+    for name, future in futures.items():
+        try:
+            outputs[name] = str(future.result())
+        except Exception as e:
+            logger.warning("Prefetch of %s failed: %s", name, e)
+            outputs[name] = f"<unavailable: {e}>"
+    return outputs
+
+
+class PrefetchAdviceAgent:
+    """Advice from a single generation over prefetched tool outputs.
+
+    All data tools run concurrently before the model is called (they share the session
+    cache, so the data is read once) and their outputs are injected as one context
+    block. Tool calling stays available for anything outside that set, bounded by
+    MAX_TOOL_ROUNDS. Every generation is streamed, so stream() shows the answer as it
+    is written and generate() returns the same text.
+    """
+
+    def __init__(self):
+        self.cfg = get_config()
+        self.gateway = get_llm()
+        if self.gateway is None:
+            raise ImportError("Ollama is not installed. Install or set ADVICE_BACKEND=ollama_direct.")
+        self.llm = self.gateway.chat_model(
+            self.cfg.ollama_model,
+            num_predict=self.cfg.ollama_num_predict,
+            num_ctx=self.cfg.ollama_num_ctx,
+            temperature=self.cfg.ollama_temperature,
+        )
+        self.tools = {t.name: t for t in DATA_TOOLS}
+
+    def _stream(self, llm, messages: list) -> Iterator:
+        # Under the gateway's slot for the model, so agents and direct calls share the limit
+        with self.gateway.slot(self.cfg.ollama_model) as meta:
+            msg = None
+            for chunk in llm.stream(messages):
+                msg = chunk if msg is None else msg + chunk
+                yield chunk
+            meta.update(getattr(msg, "response_metadata", None) or {})
+
+    def _answer(self, messages: list) -> Iterator[str]:
+        """Raw answer text as it is generated, after at most MAX_TOOL_ROUNDS of tool calls."""
+        llm = self.llm.bind_tools(list(self.tools.values()))
+        for _ in range(MAX_TOOL_ROUNDS):
+            msg = None
+            try:
+                for chunk in self._stream(llm, messages):
+                    msg = chunk if msg is None else msg + chunk
+                    if chunk.content:
+                        yield chunk.content
+            except Exception as e:
+                if msg is not None:
+                    raise
+                # Models without tool support (e.g. reasoning models) answer from the context alone
+                logger.info("Tool calling unavailable (%s); generating without tools", e)
+                break
+            if msg is None or not msg.tool_calls:
+                return
+            messages.append(msg)
+            for call in msg.tool_calls:
+                tool = self.tools.get(call["name"])
+                result = tool.invoke(call["args"]) if tool else f"Unknown tool: {call['name']}"
+                messages.append(ToolMessage(content=str(result), tool_call_id=call["id"]))
+        for chunk in self._stream(self.llm, messages):
+            if chunk.content:
+                yield chunk.content
+
+    def _prompt(self, session_id: str | None, outputs: Optional[Dict[str, str]]) -> Tuple[dict, list]:
+        if not session_id:
+            raise ValueError("Prefetched advice needs a session_id")
+        if outputs is None:
+            outputs = prefetch_outputs(session_id)
+        try:
+            parsed = json.loads(outputs["compute_health_score"])
+            score = {"score": float(parsed["score"]), "components": dict(parsed["components"])}
+        except (ValueError, KeyError, TypeError):
+            # Unavailable or malformed tool output (e.g. a JSON list or missing keys)
+            score = {"score": 0.0, "components": {}}
+        context = "\n\n".join(
+            PREFETCH_SECTION_TEMPLATE.format(name=name, output=out or "<empty>") for name, out in outputs.items()
+        )
+        messages = [
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(content=f"Session ID: {session_id}\n\n{PREFETCH_INSTRUCTIONS}\n\n{context}"),
+        ]
+        return score, messages
+
+    def generate(
+        self, df: Frame, session_id: str | None = None, outputs: Optional[Dict[str, str]] = None
+    ) -> LangChainAdviceResult:
+        """Advice for the session; ``outputs`` from prefetch_outputs, when gathered ahead
+        of time (advice.batch does so while the model is busy), skips the prefetch."""
+        score, messages = self._prompt(session_id, outputs)
+        content = sanitize_output("".join(self._answer(messages)))
+        return LangChainAdviceResult(score=score["score"], components=score["components"], advice_markdown=content)
+
+    def stream(self, session_id: str | None, outputs: Optional[Dict[str, str]] = None) -> Iterator[str]:
+        """The advice of generate() as sanitized chunks, yielded as the model writes them."""
+        _, messages = self._prompt(session_id, outputs)
+        sanitizer = StreamSanitizer()
+        for text in self._answer(messages):
+            text = sanitizer.feed(text)
+            if text:
+                yield text
+        tail = sanitizer.finish()
+        if tail:
+            yield tail
@@ -4,9 +4,9 @@ SYSTEM_PROMPT = (
     "Format with these sections: \n"
     "## At a glance (1-2 bullets)\n"
     "## Key insights (3-6 bullets, quantified)\n"
-    "## Opportunities (prioritized, bullets with $ impact)\n"
+    "## Opportunities (prioritized, bullets with $ impact; take amounts from the What-if scenarios table)\n"
     "## Actions this month (checklist)\n"
-    "## Watchouts (fees/anomalies if any)."
+    "## Watchouts (fees/anomalies if any; use the Anomalies table, do not invent any)."
 )
 
 USER_PROMPT_TEMPLATE = (
@@ -30,10 +30,17 @@ EXAMPLE_USER = (
     "\nHealth score: 68.0\n\n"
     "Top individual expenses (CSV):\n"
     "date,merchant,description,amount\n2025-01-03,rent january,Rent - January,-2200\n2025-01-05,whole foods,Groceries: Whole Foods,-180.45\n2025-01-07,spotify,Spotify Subscription,-9.99\n"
-    "\nRecurring charge candidates (CSV):\n"
-    "merchant,abs_amount,count,first_date,last_date\nspotify,9.99,3,2024-11-07,2025-01-07\n"
+    "\nRecurring charges (CSV):\n"
+    "merchant,cadence,last_amount,amount_drift,monthly_cost,next_date,active\nspotify,monthly,9.99,0.0,9.99,2025-02-07,true\n"
     "\nSubscriptions by merchant (CSV):\n"
     "merchant,spend,tx_count\nspotify,29.97,3\n"
+    "\nAnomalies (CSV):\n"
+    "kind,date,merchant,category,amount,baseline\nfee_spike,2025-01-01,,fees,45.0,5.0\n"
+    "\nCashflow forecast, 80% interval (CSV):\n"
+    "month,income,expense,net,net_lo,net_hi\n2025-02-01,6200,4150,2050,1400,2700\n"
+    "\nWhat-if scenarios, best first (CSV):\n"
+    "scenario,saved_monthly,savings_rate,score,score_delta\n"
+    "Cut rent_mortgage 10%,220.0,0.3742,70.6,2.6\nCut groceries 15%,27.07,0.3431,68.4,0.4\nCancel spotify (monthly),9.99,0.3403,68.1,0.1\n"
 )
 
 EXAMPLE_ASSISTANT = (
@@ -54,5 +61,33 @@ EXAMPLE_ASSISTANT = (
     "- [ ] Audit subscriptions; keep a single music service or pause 3 months\n"
     "- [ ] Plan a 2-week grocery list with lower-cost swaps\n\n"
     "## Watchouts\n"
-    "- Watch for new or increased utility fees in the next bill cycle\n"
+    "- Bank fees jumped to $45 in January vs ~$5 usual; ask for a refund and check for overdrafts\n"
 )
+
+# Agent backends (advice.prefetch_agent, advice.langchain_agent). Their advice is cached
+# under keys that include this text (advice.cache), so editing it invalidates the cache.
+PREFETCH_INSTRUCTIONS = (
+    "The output of every data tool, with default arguments, is included below. "
+    "Write the advice from it directly. Call a tool only for data that is not shown "
+    "(e.g. more months or rows than included)."
+)
+PREFETCH_SECTION_TEMPLATE = "### {name}\n{output}"
+
+AGENT_SYSTEM_PROMPT = (
+    "You are a local financial health advisor. You can call tools to retrieve metrics. "
+    "Output ONLY the final answer in clean Markdown, no chain-of-thought. Format sections: At a glance, Key insights, Opportunities (from the scenarios tool), Actions this month, Watchouts (from the anomalies tool)."
+)
+
+AGENT_INSTRUCTIONS = (
+    "Given a session_id, call tools to fetch KPIs, monthly cashflow, categories, merchants, recurring charges, anomalies, the cashflow forecast and what-if scenarios. "
+    "Then write a short prioritized advice section tailored to the data. "
+    "When finished, call save_advice to persist the recommendation."
+)
+
+# Decimals kept in tool output, as in the advice prompt tables
+TOOL_DECIMALS = 2
+
+BACKEND_PROMPTS = {
+    "prefetch": [PREFETCH_INSTRUCTIONS, PREFETCH_SECTION_TEMPLATE, f"tool_decimals={TOOL_DECIMALS}"],
+    "langchain": [AGENT_SYSTEM_PROMPT, AGENT_INSTRUCTIONS, f"tool_decimals={TOOL_DECIMALS}"],
+}
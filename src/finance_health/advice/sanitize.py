@@ -3,16 +3,103 @@ from __future__ import annotations
 import re
 
 
-_THINK_RE = re.compile(r"<think>[\s\S]*?</think>", re.IGNORECASE)
-_XML_TAG_RE = re.compile(r"</?\w+[^>]*>")
+# Longest tag body held back while waiting for a '<' to turn out to be a tag or not
+_MAX_TAG_LEN = 256
+# An unclosed <think> (e.g. a reply cut off by num_predict) hides everything after it
+_THINK_OPEN_RE = re.compile(r"<think>", re.IGNORECASE)
+_THINK_CLOSE_RE = re.compile(r"</think>", re.IGNORECASE)
+# A tag never spans '<' or a line break, so "fees <10 a month.\n<think>" is not one tag
+_XML_TAG_RE = re.compile(r"</?\w[^<>\n]{0,%d}>" % _MAX_TAG_LEN)
+# Text that can still turn into a tag once more of the stream arrives
+_TAG_PREFIX_RE = re.compile(r"</?(?:\w[^<>\n]{0,%d})?\Z" % _MAX_TAG_LEN)
+_BLANK_LINES_RE = re.compile(r"\n\n\n+")
+
+
+def _collapse(text: str) -> str:
+    return _BLANK_LINES_RE.sub("\n\n", text)
 
 
 def sanitize_output(text: str) -> str:
+    """Model reply without <think> spans, xml-like tags, runs of blank lines or outer whitespace."""
     if not text:
         return ""
-    cleaned = _THINK_RE.sub("", text)
-    # strip generic xml-like tags, including stray <think>
-    cleaned = _XML_TAG_RE.sub("", cleaned)
-    # collapse excessive blank lines
-    cleaned = re.sub(r"\n\n\n+", "\n\n", cleaned).strip()
-    return cleaned
+    # One pass of the streaming sanitizer, so streamed and batch advice read the same
+    sanitizer = StreamSanitizer()
+    return sanitizer.feed(text) + sanitizer.finish()
+
+
+class StreamSanitizer:
+    """Incremental sanitize_output for streamed text.
+
+    ``feed`` takes each chunk and returns the part that is safe to show: <think> spans
+    and tags are dropped as soon as they are recognized, and only a possible partial
+    tag or a trailing run of whitespace is held back. ``finish`` flushes the rest.
+    Text is scanned left to right and nothing is decided until it can no longer change,
+    so the output does not depend on where the chunks split.
+    """
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._in_think = False
+        self._whitespace = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        self._pending += chunk or ""
+        return self._emit(self._drain(final=False))
+
+    def finish(self) -> str:
+        text = self._drain(final=True)
+        out = self._emit(text)
+        # Trailing whitespace is dropped, as strip() does
+        self._whitespace = ""
+        return out
+
+    def _drain(self, final: bool) -> str:
+        out = []
+        while self._pending:
+            if self._in_think:
+                close = _THINK_CLOSE_RE.search(self._pending)
+                if close is None:
+                    # Keep just enough to recognize a close tag split across chunks
+                    self._pending = "" if final else self._pending[-(len("</think>") - 1):]
+                    break
+                self._pending = self._pending[close.end():]
+                self._in_think = False
+                continue
+            start = self._pending.find("<")
+            if start < 0:
+                out.append(self._pending)
+                self._pending = ""
+                break
+            out.append(self._pending[:start])
+            rest = self._pending[start:]
+            # <think> first: the generic tag pattern would drop only the open tag
+            think = _THINK_OPEN_RE.match(rest)
+            if think:
+                self._in_think = True
+                self._pending = rest[think.end():]
+                continue
+            tag = _XML_TAG_RE.match(rest)
+            if tag:
+                self._pending = rest[tag.end():]
+                continue
+            if not final and _TAG_PREFIX_RE.match(rest):
+                self._pending = rest
+                break
+            out.append("<")
+            self._pending = rest[1:]
+        return "".join(out)
+
+    def _emit(self, text: str) -> str:
+        if not text:
+            return ""
+        body = text.rstrip()
+        if not body:
+            if self._started:
+                self._whitespace += text
+            return ""
+        lead = self._whitespace + text[: len(text) - len(text.lstrip())] if self._started else ""
+        self._whitespace = text[len(body):]
+        self._started = True
+        return _collapse(lead) + _collapse(body.lstrip())
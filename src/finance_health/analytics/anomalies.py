@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import polars as pl
+
+from .metrics import Frame, amount_expr, cashflow_rows
+
+# Per-merchant charges are compared with the rolling median/MAD of that merchant's
+# previous MERCHANT_WINDOW charges (robust z-score, 1.4826 scales MAD to a std dev)
+MERCHANT_WINDOW = 12
+MERCHANT_MIN_HISTORY = 3
+ROBUST_Z = 3.5
+MAD_SCALE = 1.4826
+# MAD is zero for fixed-price charges; never let the spread fall below this share of the median
+MIN_SPREAD_RATIO = 0.05
+MIN_EXCESS = 20.0
+# A first charge at a merchant is "large" above this quantile of all charges, once the
+# history is older than NEW_MERCHANT_GRACE_DAYS (early on every merchant is new)
+NEW_MERCHANT_QUANTILE = 0.95
+NEW_MERCHANT_GRACE_DAYS = 30
+# Category-month spend vs the category's other months
+CATEGORY_Z = 2.5
+CATEGORY_MIN_MONTHS = 4
+# Monthly fees above FEE_SPIKE_RATIO x their trailing median (and by at least MIN_FEE_EXCESS)
+FEE_CATEGORY = "fees"
+FEE_SPIKE_RATIO = 2.0
+MIN_FEE_EXCESS = 10.0
+
+ANOMALY_COLUMNS = ["kind", "date", "merchant", "category", "amount", "baseline", "score"]
+
+
+def _transaction_anomalies(lf: pl.LazyFrame, has_category: bool) -> pl.LazyFrame:
+    def trailing_median(col: str) -> pl.Expr:
+        # Median of the merchant's previous charges only, so a charge never masks itself
+        return (
+            pl.col(col).shift()
+            .rolling_median(window_size=MERCHANT_WINDOW, min_samples=MERCHANT_MIN_HISTORY)
+            .over("merchant")
+        )
+
+    charges = (
+        lf.filter((pl.col("amount") < 0) & pl.col("merchant").is_not_null() & pl.col("date").is_not_null())
+        .select([
+            pl.col("date"),
+            pl.col("merchant"),
+            (pl.col("category").cast(pl.String) if has_category else pl.lit(None, dtype=pl.String)).alias("category"),
+            (-pl.col("amount")).alias("charge"),
+        ])
+        .sort(["merchant", "date"])
+        .with_columns([
+            trailing_median("charge").alias("_median"),
+            pl.int_range(pl.len()).over("merchant").alias("_seen"),
+            pl.col("charge").quantile(NEW_MERCHANT_QUANTILE).alias("_large"),
+            pl.col("date").min().alias("_start"),
+        ])
+        .with_columns((pl.col("charge") - pl.col("_median")).abs().alias("_dev"))
+        .with_columns(trailing_median("_dev").alias("_mad"))
+        .with_columns(
+            pl.max_horizontal(pl.col("_mad") * MAD_SCALE, pl.col("_median") * MIN_SPREAD_RATIO).alias("_spread")
+        )
+        .with_columns(((pl.col("charge") - pl.col("_median")) / pl.col("_spread")).alias("_z"))
+    )
+    unusual = (pl.col("_z") > ROBUST_Z) & (pl.col("charge") - pl.col("_median") >= MIN_EXCESS)
+    new_large = (
+        (pl.col("_seen") == 0)
+        & (pl.col("charge") > pl.col("_large"))
+        & ((pl.col("date") - pl.col("_start")).dt.total_days() > NEW_MERCHANT_GRACE_DAYS)
+    )
+    return (
+        charges.filter(unusual | new_large)
+        .select([
+            pl.when(unusual).then(pl.lit("unusual_charge")).otherwise(pl.lit("new_merchant_large")).alias("kind"),
+            pl.col("date"),
+            pl.col("merchant").cast(pl.String),
+            pl.col("category"),
+            pl.col("charge").alias("amount"),
+            pl.when(unusual).then(pl.col("_median")).otherwise(pl.col("_large")).alias("baseline"),
+            pl.when(unusual).then(pl.col("_z")).otherwise(pl.col("charge") / pl.col("_large")).alias("score"),
+        ])
+    )
+
+
+def _category_anomalies(lf: pl.LazyFrame) -> pl.LazyFrame:
+    monthly = (
+        lf.filter((pl.col("amount") < 0) & pl.col("category").is_not_null() & pl.col("date").is_not_null())
+        .group_by([pl.col("category").cast(pl.String), pl.col("date").dt.truncate("1mo").alias("date")])
+        .agg((-pl.col("amount")).sum().alias("amount"))
+        .sort(["category", "date"])
+    )
+    # z-score of each month against the category's other months
+    others_n = pl.len().over("category") - 1
+    others_mean = (pl.col("amount").sum().over("category") - pl.col("amount")) / others_n
+    others_sq = ((pl.col("amount") ** 2).sum().over("category") - pl.col("amount") ** 2) / others_n
+    others_std = (others_sq - others_mean ** 2).clip(lower_bound=0).sqrt()
+    trailing = pl.col("amount").shift().rolling_median(window_size=6, min_samples=2).over("category")
+    scored = monthly.with_columns([
+        others_n.alias("_n"),
+        others_mean.alias("_mean"),
+        pl.max_horizontal(others_std, others_mean * MIN_SPREAD_RATIO).alias("_std"),
+        trailing.alias("_trailing"),
+    ]).with_columns(((pl.col("amount") - pl.col("_mean")) / pl.col("_std")).alias("_z"))
+    fee_spike = (
+        (pl.col("category") == FEE_CATEGORY)
+        & (pl.col("amount") > pl.col("_trailing") * FEE_SPIKE_RATIO)
+        & (pl.col("amount") - pl.col("_trailing") >= MIN_FEE_EXCESS)
+    )
+    spike = (pl.col("_n") >= CATEGORY_MIN_MONTHS - 1) & (pl.col("_z") > CATEGORY_Z)
+    return (
+        scored.filter(fee_spike | spike)
+        .select([
+            pl.when(fee_spike).then(pl.lit("fee_spike")).otherwise(pl.lit("category_spike")).alias("kind"),
+            pl.col("date"),
+            pl.lit(None, dtype=pl.String).alias("merchant"),
+            pl.col("category"),
+            pl.col("amount"),
+            pl.when(fee_spike).then(pl.col("_trailing")).otherwise(pl.col("_mean")).alias("baseline"),
+            pl.when(fee_spike).then(pl.col("amount") / pl.col("_trailing")).otherwise(pl.col("_z")).alias("score"),
+        ])
+    )
+
+
+def detect_anomalies(df: Frame, limit: int = 50) -> pl.DataFrame:
+    """Unusual charges, large first charges at new merchants, and category/fee spikes.
+
+    Rows are (kind, date, merchant, category, amount, baseline, score); category rows
+    are per month (date is the month start, merchant null). Both checks are built on
+    one lazy scan and collected together, so the input is read once. Matched transfers
+    are left out and amounts are in the base currency.
+    """
+    names = df.lazy().collect_schema().names()
+    if "merchant" not in names:
+        return pl.DataFrame()
+    has_category = "category" in names
+    lf = cashflow_rows(df).with_columns(amount_expr(df))
+    queries = [_transaction_anomalies(lf, has_category)]
+    if has_category:
+        queries.append(_category_anomalies(lf))
+    frames = pl.collect_all(queries)
+    return (
+        pl.concat(frames, how="vertical_relaxed")
+        .with_columns([pl.col("baseline").round(2), pl.col("score").round(2), pl.col("amount").round(2)])
+        .sort(["score", "date"], descending=[True, True])
+        .select(ANOMALY_COLUMNS)
+        .head(limit)
+    )
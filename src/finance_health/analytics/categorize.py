@@ -7,27 +7,13 @@ from pathlib import Path
 
 import polars as pl
 
+from ..parsing.interfaces import CATEGORIES, category_expr
 from ..settings.config import get_config
+from ..utils.llm import get_llm
 from ..utils.logging import setup_logger
 
 logger = setup_logger(__name__)
 
-CATEGORIES = [
-    "income",
-    "rent_mortgage",
-    "utilities",
-    "groceries",
-    "dining",
-    "transport",
-    "subscriptions",
-    "shopping",
-    "healthcare",
-    "fees",
-    "transfer",
-    "other",
-]
-
-
 def _build_prompt(payload: Dict[str, Any]) -> List[Dict[str, str]]:
     system = (
         "You are a transaction categorizer. Classify each merchant into ONE category from the allowed list. "
@@ -45,12 +31,9 @@ def _build_prompt(payload: Dict[str, Any]) -> List[Dict[str, str]]:
 class AICategorizer:
     def __init__(self):
         self.cfg = get_config()
-        try:
-            from ollama import Client  # type: ignore
-            self.client = Client(host=self.cfg.ollama_host)
-        except Exception as e:
-            logger.warning("Ollama not available for categorization: %s", e)
-            self.client = None
+        self.client = get_llm()
+        if self.client is None:
+            logger.warning("Ollama not available for categorization")
 
     def _examples_by_merchant(self, df: pl.DataFrame, max_merchants: int = 100) -> List[Dict[str, Any]]:
         if df.is_empty() or "merchant" not in df.columns:
@@ -70,12 +53,24 @@ class AICategorizer:
             })
         return items
 
+    def remember(self, session_dir: Path, merchant: str, category: str) -> None:
+        """Pin a merchant's category in the session mapping so later imports reuse it."""
+        mapping_path = session_dir / "categories_map.json"
+        mapping: Dict[str, str] = {}
+        if mapping_path.exists():
+            try:
+                mapping = json.loads(mapping_path.read_text())
+            except Exception:
+                mapping = {}
+        mapping[merchant] = category if category in CATEGORIES else "other"
+        mapping_path.write_text(json.dumps(mapping, indent=2))
+
     def categorize(self, df: pl.DataFrame, session_dir: Path) -> pl.DataFrame:
         if df.is_empty():
             return df
         # Ensure required columns exist
         if "category" not in df.columns:
-            df = df.with_columns(pl.lit(None).alias("category"))
+            df = df.with_columns(pl.lit(None, dtype=pl.String).alias("category"))
         if "description" not in df.columns or "merchant" not in df.columns:
             return df
         mapping_path = session_dir / "categories_map.json"
@@ -105,22 +100,24 @@ class AICategorizer:
                 except Exception as e:
                     logger.warning("Categorization LLM failed: %s", e)
 
-        # Deterministic fallback rules by keywords (always compute)
+        # Deterministic fallback rules by keywords (always compute); later rules take precedence
         desc = pl.col("description").cast(pl.String, strict=False).str.to_lowercase()
-        df = df.with_columns([
-            pl.when(pl.col("amount") > 0).then(pl.lit("income")).otherwise(pl.lit(None)).alias("_cat_rule"),
-            pl.when(desc.str.contains("rent|mortgage")).then(pl.lit("rent_mortgage")).otherwise(pl.col("_cat_rule")).alias("_cat_rule"),
-            pl.when(desc.str.contains("electric|water|gas bill|internet|utility|utilities")).then(pl.lit("utilities")).otherwise(pl.col("_cat_rule")).alias("_cat_rule"),
-            pl.when(desc.str.contains("grocery|grocer|whole foods|trader joe|supermarket")).then(pl.lit("groceries")).otherwise(pl.col("_cat_rule")).alias("_cat_rule"),
-            pl.when(desc.str.contains("restaurant|dinner|lunch|cafe|coffee")).then(pl.lit("dining")).otherwise(pl.col("_cat_rule")).alias("_cat_rule"),
-            pl.when(desc.str.contains("uber|lyft|transport|gas station|fuel|metro|bus")).then(pl.lit("transport")).otherwise(pl.col("_cat_rule")).alias("_cat_rule"),
-            pl.when(desc.str.contains("subscription|netflix|spotify|hulu|apple music|prime|youtube")).then(pl.lit("subscriptions")).otherwise(pl.col("_cat_rule")).alias("_cat_rule"),
-            pl.when(desc.str.contains("fee|charge|atm fee|maintenance fee")).then(pl.lit("fees")).otherwise(pl.col("_cat_rule")).alias("_cat_rule"),
-        ])
+        df = df.with_columns(
+            pl.when(desc.str.contains("fee|charge|atm fee|maintenance fee")).then(pl.lit("fees"))
+            .when(desc.str.contains("subscription|netflix|spotify|hulu|apple music|prime|youtube")).then(pl.lit("subscriptions"))
+            .when(desc.str.contains("uber|lyft|transport|gas station|fuel|metro|bus")).then(pl.lit("transport"))
+            .when(desc.str.contains("restaurant|dinner|lunch|cafe|coffee")).then(pl.lit("dining"))
+            .when(desc.str.contains("grocery|grocer|whole foods|trader joe|supermarket")).then(pl.lit("groceries"))
+            .when(desc.str.contains("electric|water|gas bill|internet|utility|utilities")).then(pl.lit("utilities"))
+            .when(desc.str.contains("rent|mortgage")).then(pl.lit("rent_mortgage"))
+            .when(pl.col("amount") > 0).then(pl.lit("income"))
+            .otherwise(pl.lit(None, dtype=pl.String))
+            .alias("_cat_rule")
+        )
 
         # Apply mapping if we have it
         if mapping:
-            map_series = pl.Series("merchant", list(mapping.keys()))
+            map_series = pl.Series("merchant", list(mapping.keys())).cast(df.schema["merchant"])
             cat_series = pl.Series("_cat_map", list(mapping.values()))
             map_df = pl.DataFrame({"merchant": map_series, "_cat_map": cat_series})
             df = df.join(map_df, on="merchant", how="left")
@@ -128,22 +125,14 @@ class AICategorizer:
         # Finalize category with precedence: existing -> mapped -> rule -> other
         df = df.with_columns(
             pl.coalesce([
-                pl.col("category"),
-                pl.col("_cat_map") if "_cat_map" in df.columns else pl.lit(None),
+                pl.col("category").cast(pl.String),
+                pl.col("_cat_map") if "_cat_map" in df.columns else pl.lit(None, dtype=pl.String),
                 pl.col("_cat_rule"),
                 pl.lit("other"),
             ]).alias("category")
-        )
+        ).with_columns(category_expr("category"))
         # Cleanup temp columns
         drop_cols = [c for c in ("_cat_rule", "_cat_map") if c in df.columns]
         if drop_cols:
             df = df.drop(drop_cols)
         return df
-        # Apply mapping
-        map_series = pl.Series("merchant", list(mapping.keys()))
-        cat_series = pl.Series("_cat", list(mapping.values()))
-        map_df = pl.DataFrame({"merchant": map_series, "_cat": cat_series})
-        df = df.join(map_df, on="merchant", how="left")
-        df = df.with_columns(pl.col("category").fill_null(pl.col("_cat")))
-        df = df.drop("_cat")
-        return df
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import polars as pl
+
+from .metrics import KPIs, amount_expr, cashflow_rows
+from .scoring import HealthScore, score_from_kpis
+
+
+FACT_DIMENSIONS = ["date", "category", "merchant", "account_name"]
+FACT_MEASURES = ["income", "expense", "tx_count"]
+
+
+@dataclass(frozen=True)
+class ReportAggregates:
+    kpis: KPIs
+    monthly: pl.DataFrame
+    categories: pl.DataFrame
+    merchants: pl.DataFrame
+    score: HealthScore
+
+
+def transaction_facts(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """Project transactions onto the narrow additive rows every aggregate is built from.
+
+    Columns: month, date, category, merchant, account_name (those present), income, expense,
+    tx_count. Amounts are in the base currency where converted (see metrics.amount_expr)
+    and internal transfers are left out (metrics.cashflow_rows). Unused columns are pruned by projection pushdown.
+    Frames that are already aggregated (income/expense/tx_count, keyed by date or month)
+    pass through, so the same queries serve raw transactions and materialized tables.
+    """
+    schema = lf.collect_schema()
+    if "amount" in schema:
+        lf = cashflow_rows(lf)
+        amount = amount_expr(lf)
+        measures = [
+            amount.clip(lower_bound=0).alias("income"),
+            (-amount).clip(lower_bound=0).alias("expense"),
+            pl.lit(1, dtype=pl.UInt32).alias("tx_count"),
+        ]
+    else:
+        measures = [pl.col(c) for c in FACT_MEASURES]
+    month = pl.col("month") if "month" in schema else pl.col("date").dt.truncate("1mo").alias("month")
+    dims = [pl.col(c) for c in FACT_DIMENSIONS if c in schema]
+    return lf.select([month, *dims, *measures])
+
+
+def _breakdown_column(facts: pl.LazyFrame) -> str:
+    # Mirrors metrics.category_breakdown: merchant doubles as pseudo-category
+    return "category" if "category" in facts.collect_schema() else "merchant"
+
+
+def report_queries(facts: pl.LazyFrame, merchant_limit: int = 10) -> dict[str, pl.LazyFrame]:
+    group_col = _breakdown_column(facts)
+    return {
+        "kpis": facts.select([
+            pl.col("income").sum().alias("total_income"),
+            pl.col("expense").sum().alias("total_expense"),
+        ]),
+        "monthly": (
+            facts.group_by("month")
+            .agg([pl.col("income").sum(), pl.col("expense").sum()])
+            .with_columns((pl.col("income") - pl.col("expense")).alias("net"))
+            .sort("month")
+        ),
+        "categories": (
+            facts.group_by(group_col)
+            .agg(pl.col("expense").sum().alias("spend"))
+            .sort("spend", descending=True)
+        ),
+        "merchants": (
+            facts.group_by("merchant")
+            .agg([pl.col("expense").sum().alias("spend"), pl.col("tx_count").sum()])
+            .sort(["spend", "tx_count"], descending=[True, True])
+            .head(merchant_limit)
+        ),
+    }
+
+
+def compute_report_aggregates(
+    data: pl.DataFrame | pl.LazyFrame,
+    merchant_limit: int = 10,
+    weights: dict[str, float] | None = None,
+) -> ReportAggregates:
+    """Evaluate KPIs, monthly cashflow, breakdowns and score over a single shared scan.
+
+    All aggregates are lazy queries over the same facts projection; ``pl.collect_all``
+    runs them together so the scan and projection are computed once.
+    """
+    if isinstance(data, pl.DataFrame) and data.width == 0:
+        # Loaders return a column-less frame for sessions without data
+        data = pl.DataFrame(schema={"date": pl.Date, "amount": pl.Float64, "merchant": pl.String})
+    facts = transaction_facts(data.lazy())
+    queries = report_queries(facts, merchant_limit=merchant_limit)
+    kpi_row, monthly, categories, merchants = pl.collect_all(list(queries.values()))
+
+    income = kpi_row["total_income"][0] or 0.0
+    expense = kpi_row["total_expense"][0] or 0.0
+    net = income - expense
+    kpis = KPIs(
+        total_income=float(income),
+        total_expense=float(expense),
+        net_cashflow=float(net),
+        savings_rate=float(net / income) if income > 0 else 0.0,
+    )
+    return ReportAggregates(
+        kpis=kpis,
+        monthly=monthly,
+        categories=categories,
+        merchants=merchants,
+        score=score_from_kpis(kpis, weights),
+    )
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from datetime import date
+from statistics import NormalDist
+from typing import List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+
+from .engine import transaction_facts
+from .metrics import Frame
+
+# Every (income|expense, category) monthly series is fitted at once: series are rows of
+# one matrix, and each model is array math over that matrix (SES loops over months only).
+DEFAULT_HORIZON = 6
+MIN_HISTORY_MONTHS = 3
+SEASON = 12
+SES_ALPHAS = np.linspace(0.1, 0.9, 9)
+
+FORECAST_COLUMNS = [
+    "month",
+    "income", "income_lo", "income_hi",
+    "expense", "expense_lo", "expense_hi",
+    "net", "net_lo", "net_hi",
+    "recurring_expense",
+]
+
+
+def _month_index(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def _month_start(index: int) -> date:
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _series_matrix(data: Frame) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Monthly sums as a (series, months) matrix with missing months as zero.
+
+    Returns the matrix, a bool array marking income series, and the first month index.
+    """
+    if isinstance(data, pl.DataFrame) and data.width == 0:
+        return np.zeros((0, 0)), np.zeros(0, dtype=bool), 0
+    facts = transaction_facts(data.lazy())
+    category = pl.col("category").cast(pl.String) if "category" in facts.collect_schema() else pl.lit("all")
+    monthly = (
+        facts.filter(pl.col("month").is_not_null())
+        .group_by([pl.col("month"), category.fill_null("other").alias("category")])
+        .agg([pl.col("income").sum(), pl.col("expense").sum()])
+        .collect()
+    )
+    if monthly.is_empty():
+        return np.zeros((0, 0)), np.zeros(0, dtype=bool), 0
+    months = np.array([_month_index(m) for m in monthly["month"].to_list()])
+    first = int(months.min())
+    n_months = int(months.max()) - first + 1
+    categories, cat_idx = np.unique(monthly["category"].to_numpy().astype(str), return_inverse=True)
+    n = len(categories)
+    y = np.zeros((2 * n, n_months))
+    np.add.at(y, (cat_idx, months - first), monthly["income"].to_numpy())
+    np.add.at(y, (n + cat_idx, months - first), monthly["expense"].to_numpy())
+    is_income = np.arange(2 * n) < n
+    keep = y.any(axis=1)
+    return y[keep], is_income[keep], first
+
+
+def seasonal_naive(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Same month last year (mean of the last three months with under a year of history).
+
+    Returns (forecast[series, horizon], residual std[series]).
+    """
+    t = y.shape[1]
+    if t >= SEASON + 1:
+        idx = t - SEASON + (np.arange(horizon) % SEASON)
+        resid = y[:, SEASON:] - y[:, :-SEASON]
+        return y[:, idx], np.sqrt((resid ** 2).mean(axis=1))
+    base = y[:, -3:].mean(axis=1)
+    resid = y[:, 1:] - y[:, :-1]
+    return np.repeat(base[:, None], horizon, axis=1), np.sqrt((resid ** 2).mean(axis=1))
+
+
+def exponential_smoothing(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Simple exponential smoothing with alpha picked per series from SES_ALPHAS.
+
+    All alphas and series run together as an (alphas, series) level array.
+    Returns (forecast[series, horizon], one-step residual std[series], alpha[series]).
+    """
+    alphas = SES_ALPHAS[:, None]
+    level = np.repeat(y[None, :, 0], len(SES_ALPHAS), axis=0)
+    sse = np.zeros_like(level)
+    for t in range(1, y.shape[1]):
+        err = y[:, t] - level
+        sse += err ** 2
+        level = level + alphas * err
+    best = sse.argmin(axis=0)
+    cols = np.arange(y.shape[0])
+    sigma = np.sqrt(sse[best, cols] / max(y.shape[1] - 1, 1))
+    return np.repeat(level[best, cols][:, None], horizon, axis=1), sigma, SES_ALPHAS[best]
+
+
+def recurring_projection(recurring: Optional[pl.DataFrame], first_month: int, horizon: int) -> np.ndarray:
+    """Expected charges of active recurring series (analytics.recurring) per forecast month."""
+    out = np.zeros(horizon)
+    if recurring is None or recurring.is_empty():
+        return out
+    active = recurring.filter(pl.col("active") & pl.col("next_date").is_not_null())
+    if active.is_empty():
+        return out
+    period = active["period_days"].to_numpy()
+    steps = int(np.ceil(horizon * 31 / period.min())) + 1
+    # (series, occurrence) charge dates, then their month offset from the first forecast month
+    dates = active["next_date"].to_numpy().astype("datetime64[D]")[:, None] + np.rint(
+        np.arange(steps)[None, :] * period[:, None]
+    ).astype("timedelta64[D]")
+    months = dates.astype("datetime64[M]").astype(int) - (first_month - _month_index(date(1970, 1, 1)))
+    amounts = np.broadcast_to(active["next_amount"].to_numpy()[:, None], dates.shape)
+    inside = (months >= 0) & (months < horizon)
+    np.add.at(out, months[inside], amounts[inside])
+    return out
+
+
+def forecast_cashflow(
+    data: Frame,
+    recurring: Optional[pl.DataFrame] = None,
+    horizon: int = DEFAULT_HORIZON,
+    level: float = 0.8,
+) -> pl.DataFrame:
+    """Income/expense/net projection for the next ``horizon`` months with ``level`` intervals.
+
+    Each series uses whichever of seasonal naive and SES fits its history better; the
+    expense projection never falls below the committed ``recurring`` charges. Empty
+    when there are fewer than MIN_HISTORY_MONTHS months of history.
+    """
+    y, is_income, first = _series_matrix(data)
+    if y.shape[0] == 0 or y.shape[1] < MIN_HISTORY_MONTHS:
+        return pl.DataFrame()
+
+    sn, sn_sigma = seasonal_naive(y, horizon)
+    ses, ses_sigma, alpha = exponential_smoothing(y, horizon)
+    use_sn = sn_sigma < ses_sigma
+    steps = np.arange(1, horizon + 1)[None, :]
+    point = np.where(use_sn[:, None], sn, ses).clip(min=0)
+    # SES error variance grows with the horizon; seasonal naive's does not within a season
+    sigma = np.where(
+        use_sn[:, None],
+        sn_sigma[:, None] * np.ones_like(steps),
+        ses_sigma[:, None] * np.sqrt(1 + (steps - 1) * alpha[:, None] ** 2),
+    )
+
+    income = point[is_income].sum(axis=0)
+    expense = point[~is_income].sum(axis=0)
+    # Series are treated as independent, so variances add
+    income_var = (sigma[is_income] ** 2).sum(axis=0)
+    expense_var = (sigma[~is_income] ** 2).sum(axis=0)
+    z = NormalDist().inv_cdf((1 + level) / 2)
+
+    start = first + y.shape[1]
+    committed = recurring_projection(recurring, start, horizon)
+    expense = np.maximum(expense, committed)
+    net = income - expense
+
+    def bounds(center: np.ndarray, var: np.ndarray, floor: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        half = z * np.sqrt(var)
+        return np.maximum(center - half, floor), center + half
+
+    income_lo, income_hi = bounds(income, income_var, np.zeros(horizon))
+    expense_lo, expense_hi = bounds(expense, expense_var, committed)
+    net_half = z * np.sqrt(income_var + expense_var)
+    months: List[date] = [_month_start(start + h) for h in range(horizon)]
+    return pl.DataFrame({
+        "month": months,
+        "income": income, "income_lo": income_lo, "income_hi": income_hi,
+        "expense": expense, "expense_lo": expense_lo, "expense_hi": expense_hi,
+        "net": net, "net_lo": net - net_half, "net_hi": net + net_half,
+        "recurring_expense": committed,
+    }).with_columns(pl.exclude("month").round(2)).select(FORECAST_COLUMNS)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+
+from ..settings.config import get_config
+from ..utils.logging import setup_logger
+from .metrics import Frame
+
+logger = setup_logger(__name__)
+
+# Rate tables (CSV or parquet) hold daily rates quoted in the base currency:
+#   date, currency, rate[, base]  -- 1 unit of ``currency`` = ``rate`` units of base
+# Rows with a ``base`` column other than BASE_CURRENCY are ignored. The cleaned table is
+# cached as uncompressed Arrow IPC under DATA_DIR/fx and memory-mapped, and the mapped
+# frame is kept per (path, mtime) so repeated conversions neither re-parse nor copy it.
+
+
+def _cache_file(source: Path, base: str) -> Path:
+    # Rows are filtered by base, so each base gets its own cache of the same table
+    digest = hashlib.sha1(str(source).encode("utf-8")).hexdigest()[:12]
+    return get_config().data_dir / "fx" / f"rates-{digest}-{base}.arrow"
+
+
+def _read_source(source: Path, base: str) -> pl.DataFrame:
+    raw = pl.read_parquet(source) if source.suffix == ".parquet" else pl.read_csv(source, try_parse_dates=True)
+    raw = raw.rename({c: c.strip().lower() for c in raw.columns})
+    if "base" in raw.columns:
+        raw = raw.filter(pl.col("base").cast(pl.String).str.to_uppercase() == base)
+    return (
+        raw.select([
+            pl.col("date").cast(pl.Date, strict=False),
+            pl.col("currency").cast(pl.String).str.strip_chars().str.to_uppercase(),
+            pl.col("rate").cast(pl.Float64, strict=False),
+        ])
+        .drop_nulls()
+        .filter(pl.col("rate") > 0)
+        .unique(["currency", "date"], keep="last")
+        .sort("date")
+    )
+
+
+@lru_cache(maxsize=4)
+def _load_rates(source: str, mtime_ns: int, base: str) -> pl.DataFrame:
+    path = Path(source)
+    cache = _cache_file(path, base)
+    if not cache.exists() or cache.stat().st_mtime_ns < mtime_ns:
+        rates = _read_source(path, base)
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_suffix(".tmp")
+        # Uncompressed so the file can be memory-mapped instead of decoded
+        rates.write_ipc(tmp, compression="uncompressed")
+        tmp.replace(cache)
+        logger.info("Cached %d FX rates from %s", rates.height, path)
+    return pl.read_ipc(cache, memory_map=True)
+
+
+def load_rates(path: Optional[Path] = None) -> Optional[pl.DataFrame]:
+    """Daily FX rates into the base currency (date, currency, rate), or None without a table."""
+    cfg = get_config()
+    path = path or cfg.fx_rates_path
+    if path is None or not path.exists():
+        return None
+    path = path.resolve()
+    return _load_rates(str(path), path.stat().st_mtime_ns, cfg.base_currency)
+
+
+def convert_to_base(df: Frame, rates: Optional[pl.DataFrame] = None) -> Frame:
+    """Add ``amount_base``: the amount in BASE_CURRENCY at the latest rate on or before its date.
+
+    Base-currency (and currency-less) rows keep their amount; foreign rows stay null
+    when no earlier rate exists. The as-of join runs on the distinct (date, currency)
+    pairs only and is hash-joined back, so the input is neither sorted nor reordered.
+    Returns the same kind of frame it was given.
+    """
+    cfg = get_config()
+    base = cfg.base_currency
+    if rates is None:
+        rates = load_rates()
+    lf = df.lazy().drop("amount_base", strict=False)
+    if "currency" not in lf.collect_schema().names():
+        lf = lf.with_columns(pl.lit(None, dtype=pl.String).alias("currency"))
+    pairs = (
+        lf.select(["date", "currency"])
+        .unique()
+        .with_columns(pl.col("currency").cast(pl.String).str.strip_chars().str.to_uppercase().alias("_currency"))
+    )
+    is_base = pl.col("_currency").is_null() | (pl.col("_currency") == base)
+    if rates is None:
+        pairs = pairs.with_columns(pl.when(is_base).then(pl.lit(1.0)).alias("_rate"))
+    else:
+        pairs = (
+            pairs.filter(pl.col("date").is_not_null())
+            .sort("date")
+            .join_asof(
+                rates.lazy().rename({"currency": "_currency", "rate": "_rate"}),
+                on="date",
+                by="_currency",
+                strategy="backward",
+                check_sortedness=False,
+            )
+            .with_columns(pl.when(is_base).then(pl.lit(1.0)).otherwise(pl.col("_rate")).alias("_rate"))
+        )
+    lf = (
+        lf.join(pairs.select(["date", "currency", "_rate"]), on=["date", "currency"], how="left",
+                nulls_equal=True, maintain_order="left")
+        .with_columns((pl.col("amount") * pl.col("_rate")).alias("amount_base"))
+        .drop("_rate")
+    )
+    if isinstance(df, pl.LazyFrame):
+        return lf
+    out = lf.collect()
+    missing = out.filter(pl.col("amount_base").is_null() & pl.col("amount").is_not_null())
+    if not missing.is_empty():
+        currencies = sorted(missing["currency"].cast(pl.String).drop_nulls().unique().to_list())
+        logger.warning(
+            "No %s rate for %d row(s) in %s; their amount is used unconverted", base, missing.height, ", ".join(currencies)
+        )
+    return out
@@ -2,17 +2,24 @@ from __future__ import annotations
 
 import polars as pl
 
+from .metrics import amount_expr, cashflow_rows
+
 SUBSCRIPTION_KEYWORDS = [
     "subscription", "netflix", "spotify", "hulu", "apple music", "prime", "youtube",
     "membership", "audible", "xbox", "playstation", "icloud", "dropbox", "patreon",
 ]
 
 
+def _spending_rows(df: pl.DataFrame) -> pl.DataFrame:
+    # Matched transfers are not spending; amounts in the base currency where converted
+    return cashflow_rows(df).with_columns(amount_expr(df)).collect()
+
+
 def top_expense_transactions(df: pl.DataFrame, limit: int = 10) -> pl.DataFrame:
     if df.is_empty():
         return df
     return (
-        df.filter(pl.col("amount") < 0)
+        _spending_rows(df).filter(pl.col("amount") < 0)
         .select(["date", "merchant", "description", "amount"]) 
         .sort(pl.col("amount"))  # most negative first
         .head(limit)
@@ -24,7 +31,7 @@ def recurring_candidates(df: pl.DataFrame, min_count: int = 3, limit: int = 15)
         return pl.DataFrame()
     # Group by merchant and rounded absolute amount to detect repeated similar charges
     rounded = (
-        df.filter(pl.col("amount") < 0)
+        _spending_rows(df).filter(pl.col("amount") < 0)
         .with_columns(pl.col("amount").abs().round(2).alias("abs_amount"))
         .group_by(["merchant", "abs_amount"]).agg([
             pl.count().alias("count"),
@@ -44,7 +51,7 @@ def subscription_merchants(df: pl.DataFrame, limit: int = 15) -> pl.DataFrame:
     desc_lower = pl.col("description").cast(pl.String, strict=False).str.to_lowercase()
     pattern = "|".join(SUBSCRIPTION_KEYWORDS)
     subs = (
-        df.filter((pl.col("amount") < 0) & desc_lower.str.contains(pattern))
+        _spending_rows(df).filter((pl.col("amount") < 0) & desc_lower.str.contains(pattern))
         .group_by("merchant")
         .agg([(-pl.col("amount").sum()).alias("spend"), pl.count().alias("tx_count")])
         .sort(["spend", "tx_count"], descending=[True, True])
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import polars as pl
 
+# Metrics accept eager frames or LazyFrames (e.g. storage.dataset.scan_history), so
+# filters and column selection upstream are pushed down into the scan.
+Frame = Union[pl.DataFrame, pl.LazyFrame]
+
 
 @dataclass(frozen=True)
 class KPIs:
@@ -13,12 +17,42 @@ class KPIs:
     savings_rate: float
 
 
-def compute_kpis(df: pl.DataFrame) -> KPIs:
-    if df.is_empty():
+def _is_empty(df: Frame) -> bool:
+    # Only eager frames can be checked without running the query
+    return isinstance(df, pl.DataFrame) and df.is_empty()
+
+
+def _columns(df: Frame) -> List[str]:
+    return df.columns if isinstance(df, pl.DataFrame) else df.collect_schema().names()
+
+
+def amount_expr(df: Frame) -> pl.Expr:
+    """Base-currency amount (analytics.fx) where converted, else the statement amount."""
+    if "amount_base" in _columns(df):
+        return pl.coalesce(pl.col("amount_base"), pl.col("amount")).alias("amount")
+    return pl.col("amount")
+
+
+def cashflow_rows(df: Frame) -> pl.LazyFrame:
+    """Rows that count as income or spending: matched internal transfers (``is_transfer``,
+    set by analytics.transfers) are money moving between the user's own accounts, not
+    cashflow. Rows merely categorized 'transfer' still count."""
+    if "is_transfer" not in _columns(df):
+        return df.lazy()
+    return df.lazy().filter(~pl.col("is_transfer").fill_null(False))
+
+
+def compute_kpis(df: Frame) -> KPIs:
+    if _is_empty(df):
         return KPIs(0.0, 0.0, 0.0, 0.0)
 
-    income = df.filter(pl.col("amount") > 0)["amount"].sum() or 0.0
-    expense = df.filter(pl.col("amount") < 0)["amount"].sum() or 0.0
+    amount = amount_expr(df)
+    totals = cashflow_rows(df).select([
+        amount.filter(amount > 0).sum().alias("income"),
+        amount.filter(amount < 0).sum().alias("expense"),
+    ]).collect()
+    income = totals["income"][0] or 0.0
+    expense = totals["expense"][0] or 0.0
     expense_abs = abs(expense)
     net = income - expense_abs
     savings_rate = (net / income) if income > 0 else 0.0
@@ -30,11 +64,12 @@ def compute_kpis(df: pl.DataFrame) -> KPIs:
     )
 
 
-def monthly_cashflow(df: pl.DataFrame) -> pl.DataFrame:
-    if df.is_empty():
+def monthly_cashflow(df: Frame) -> pl.DataFrame:
+    if _is_empty(df):
         return df
     return (
-        df.with_columns(pl.col("date").dt.truncate("1mo").alias("month"))
+        cashflow_rows(df)
+        .with_columns([pl.col("date").dt.truncate("1mo").alias("month"), amount_expr(df)])
         .group_by("month")
         .agg([
             pl.col("amount").filter(pl.col("amount") > 0).sum().alias("income"),
@@ -42,40 +77,39 @@ def monthly_cashflow(df: pl.DataFrame) -> pl.DataFrame:
         ])
         .with_columns((pl.col("income") - pl.col("expense")).alias("net"))
         .sort("month")
+        .collect()
     )
 
 
-def category_breakdown(df: pl.DataFrame) -> pl.DataFrame:
-    if df.is_empty():
+def category_breakdown(df: Frame) -> pl.DataFrame:
+    if _is_empty(df):
         return df
-    cat_col = "category" if "category" in df.columns else None
-    if not cat_col:
-        # fallback: merchant as pseudo-category
-        return (
-            df.group_by("merchant")
-            .agg([
-                (-pl.col("amount").filter(pl.col("amount") < 0).sum()).alias("spend"),
-            ])
-            .sort("spend", descending=True)
-        )
+    # fallback: merchant as pseudo-category
+    group_col = "category" if "category" in _columns(df) else "merchant"
     return (
-        df.group_by("category")
+        cashflow_rows(df)
+        .with_columns(amount_expr(df))
+        .group_by(group_col)
         .agg([
             (-pl.col("amount").filter(pl.col("amount") < 0).sum()).alias("spend"),
         ])
         .sort("spend", descending=True)
+        .collect()
     )
 
 
-def top_merchants(df: pl.DataFrame, limit: int = 10) -> pl.DataFrame:
-    if df.is_empty():
+def top_merchants(df: Frame, limit: int = 10) -> pl.DataFrame:
+    if _is_empty(df):
         return df
     return (
-        df.group_by("merchant")
+        cashflow_rows(df)
+        .with_columns(amount_expr(df))
+        .group_by("merchant")
         .agg([
             (-pl.col("amount").filter(pl.col("amount") < 0).sum()).alias("spend"),
-            pl.count().alias("tx_count"),
+            pl.len().alias("tx_count"),
         ])
         .sort(["spend", "tx_count"], descending=[True, True])
         .head(limit)
+        .collect()
     )
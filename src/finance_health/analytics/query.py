@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import calendar
+from datetime import date, timedelta
+from typing import List, Literal, Optional
+
+import polars as pl
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from ..parsing.interfaces import CATEGORIES
+from ..storage.loader import scan_session
+from .metrics import amount_expr, cashflow_rows
+
+# A restricted query over one session's transactions. Questions are translated into this
+# spec (advice.nl_query) and it is validated before anything runs; execution is a single
+# lazy Polars query, so answers never depend on the model reading rows.
+
+Category = Literal[tuple(CATEGORIES)]  # type: ignore[valid-type]
+Measure = Literal["spending", "income", "net"]
+Aggregate = Literal["sum", "count", "mean", "min", "max"]
+GroupKey = Literal["month", "year", "weekday", "category", "merchant", "account"]
+Period = Literal["this_month", "last_month", "last_3_months", "last_6_months", "last_12_months", "this_year", "last_year"]
+
+QUERY_COLUMNS = ["date", "amount", "amount_base", "merchant", "description", "category", "account_name", "is_transfer"]
+MAX_QUERY_ROWS = 100
+
+_GROUP_EXPRS = {
+    "month": pl.col("date").dt.truncate("1mo").alias("month"),
+    "year": pl.col("date").dt.year().alias("year"),
+    "weekday": pl.col("date").dt.strftime("%A").alias("weekday"),
+    "category": pl.col("category").cast(pl.String).alias("category"),
+    "merchant": pl.col("merchant").cast(pl.String).alias("merchant"),
+    "account": pl.col("account_name").cast(pl.String).alias("account"),
+}
+
+
+class QuerySpec(BaseModel):
+    """Filters, grouping and aggregate of a transaction query."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    measure: Measure = "spending"
+    aggregate: Aggregate = "sum"
+    # Case-insensitive substrings matched against merchant or description
+    merchants: List[str] = Field(default_factory=list, max_length=10)
+    categories: List[Category] = Field(default_factory=list)
+    accounts: List[str] = Field(default_factory=list, max_length=10)
+    # Absolute amount bounds of individual transactions
+    min_amount: Optional[float] = Field(default=None, ge=0)
+    max_amount: Optional[float] = Field(default=None, ge=0)
+    # Dates: an explicit range, a calendar month/year, or a period ending at the latest data
+    start: Optional[date] = None
+    end: Optional[date] = None
+    year: Optional[int] = Field(default=None, ge=1900, le=2100)
+    month: Optional[int] = Field(default=None, ge=1, le=12)
+    period: Optional[Period] = None
+    group_by: List[GroupKey] = Field(default_factory=list, max_length=2)
+    limit: int = Field(default=20, ge=1, le=MAX_QUERY_ROWS)
+
+    @model_validator(mode="after")
+    def _check(self) -> "QuerySpec":
+        if self.period is not None and (self.year is not None or self.month is not None or self.start or self.end):
+            raise ValueError("period cannot be combined with year, month, start or end")
+        if self.start and self.end and self.start > self.end:
+            raise ValueError("start is after end")
+        if self.min_amount is not None and self.max_amount is not None and self.min_amount > self.max_amount:
+            raise ValueError("min_amount is above max_amount")
+        if len(set(self.group_by)) != len(self.group_by):
+            raise ValueError("group_by repeats a key")
+        return self
+
+    def describe(self) -> str:
+        """One-line, human-readable summary of the spec."""
+        parts = [f"{self.aggregate} of {self.measure}"]
+        if self.merchants:
+            parts.append("matching " + ", ".join(self.merchants))
+        if self.categories:
+            parts.append("in " + ", ".join(self.categories))
+        if self.accounts:
+            parts.append("on " + ", ".join(self.accounts))
+        if self.period:
+            parts.append(self.period.replace("_", " "))
+        if self.month:
+            parts.append(calendar.month_name[self.month])
+        if self.year:
+            parts.append(str(self.year))
+        if self.start or self.end:
+            parts.append(f"from {self.start or '…'} to {self.end or '…'}")
+        if self.min_amount is not None or self.max_amount is not None:
+            parts.append(f"amount {self.min_amount or 0:g}–{self.max_amount if self.max_amount is not None else '∞'}")
+        if self.group_by:
+            parts.append("by " + ", ".join(self.group_by))
+        return " ".join(parts)
+
+
+def _month_start(d: date, back: int = 0) -> date:
+    index = d.year * 12 + d.month - 1 - back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def resolve_dates(spec: QuerySpec, latest: Optional[date]) -> tuple[Optional[date], Optional[date]]:
+    """Inclusive (start, end) of the spec. Relative periods, and a month without a year,
+    resolve against ``latest`` (the newest transaction), so a cached spec keeps meaning
+    the same thing for the same data."""
+    start, end = spec.start, spec.end
+    if spec.period is not None:
+        if latest is None:
+            return None, None
+        months = {"this_month": 1, "last_3_months": 3, "last_6_months": 6, "last_12_months": 12}
+        if spec.period in months:
+            return _month_start(latest, months[spec.period] - 1), latest
+        if spec.period == "last_month":
+            return _month_start(latest, 1), _month_start(latest) - timedelta(days=1)
+        year = latest.year - (spec.period == "last_year")
+        return date(year, 1, 1), date(year, 12, 31)
+    if spec.month is not None:
+        year = spec.year
+        if year is None:
+            year = latest.year if latest is not None else date.today().year
+            if latest is not None and spec.month > latest.month:
+                year -= 1  # the most recent such month
+        last_day = calendar.monthrange(year, spec.month)[1]
+        return _clip(start, end, date(year, spec.month, 1), date(year, spec.month, last_day))
+    if spec.year is not None:
+        return _clip(start, end, date(spec.year, 1, 1), date(spec.year, 12, 31))
+    return start, end
+
+
+def _clip(start: Optional[date], end: Optional[date], lo: date, hi: date) -> tuple[date, date]:
+    return max(start or lo, lo), min(end or hi, hi)
+
+
+def _contains_any(col: str, needles: List[str]) -> pl.Expr:
+    text = pl.col(col).cast(pl.String).str.to_lowercase()
+    return pl.any_horizontal([text.str.contains(n.lower(), literal=True) for n in needles]).fill_null(False)
+
+
+def compile_query(spec: QuerySpec, lf: pl.LazyFrame, latest: Optional[date] = None) -> pl.LazyFrame:
+    """Lazy query answering ``spec`` over normalized transactions ``lf``.
+
+    Returns the group keys (if any), ``value`` and the number of ``transactions``.
+    Transfers between own accounts are excluded unless asked for by category.
+    """
+    names = lf.collect_schema().names()
+    amount = amount_expr(lf)
+    rows = lf if "transfer" in spec.categories else cashflow_rows(lf)
+    start, end = resolve_dates(spec, latest)
+
+    filters: List[pl.Expr] = []
+    if start is not None:
+        filters.append(pl.col("date") >= start)
+    if end is not None:
+        filters.append(pl.col("date") <= end)
+    if spec.merchants:
+        text_cols = [c for c in ("merchant", "description") if c in names]
+        filters.append(pl.any_horizontal([_contains_any(c, spec.merchants) for c in text_cols]) if text_cols else pl.lit(False))
+    if spec.categories:
+        filters.append(pl.col("category").cast(pl.String).is_in(list(spec.categories)))
+    if spec.accounts:
+        filters.append(_contains_any("account_name", spec.accounts))
+    if spec.measure == "spending":
+        filters.append(amount < 0)
+    elif spec.measure == "income":
+        filters.append(amount > 0)
+    if spec.min_amount is not None:
+        filters.append(amount.abs() >= spec.min_amount)
+    if spec.max_amount is not None:
+        filters.append(amount.abs() <= spec.max_amount)
+
+    # Spending is reported as a positive number
+    signed = -amount if spec.measure == "spending" else amount
+    value = {
+        "sum": signed.sum(),
+        "count": signed.count().cast(pl.Float64),
+        "mean": signed.mean(),
+        "min": signed.min(),
+        "max": signed.max(),
+    }[spec.aggregate].alias("value")
+    aggs = [value, pl.len().alias("transactions")]
+
+    if filters:
+        rows = rows.filter(pl.all_horizontal(filters))
+    if not spec.group_by:
+        return rows.select(aggs)
+    keys = [_GROUP_EXPRS[k] for k in spec.group_by]
+    out = rows.group_by(keys).agg(aggs)
+    # Time groupings read chronologically, everything else largest first
+    if spec.group_by[0] in ("month", "year"):
+        return out.sort(spec.group_by).tail(spec.limit)
+    return out.sort("value", descending=True, nulls_last=True).head(spec.limit)
+
+
+def run_query(session_id: str, spec: QuerySpec) -> pl.DataFrame:
+    """Execute ``spec`` over a session; an empty frame when the session has no data.
+
+    The resolved date range is passed to the scan, so month partitions outside it are
+    never read."""
+    lf = scan_session(session_id)
+    if lf is None:
+        return pl.DataFrame()
+    latest = None
+    if spec.period is not None or (spec.month is not None and spec.year is None):
+        # Served from parquet statistics, no full read
+        latest = lf.select(pl.col("date").max()).collect().item()
+    start, end = resolve_dates(spec, latest)
+    lf = scan_session(session_id, start=start, end=end)
+    lf = lf.select([c for c in QUERY_COLUMNS if c in lf.collect_schema().names()])
+    return compile_query(spec, lf, latest).collect()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import polars as pl
+
+from .metrics import Frame
+
+# Cents of slack when comparing amounts against reported balances
+TOLERANCE = 0.011
+ISSUE_KINDS = ["gap", "duplicate", "sign_error"]
+ISSUE_COLUMNS = ["account_name", "date", "description", "amount", "balance_after", "kind", "discrepancy"]
+
+
+@dataclass(frozen=True)
+class Reconciliation:
+    issues: pl.DataFrame
+    accounts: pl.DataFrame
+    confidence: Optional[float]
+
+    def to_dict(self, issue_limit: int = 50) -> Dict[str, Any]:
+        return {
+            "confidence": self.confidence,
+            "accounts": self.accounts.with_columns(pl.col(pl.Date).cast(pl.Utf8)).to_dicts(),
+            "issue_count": self.issues.height,
+            "issues": self.issues.head(issue_limit).with_columns(pl.col(pl.Date).cast(pl.Utf8)).to_dicts(),
+        }
+
+
+def _near(e: pl.Expr) -> pl.Expr:
+    return e.abs() <= TOLERANCE
+
+
+def _checked(lf: pl.LazyFrame, newest_first: bool) -> pl.LazyFrame:
+    """Per row: the balance drift step and its classification.
+
+    Rows are taken in date order; within a day in statement order (source_file and
+    source_row, else input order), or reversed when ``newest_first`` (statements that
+    list the latest transaction first).
+
+    drift = balance_after - cum_sum(amount) is constant while every row is accounted
+    for (the opening balance cancels out), so each change of drift pinpoints a break:
+    a gap moves it by the missing amount, a sign error by -2 x amount, and a duplicated
+    row by -amount (the balance did not move).
+    """
+    names = lf.collect_schema().names()
+    account = pl.col("account_name").cast(pl.String).fill_null("") if "account_name" in names else pl.lit("")
+    description = pl.col("description").cast(pl.String) if "description" in names else pl.lit(None, dtype=pl.String)
+    source_file = pl.col("source_file").cast(pl.String) if "source_file" in names else pl.lit(None, dtype=pl.String)
+    source_row = pl.col("source_row") if "source_row" in names else pl.lit(None, dtype=pl.UInt32)
+    drift = pl.col("balance_after") - pl.col("amount").cum_sum()
+    # Rows without a reported balance carry the last known drift forward
+    step = pl.col("_drift") - pl.col("_drift").forward_fill().shift()
+    same_as_previous = (
+        (pl.col("date") == pl.col("date").shift())
+        & (pl.col("amount") == pl.col("amount").shift())
+        & (pl.col("description").eq_missing(pl.col("description").shift()))
+    )
+    return (
+        lf.filter(pl.col("date").is_not_null() & pl.col("amount").is_not_null())
+        .with_row_index("_row")
+        .select([
+            pl.col("_row"),
+            source_file.alias("_file"),
+            source_row.alias("_source_row"),
+            account.alias("account_name"),
+            pl.col("date"),
+            description.alias("description"),
+            pl.col("amount"),
+            pl.col("balance_after") if "balance_after" in names else pl.lit(None, dtype=pl.Float64).alias("balance_after"),
+        ])
+        .sort(
+            ["account_name", "date", "_file", "_source_row", "_row"],
+            descending=[False, False, False, newest_first, newest_first],
+        )
+        .with_columns([
+            drift.over("account_name").alias("_drift"),
+            same_as_previous.over("account_name").alias("_repeat"),
+        ])
+        .with_columns(step.over("account_name").alias("discrepancy"))
+        .with_columns(
+            pl.when(pl.col("balance_after").is_null()).then(pl.lit("unverified"))
+            .when(pl.col("discrepancy").is_null()).then(pl.lit("opening"))
+            .when(_near(pl.col("discrepancy"))).then(pl.lit("ok"))
+            .when(_near(pl.col("discrepancy") + pl.col("amount")) & pl.col("_repeat")).then(pl.lit("duplicate"))
+            .when(_near(pl.col("discrepancy") + 2 * pl.col("amount"))).then(pl.lit("sign_error"))
+            .otherwise(pl.lit("gap"))
+            .alias("kind")
+        )
+    )
+
+
+def _summary(checked: pl.LazyFrame) -> pl.LazyFrame:
+    kind = pl.col("kind")
+    return checked.group_by("account_name").agg([
+        pl.len().alias("rows"),
+        pl.col("balance_after").is_not_null().sum().alias("with_balance"),
+        (kind == "ok").sum().alias("reconciled"),
+        *[(kind == k).sum().alias(f"{k}s") for k in ISSUE_KINDS],
+        pl.col("discrepancy").filter(kind == "gap").sum().round(2).alias("unexplained_amount"),
+        pl.col("date").min().alias("first_date"),
+        pl.col("date").max().alias("last_date"),
+        pl.col("balance_after").drop_nulls().last().alias("closing_balance"),
+    ])
+
+
+def reconcile_balances(df: Frame) -> Reconciliation:
+    """Check each account's rows, in date order, against the reported balance_after.
+
+    Same-day rows are tried both in input order and reversed; each account keeps the
+    order that reconciles more rows (reported in ``row_order``). ``confidence`` is the
+    share of checkable balance-bearing rows that reconcile (None when no row reports
+    a balance).
+    """
+    lf = df.lazy()
+    names = lf.collect_schema().names()
+    if not {"date", "amount"} <= set(names):
+        return Reconciliation(pl.DataFrame(), pl.DataFrame(), None)
+    forward, reverse = _checked(lf, newest_first=False), _checked(lf, newest_first=True)
+    issues_in = pl.col("kind").is_in(ISSUE_KINDS)
+    # All four queries share the input scan and run together
+    fwd_issues, rev_issues, fwd_accounts, rev_accounts = pl.collect_all([
+        forward.filter(issues_in).select(ISSUE_COLUMNS),
+        reverse.filter(issues_in).select(ISSUE_COLUMNS),
+        _summary(forward),
+        _summary(reverse),
+    ])
+    better = fwd_accounts.join(rev_accounts, on="account_name", suffix="_rev").filter(
+        pl.col("reconciled_rev") > pl.col("reconciled")
+    )["account_name"]
+    flipped = pl.col("account_name").is_in(better.implode())
+    issues = pl.concat([fwd_issues.filter(~flipped), rev_issues.filter(flipped)]).sort(["account_name", "date"])
+    accounts = pl.concat([
+        fwd_accounts.filter(~flipped).with_columns(pl.lit("statement").alias("row_order")),
+        rev_accounts.filter(flipped).with_columns(pl.lit("reversed").alias("row_order")),
+    ]).sort("account_name")
+    # Each account's first balance-bearing row only anchors the drift and is not checkable
+    checkable = int((accounts["with_balance"] - (accounts["with_balance"] > 0).cast(pl.UInt32)).sum())
+    confidence = round(accounts["reconciled"].sum() / checkable, 4) if checkable else None
+    accounts = accounts.with_columns(
+        (pl.col("reconciled") / (pl.col("with_balance") - 1).clip(lower_bound=1)).round(4).alias("reconciled_share")
+    )
+    return Reconciliation(issues=issues, accounts=accounts, confidence=confidence)
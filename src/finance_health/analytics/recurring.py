@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import polars as pl
+
+from .metrics import Frame, amount_expr, cashflow_rows
+
+# Cadence name -> (period in days, tolerance in days) an inter-arrival gap may deviate by
+CADENCES: Dict[str, Tuple[float, float]] = {
+    "weekly": (7.0, 1.5),
+    "monthly": (30.44, 4.0),
+    "annual": (365.25, 20.0),
+}
+# Share of gaps that must fit the cadence, and of consecutive charges whose amount stays
+# within AMOUNT_TOLERANCE of the previous one (a one-off price change still qualifies)
+MIN_REGULARITY = 0.7
+MIN_AMOUNT_STABILITY = 0.6
+AMOUNT_TOLERANCE = 0.15
+
+RECURRING_COLUMNS = [
+    "merchant", "cadence", "period_days", "charges", "first_date", "last_date",
+    "last_amount", "amount_drift", "monthly_cost", "next_date", "next_amount", "active",
+]
+
+
+def _cadence_expr(gap: pl.Expr) -> pl.Expr:
+    expr = None
+    for name, (period, tol) in CADENCES.items():
+        cond = (gap - period).abs() <= tol
+        expr = pl.when(cond).then(pl.lit(name)) if expr is None else expr.when(cond).then(pl.lit(name))
+    return expr.otherwise(pl.lit(None, dtype=pl.String))
+
+
+def detect_recurring(df: Frame, min_charges: int = 3) -> pl.DataFrame:
+    """Recurring debit series per merchant with cadence and the predicted next charge.
+
+    Charges are sorted by merchant and date; inter-arrival gaps and amount changes come
+    from window expressions, so the whole detection is a single vectorized query.
+    A merchant qualifies when its median gap matches a cadence in CADENCES, most gaps
+    fit that cadence and the amount is mostly stable between charges. Matched transfers
+    are left out and amounts are in the base currency (see analytics.metrics).
+    """
+    if "merchant" not in df.lazy().collect_schema().names():
+        return pl.DataFrame()
+    lf = cashflow_rows(df).with_columns(amount_expr(df))
+    periods = {name: period for name, (period, _) in CADENCES.items()}
+    tolerances = {name: tol for name, (_, tol) in CADENCES.items()}
+    cadence = _cadence_expr(pl.col("gap").median().over("merchant"))
+    return (
+        lf.filter((pl.col("amount") < 0) & pl.col("merchant").is_not_null() & pl.col("date").is_not_null())
+        .select([
+            pl.col("merchant"),
+            pl.col("date"),
+            pl.col("amount").abs().alias("charge"),
+            pl.col("date").max().alias("_end"),
+        ])
+        .sort(["merchant", "date"])
+        .with_columns([
+            pl.col("date").diff().dt.total_days().over("merchant").alias("gap"),
+            (pl.col("charge") / pl.col("charge").shift().over("merchant") - 1).abs().alias("step"),
+        ])
+        .with_columns(cadence.alias("cadence"))
+        .filter(pl.col("cadence").is_not_null())
+        .with_columns([
+            pl.col("cadence").replace_strict(periods, return_dtype=pl.Float64).alias("_period"),
+            pl.col("cadence").replace_strict(tolerances, return_dtype=pl.Float64).alias("_tol"),
+        ])
+        .group_by("merchant")
+        .agg([
+            pl.col("cadence").first(),
+            pl.col("gap").median().alias("period_days"),
+            pl.len().alias("charges"),
+            ((pl.col("gap") - pl.col("_period")).abs() <= pl.col("_tol")).mean().alias("regularity"),
+            (pl.col("step") <= AMOUNT_TOLERANCE).mean().alias("amount_stability"),
+            pl.col("date").first().alias("first_date"),
+            pl.col("date").last().alias("last_date"),
+            pl.col("charge").first().alias("first_amount"),
+            pl.col("charge").last().alias("last_amount"),
+            pl.col("_period").first(),
+            pl.col("_end").first(),
+        ])
+        .filter(
+            (pl.col("charges") >= min_charges)
+            & (pl.col("regularity") >= MIN_REGULARITY)
+            & (pl.col("amount_stability") >= MIN_AMOUNT_STABILITY)
+        )
+        .with_columns([
+            (pl.col("last_amount") / pl.col("first_amount") - 1).round(4).alias("amount_drift"),
+            (pl.col("last_amount") * periods["monthly"] / pl.col("_period")).round(2).alias("monthly_cost"),
+            (pl.col("last_date") + pl.duration(days=pl.col("period_days").round().cast(pl.Int64))).alias("next_date"),
+            pl.col("last_amount").alias("next_amount"),
+            # Missed more than one and a half periods: probably cancelled
+            ((pl.col("_end") - pl.col("last_date")).dt.total_days() <= pl.col("_period") * 1.5).alias("active"),
+        ])
+        .with_columns(pl.col("merchant").cast(pl.String))
+        .sort(["active", "monthly_cost", "merchant"], descending=[True, True, False])
+        .select(RECURRING_COLUMNS)
+        .collect()
+    )
@@ -1,19 +1,37 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 import polars as pl
 
-from .metrics import compute_kpis, monthly_cashflow, category_breakdown, top_merchants
-from .scoring import compute_health_score
+from .engine import compute_report_aggregates
+from .metrics import Frame
+from .anomalies import detect_anomalies
+from .forecast import forecast_cashflow
+from .reconcile import reconcile_balances
+from .scenarios import rank_scenarios, top_scenarios
+from .scoring import health_score_timeseries
+from .recurring import detect_recurring
 
 
-def build_report(session_id: str, df: pl.DataFrame) -> Dict[str, Any]:
-    kpis = compute_kpis(df)
-    month = monthly_cashflow(df)
-    cats = category_breakdown(df)
-    merchants = top_merchants(df)
-    score = compute_health_score(df)
+def _records(df: pl.DataFrame) -> List[Dict[str, Any]]:
+    # Dates as ISO strings so the report stays JSON serializable
+    return df.with_columns(pl.col(pl.Date).cast(pl.Utf8)).to_dicts()
+
+
+def build_report(session_id: str, df: Frame, transactions: Optional[Frame] = None) -> Dict[str, Any]:
+    """Report skeleton from ``df`` (raw rows or aggregate facts).
+
+    Sections that need individual transactions (recurring charges, anomalies, balance reconciliation,
+    fixed-cost merchants left out of scenarios) are filled from ``transactions`` when given, else
+    from ``df`` itself if it holds raw rows.
+    """
+    agg = compute_report_aggregates(df)
+    if transactions is None and "amount" in df.lazy().collect_schema().names():
+        transactions = df
+    kpis, month, cats, merchants, score = agg.kpis, agg.monthly, agg.categories, agg.merchants, agg.score
+    recurring = detect_recurring(transactions) if transactions is not None else pl.DataFrame()
+    anomalies = detect_anomalies(transactions) if transactions is not None else pl.DataFrame()
 
     report = {
         "version": 1,
@@ -37,6 +55,12 @@ def build_report(session_id: str, df: pl.DataFrame) -> Dict[str, Any]:
             "score": score.score,
             "components": score.components,
         },
+        "health_score_history": _records(health_score_timeseries(month)),
+        "recurring": _records(recurring),
+        "anomalies": _records(anomalies),
+        "forecast": _records(forecast_cashflow(df, recurring)),
+        "scenarios": _records(top_scenarios(rank_scenarios(agg, transactions, recurring), limit=10)),
+        "ingest_quality": reconcile_balances(transactions).to_dict() if transactions is not None else None,
         "advice": None,
     }
     return report
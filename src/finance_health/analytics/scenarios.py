@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import List, Optional
+
+import numpy as np
+import polars as pl
+
+from .engine import ReportAggregates
+from .metrics import Frame, KPIs, amount_expr, cashflow_rows
+from .scoring import score_arrays
+
+# Plausible cut levels per spending category; categories not listed are not adjusted
+CATEGORY_CUTS = {
+    "dining": (0.10, 0.15, 0.25, 0.40),
+    "shopping": (0.10, 0.20, 0.30),
+    "groceries": (0.05, 0.10, 0.15),
+    "transport": (0.10, 0.20),
+    "subscriptions": (0.25, 0.50),
+    "utilities": (0.05, 0.10),
+    "rent_mortgage": (0.05, 0.10),
+    "fees": (0.50, 1.00),
+    "other": (0.10, 0.20),
+}
+# Pairs of category cuts are also evaluated at these levels
+COMBINED_CUTS = (0.10, 0.20)
+MERCHANT_CUTS = (0.25, 0.50)
+# Merchants mostly paid from these categories are not offered as merchant cuts or
+# cancellations (rent is renegotiated through its category lever instead)
+FIXED_CATEGORIES = ("rent_mortgage", "utilities", "healthcare")
+
+SCENARIO_COLUMNS = ["scenario", "lever", "saved_total", "saved_monthly", "savings_rate", "score", "score_delta"]
+
+
+@dataclass(frozen=True)
+class ScenarioSet:
+    """Candidate adjustments as a (scenarios x levers) matrix of fractions cut."""
+    labels: List[str]
+    levers: List[str]  # lever key per scenario, used to keep one scenario per lever when ranking
+    spend: np.ndarray  # spend per lever over the period
+    cuts: np.ndarray
+
+
+def fixed_merchants(df: Frame) -> set[str]:
+    """Merchants whose spending (matched transfers aside) is mostly in FIXED_CATEGORIES."""
+    if not {"merchant", "category"} <= set(df.lazy().collect_schema().names()):
+        return set()
+    lf = cashflow_rows(df).with_columns(amount_expr(df))
+    fixed = (
+        lf.filter((pl.col("amount") < 0) & pl.col("merchant").is_not_null())
+        .group_by(pl.col("merchant").cast(pl.String))
+        .agg((pl.col("amount").filter(pl.col("category").cast(pl.String).is_in(FIXED_CATEGORIES)).sum()
+              / pl.col("amount").sum()).alias("_share"))
+        .filter(pl.col("_share") > 0.5)
+        .collect()
+    )
+    return set(fixed["merchant"].to_list())
+
+
+def build_scenarios(
+    categories: pl.DataFrame,
+    merchants: Optional[pl.DataFrame] = None,
+    recurring: Optional[pl.DataFrame] = None,
+    months: int = 1,
+    exclude: set[str] | frozenset[str] = frozenset(),
+) -> ScenarioSet:
+    """Category cuts (single and pairwise), merchant cuts and cancellations of recurring charges.
+
+    ``exclude`` lists merchants not to adjust directly (see fixed_merchants).
+    """
+    lever_names: List[str] = []
+    spend: List[float] = []
+    rows: List[dict[int, float]] = []
+    labels: List[str] = []
+    keys: List[str] = []
+
+    def lever(name: str, amount: float) -> int:
+        lever_names.append(name)
+        spend.append(amount)
+        return len(lever_names) - 1
+
+    cat_col = categories.columns[0] if not categories.is_empty() else "category"
+    cat_index = {}
+    for row in categories.iter_rows(named=True):
+        name, amount = str(row[cat_col]), float(row["spend"] or 0.0)
+        if name in CATEGORY_CUTS and amount > 0:
+            cat_index[name] = lever(f"category:{name}", amount)
+            for pct in CATEGORY_CUTS[name]:
+                rows.append({cat_index[name]: pct})
+                labels.append(f"Cut {name} {pct:.0%}")
+                keys.append(name)
+    for a, b in combinations(sorted(cat_index), 2):
+        for pct in COMBINED_CUTS:
+            if pct in CATEGORY_CUTS[a] or pct in CATEGORY_CUTS[b]:
+                rows.append({cat_index[a]: pct, cat_index[b]: pct})
+                labels.append(f"Cut {a} and {b} {pct:.0%}")
+                keys.append(f"{a}+{b}")
+    if merchants is not None and not merchants.is_empty():
+        for row in merchants.iter_rows(named=True):
+            amount = float(row["spend"] or 0.0)
+            if row["merchant"] is None or row["merchant"] in exclude or amount <= 0:
+                continue
+            idx = lever(f"merchant:{row['merchant']}", amount)
+            for pct in MERCHANT_CUTS:
+                rows.append({idx: pct})
+                labels.append(f"Spend {pct:.0%} less at {row['merchant']}")
+                keys.append(f"merchant:{row['merchant']}")
+    if recurring is not None and not recurring.is_empty():
+        for row in recurring.filter(pl.col("active") & ~pl.col("merchant").is_in(list(exclude))).iter_rows(named=True):
+            idx = lever(f"recurring:{row['merchant']}", float(row["monthly_cost"]) * months)
+            rows.append({idx: 1.0})
+            labels.append(f"Cancel {row['merchant']} ({row['cadence']})")
+            keys.append(f"recurring:{row['merchant']}")
+
+    cuts = np.zeros((len(rows), len(lever_names)))
+    entries = [(i, j, pct) for i, row in enumerate(rows) for j, pct in row.items()]
+    if entries:
+        i, j, pct = map(np.asarray, zip(*entries))
+        cuts[i, j] = pct
+    return ScenarioSet(labels=labels, levers=keys, spend=np.asarray(spend, dtype=float), cuts=cuts)
+
+
+def evaluate_scenarios(
+    kpis: KPIs,
+    scenarios: ScenarioSet,
+    months: int = 1,
+    weights: dict[str, float] | None = None,
+) -> pl.DataFrame:
+    """Savings, savings rate and health score of every scenario, best first.
+
+    One matrix product gives each scenario's savings and the score is evaluated on the
+    resulting (income, expense) arrays, so thousands of scenarios take milliseconds.
+    """
+    if not scenarios.labels:
+        return pl.DataFrame()
+    saved = scenarios.cuts @ scenarios.spend
+    expense = np.maximum(kpis.total_expense - saved, 0.0)
+    income = np.full_like(expense, kpis.total_income)
+    savings_rate, score, _ = score_arrays(income, expense, weights)
+    _, baseline, _ = score_arrays(np.array([kpis.total_income]), np.array([kpis.total_expense]), weights)
+    return (
+        pl.DataFrame({
+            "scenario": scenarios.labels,
+            "lever": scenarios.levers,
+            "saved_total": saved.round(2),
+            "saved_monthly": (saved / max(months, 1)).round(2),
+            "savings_rate": savings_rate.round(4),
+            "score": score.round(1),
+            "score_delta": (score - baseline[0]).round(1),
+        })
+        .sort(["score_delta", "saved_total"], descending=[True, True])
+        .select(SCENARIO_COLUMNS)
+    )
+
+
+def top_scenarios(ranked: pl.DataFrame, limit: int = 8) -> pl.DataFrame:
+    """Best scenario per lever, so one category does not fill the list with its cut levels."""
+    if ranked.is_empty():
+        return ranked
+    return ranked.unique(subset="lever", keep="first", maintain_order=True).head(limit)
+
+
+def rank_scenarios(
+    agg: ReportAggregates,
+    transactions: Optional[Frame] = None,
+    recurring: Optional[pl.DataFrame] = None,
+    weights: dict[str, float] | None = None,
+) -> pl.DataFrame:
+    """Build and evaluate every scenario over the report aggregates, best first."""
+    months = max(agg.monthly.height, 1)
+    exclude = fixed_merchants(transactions) if transactions is not None else frozenset()
+    scenarios = build_scenarios(agg.categories, agg.merchants, recurring, months, exclude)
+    return evaluate_scenarios(agg.kpis, scenarios, months, weights)
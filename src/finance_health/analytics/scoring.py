@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import numpy as np
 import polars as pl
 
-from .metrics import compute_kpis
+from .metrics import Frame, KPIs, compute_kpis, monthly_cashflow
 
 
 @dataclass(frozen=True)
@@ -19,34 +20,82 @@ DEFAULT_WEIGHTS = {
 }
 
 
+# Trailing windows (in months) of the score history
+SCORE_WINDOWS = (1, 3, 12)
+
+
 def clamp(x: float, lo: float = 0.0, hi: float = 100.0) -> float:
     return max(lo, min(hi, x))
 
 
-def compute_health_score(df: pl.DataFrame, weights: dict[str, float] | None = None) -> HealthScore:
-    w = weights or DEFAULT_WEIGHTS
-    kpis = compute_kpis(df)
-
-    # Normalize components to 0..100
-    savings_rate_pct = clamp(kpis.savings_rate * 100.0, 0.0, 100.0)
-    expense_to_income = (kpis.total_expense / kpis.total_income) if kpis.total_income > 0 else 1.0
-    expense_to_income_pct = clamp((1.0 - expense_to_income) * 100.0, 0.0, 100.0)
-    net_positive_pct = clamp(100.0 if kpis.net_cashflow >= 0 else 0.0)
-
-    score = (
-        w.get("savings_rate", 0) * savings_rate_pct
-        + w.get("expense_to_income", 0) * expense_to_income_pct
-        + w.get("net_positive", 0) * net_positive_pct
+def compute_health_score(df: Frame, weights: dict[str, float] | None = None) -> HealthScore:
+    return score_from_kpis(compute_kpis(df), weights)
+
+
+def score_from_kpis(kpis: KPIs, weights: dict[str, float] | None = None) -> HealthScore:
+    # One-element case of score_arrays, which holds the formula
+    _, score, components = score_arrays(np.array([kpis.total_income]), np.array([kpis.total_expense]), weights)
+    return HealthScore(
+        score=round(float(score[0]), 1),
+        components={name: round(float(arr[0]), 2) for name, arr in components.items()},
     )
 
-    # Normalize by sum of weights
-    total_w = sum(w.values()) or 1.0
-    score /= total_w
-    score = clamp(score)
 
+def score_arrays(
+    income: np.ndarray, expense: np.ndarray, weights: dict[str, float] | None = None
+) -> tuple[np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+    """Health score of each (income, expense) pair: (savings_rate, score, components).
+
+    Components are normalized to 0..100 and the score is their weighted mean.
+    """
+    w = weights or DEFAULT_WEIGHTS
+    income, expense = np.asarray(income, dtype=float), np.asarray(expense, dtype=float)
+    positive = income > 0
+    safe_income = np.where(positive, income, 1.0)
+    savings_rate = np.where(positive, (income - expense) / safe_income, 0.0)
+    expense_to_income = np.where(positive, expense / safe_income, 1.0)
     components = {
-        "savings_rate_pct": round(savings_rate_pct, 2),
-        "expense_to_income_pct": round(expense_to_income_pct, 2),
-        "net_positive_pct": round(net_positive_pct, 2),
+        "savings_rate_pct": np.clip(savings_rate * 100.0, 0.0, 100.0),
+        "expense_to_income_pct": np.clip((1.0 - expense_to_income) * 100.0, 0.0, 100.0),
+        "net_positive_pct": np.where(income - expense >= 0, 100.0, 0.0),
     }
-    return HealthScore(score=round(score, 1), components=components)
+    score = sum(w.get(name.removesuffix("_pct"), 0) * arr for name, arr in components.items()) / (sum(w.values()) or 1.0)
+    return savings_rate, np.clip(score, 0.0, 100.0), components
+
+
+def health_score_timeseries(
+    data: Frame,
+    weights: dict[str, float] | None = None,
+    windows: tuple[int, ...] = SCORE_WINDOWS,
+) -> pl.DataFrame:
+    """Health score and components per month over trailing ``windows`` of months.
+
+    ``data`` is a monthly cashflow table (month, income, expense) or raw transactions,
+    which are grouped by month once. Months without rows count as zero, and each window
+    is a rolling sum over that single monthly table. Returns one row per (month, window_months).
+    """
+    monthly = monthly_cashflow(data) if "amount" in data.lazy().collect_schema().names() else data.lazy().collect()
+    if monthly.is_empty():
+        return pl.DataFrame()
+    months = pl.date_range(monthly["month"].min(), monthly["month"].max(), "1mo", eager=True).alias("month")
+    filled = (
+        months.to_frame()
+        .join(monthly.select(["month", "income", "expense"]), on="month", how="left")
+        .fill_null(0.0)
+        .lazy()
+    )
+    frames = [
+        filled.select([
+            pl.col("month"),
+            pl.lit(n, dtype=pl.Int32).alias("window_months"),
+            pl.col("income").rolling_sum(window_size=n, min_samples=1),
+            pl.col("expense").rolling_sum(window_size=n, min_samples=1),
+        ])
+        for n in windows
+    ]
+    sums = pl.concat(pl.collect_all(frames)).sort(["month", "window_months"])
+    _, score, components = score_arrays(sums["income"].to_numpy(), sums["expense"].to_numpy(), weights)
+    return sums.with_columns(
+        *[pl.Series(name, arr).round(2) for name, arr in components.items()],
+        pl.Series("score", score).round(1),
+    )
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import polars as pl
+
+from ..utils.logging import setup_logger
+from .metrics import Frame
+
+logger = setup_logger(__name__)
+
+TRANSFER_CATEGORY = "transfer"
+# Days between the outgoing and incoming leg of a transfer between own accounts
+TRANSFER_TOLERANCE_DAYS = 3
+
+
+def match_transfers(df: Frame, tolerance_days: int = TRANSFER_TOLERANCE_DAYS) -> pl.DataFrame:
+    """Pair debits with equal, opposite-signed credits on another account within the tolerance.
+
+    Candidate pairs come from one range join on amount in cents and the date window,
+    with legs on the debit's own account (e.g. a refund) left out before anything is
+    chosen. Pairs are then taken closest in time first, each leg in at most one pair:
+    every round accepts the candidates that are the best remaining choice for both
+    their legs. Returns (debit_row, credit_row, date, amount, from_account, to_account),
+    where the rows are positions in ``df``.
+    """
+    lf = df.lazy()
+    if "account_name" not in lf.collect_schema().names():
+        return pl.DataFrame()
+    window = timedelta(days=tolerance_days)
+    legs = (
+        lf.with_row_index("_row")
+        .filter(pl.col("amount").is_not_null() & pl.col("date").is_not_null() & pl.col("account_name").is_not_null())
+        .select([
+            pl.col("_row"),
+            pl.col("date"),
+            pl.col("account_name").cast(pl.String),
+            (pl.col("amount").abs() * 100).round().cast(pl.Int64).alias("_cents"),
+            (pl.col("amount") < 0).alias("_debit"),
+        ])
+        .filter(pl.col("_cents") > 0)
+    )
+    debits = legs.filter(pl.col("_debit")).drop("_debit")
+    credits = legs.filter(~pl.col("_debit")).select([
+        pl.col("_row").alias("credit_row"),
+        pl.col("date").alias("_credit_date"),
+        pl.col("account_name").alias("to_account"),
+        pl.col("_cents").alias("_credit_cents"),
+    ])
+    candidates = (
+        debits.join_where(
+            credits,
+            pl.col("_cents") == pl.col("_credit_cents"),
+            pl.col("_credit_date") >= pl.col("date") - window,
+            pl.col("_credit_date") <= pl.col("date") + window,
+        )
+        .filter(pl.col("account_name") != pl.col("to_account"))
+        .with_columns((pl.col("_credit_date") - pl.col("date")).dt.total_days().abs().alias("_lag"))
+        .sort(["_lag", "_row", "credit_row"])
+        .collect()
+    )
+    chosen = []
+    while not candidates.is_empty():
+        rank = pl.col("_rank")
+        best = (
+            candidates.with_row_index("_rank")
+            .filter((rank == rank.min().over("_row")) & (rank == rank.min().over("credit_row")))
+            .drop("_rank")
+        )
+        chosen.append(best)
+        candidates = candidates.filter(
+            ~pl.col("_row").is_in(best["_row"].implode()) & ~pl.col("credit_row").is_in(best["credit_row"].implode())
+        )
+    if not chosen:
+        return pl.DataFrame(schema={
+            "debit_row": pl.UInt32, "credit_row": pl.UInt32, "date": pl.Date, "amount": pl.Float64,
+            "from_account": pl.String, "to_account": pl.String,
+        })
+    return (
+        pl.concat(chosen)
+        .select([
+            pl.col("_row").alias("debit_row"),
+            pl.col("credit_row"),
+            pl.col("date"),
+            (pl.col("_cents") / 100).alias("amount"),
+            pl.col("account_name").alias("from_account"),
+            pl.col("to_account"),
+        ])
+        .sort(["date", "debit_row"])
+    )
+
+
+def tag_transfers(df: pl.DataFrame, tolerance_days: int = TRANSFER_TOLERANCE_DAYS) -> pl.DataFrame:
+    """Flag both legs of every matched transfer (``is_transfer``) and set their category to
+    'transfer'; every other row gets ``is_transfer`` False."""
+    if df.is_empty():
+        return df
+    pairs = match_transfers(df, tolerance_days)
+    rows = pl.concat([pairs["debit_row"], pairs["credit_row"]]) if not pairs.is_empty() else pl.Series([], dtype=pl.UInt32)
+    matched = pl.int_range(pl.len(), dtype=pl.UInt32).is_in(rows.implode())
+    dtype = df.schema.get("category", pl.String)
+    category = pl.col("category").cast(pl.String) if "category" in df.columns else pl.lit(None, dtype=pl.String)
+    if not pairs.is_empty():
+        logger.info("Tagged %d internal transfer(s) between accounts", pairs.height)
+    return df.with_columns(
+        pl.when(matched)
+        .then(pl.lit(TRANSFER_CATEGORY))
+        .otherwise(category)
+        .cast(dtype if dtype != pl.Null else pl.String)
+        .alias("category"),
+        matched.alias("is_transfer"),
+    )
+
+
+def paired_legs(df: pl.DataFrame, rows: pl.Expr) -> pl.Series:
+    """Mask of ``rows`` plus the other leg of every matched transfer (``is_transfer``) among them."""
+    selected = df.select(rows.fill_null(False)).to_series()
+    if "is_transfer" not in df.columns:
+        return selected
+    legs = df.with_row_index("_pos").filter(pl.col("is_transfer").fill_null(False))
+    pairs = match_transfers(legs)
+    if pairs.is_empty():
+        return selected
+    picked = legs.select(rows.fill_null(False)).to_series()
+    touched = picked.gather(pairs["debit_row"]) | picked.gather(pairs["credit_row"])
+    positions = pl.concat([pairs["debit_row"].filter(touched), pairs["credit_row"].filter(touched)])
+    partners = legs["_pos"].gather(positions)
+    return selected | pl.int_range(df.height, dtype=pl.UInt32, eager=True).is_in(partners.implode())
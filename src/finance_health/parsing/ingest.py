@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+from datetime import timedelta
 from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable, List, Set
 import polars as pl
 
 from ..settings.config import get_config
@@ -9,12 +10,19 @@ from ..storage.repository import SessionRepository
 from ..storage.sessions import create_session
 from ..analytics.report import build_report
 from ..storage.report_io import save_report
+from ..storage.aggregates import write_aggregates
+from ..storage.dataset import publish_session
+from ..storage.layout import convert_session, scan_months, scan_normalized, write_normalized
+from ..storage.search_index import build_index, drop_index, update_index
 from ..utils.logging import setup_logger
 from .readers.csv_reader import CSVReader
 from .readers.xlsx_reader import XLSXReader
 from .normalizers.base_normalizer import BaseNormalizer
 from .llm_extractor import LLMExtractor
+from .interfaces import CATEGORIES, enforce_schema
 from ..analytics.categorize import AICategorizer
+from ..analytics.fx import convert_to_base
+from ..analytics.transfers import TRANSFER_CATEGORY, TRANSFER_TOLERANCE_DAYS, paired_legs, tag_transfers
 
 logger = setup_logger(__name__)
 
@@ -29,10 +37,17 @@ class Ingestor:
         self.llm = LLMExtractor()
         self.categorizer = AICategorizer()
 
-    def ingest_files(self, files: Iterable[Path]) -> Path:
+    def _session(self):
         session = self.repo.get(self.session_id)
         assert session is not None
+        return session
+
+    def _convert(self, session) -> None:
+        # A converted session is republished whole so the dataset keeps a single schema
+        if convert_session(session):
+            publish_session(self.session_id, scan_normalized(session).collect())
 
+    def _read_files(self, files: Iterable[Path], session) -> pl.DataFrame:
         dfs: List[pl.DataFrame] = []
         for f in files:
             reader = next((r for r in self.readers if r.can_read(f)), None)
@@ -62,28 +77,121 @@ class Ingestor:
             df_all = self.categorizer.categorize(df_all, session.session_dir)
         except Exception:
             pass
-        # Ensure expected columns even if readers provided minimal schema
-        for col, dtype in {
-            "transaction_id": pl.String,
-            "date": pl.Date,
-            "amount": pl.Float64,
-            "currency": pl.String,
-            "description": pl.String,
-            "merchant": pl.String,
-            "category": pl.String,
-            "type": pl.String,
-            "account_name": pl.String,
-            "balance_after": pl.Float64,
-            "source_file": pl.String,
-            "session_id": pl.String,
-        }.items():
-            if col not in df_all.columns:
-                df_all = df_all.with_columns(pl.lit(None).cast(dtype).alias(col))
-        df_all.write_parquet(session.normalized_path)
-        logger.info("Wrote normalized parquet to %s", session.normalized_path)
-
-        # Build and persist report skeleton
-        report = build_report(self.session_id, df_all)
+        # Base-currency amounts for aggregation, one as-of join against the rate table
+        df_all = convert_to_base(df_all)
+        # Moves between the user's own accounts are transfers, not income and spending
+        df_all = tag_transfers(df_all)
+        # Ensure the normalized schema even if readers provided minimal columns
+        return enforce_schema(df_all)
+
+    def _publish(self, session, df: pl.DataFrame, months: Set[str] | None = None) -> None:
+        """Persist normalized rows, then refresh aggregates, the dataset and the report.
+
+        ``df`` is the whole session, or with ``months`` the complete rows of just those months.
+        """
+        df = enforce_schema(df)
+        write_normalized(session, df, months=months)
+        logger.info("Wrote normalized parquet to %s", session.normalized_dir)
+        monthly = write_aggregates(session, scan_normalized(session), months=months)
+        logger.info("Wrote aggregate tables to %s", session.aggregates_dir)
+        publish_session(self.session_id, df, months=months)
+
+        # Build and persist report skeleton from the compact monthly table; recurring
+        # series and anomalies need the individual transactions, read lazily from what was just written
+        report = build_report(self.session_id, monthly, scan_normalized(session))
         save_report(self.session_id, report)
         logger.info("Saved report.json for session %s", self.session_id)
-        return session.normalized_path
+        quality = report.get("ingest_quality") or {}
+        if quality.get("confidence") is not None:
+            log = logger.warning if quality["confidence"] < 0.95 else logger.info
+            log(
+                "Balance reconciliation for session %s: %.1f%% of rows reconcile, %d issue(s)",
+                self.session_id, quality["confidence"] * 100, quality["issue_count"],
+            )
+
+    def _index(self, step, session, df: pl.DataFrame) -> None:
+        # Search is best-effort; a missing index is rebuilt on first search
+        try:
+            step(session, df)
+        except Exception as e:
+            logger.warning("Search index update failed for session %s: %s", self.session_id, e)
+            # An index that missed these rows would keep answering without them
+            try:
+                drop_index(session)
+            except OSError as e:
+                logger.warning("Could not remove the search index of session %s: %s", self.session_id, e)
+
+    def ingest_files(self, files: Iterable[Path]) -> Path:
+        session = self._session()
+        # Categoricals of the files read here share codes, so they combine without remapping
+        with pl.StringCache():
+            df_all = self._read_files(files, session)
+            self._publish(session, df_all)
+        self._index(build_index, session, df_all)
+        return session.normalized_dir
+
+    def append_files(self, files: Iterable[Path]) -> Path:
+        """Add statements to an existing session; only months that gained rows are rewritten."""
+        session = self._session()
+        self._convert(session)
+        current = scan_normalized(session)
+        if current is None:
+            return self.ingest_files(files)
+        # New and stored rows are combined with shared categorical codes
+        with pl.StringCache():
+            df_new = self._read_files(files, session)
+            known = current.select("transaction_id").collect()
+            df_new = df_new.join(known, on="transaction_id", how="anti")
+            if df_new.is_empty():
+                logger.info("No new transactions for session %s", self.session_id)
+                return session.normalized_dir
+            # Months a stored leg of a new row's transfer can fall in, not just the new rows' own
+            months = _months_of(df_new, pad_days=TRANSFER_TOLERANCE_DAYS)
+            month_rows = scan_months(session, months).collect()
+            df_months = pl.concat([month_rows, df_new.select(month_rows.columns)], how="vertical_relaxed")
+            # New rows may be the other leg of a transfer already stored
+            df_months = tag_transfers(df_months)
+            self._publish(session, df_months, months=months)
+        self._index(update_index, session, df_new)
+        return session.normalized_dir
+
+    def recategorize(self, merchant: str, category: str) -> Path:
+        """Assign ``category`` to every transaction of ``merchant`` and refresh the affected months.
+
+        Raises ValueError if ``category`` is not one of CATEGORIES.
+        """
+        if category not in CATEGORIES:
+            raise ValueError(f"Unknown category {category!r}; expected one of {', '.join(CATEGORIES)}")
+        session = self._session()
+        self._convert(session)
+        current = scan_normalized(session)
+        if current is None:
+            return session.normalized_dir
+        hit = pl.col("merchant") == merchant
+        hits = current.filter(hit).select("date").collect()
+        if hits.is_empty():
+            return session.normalized_dir
+        self.categorizer.remember(session.session_dir, merchant, category)
+        # The other leg of a transfer may fall in a neighbouring month
+        months = _months_of(hits, pad_days=TRANSFER_TOLERANCE_DAYS)
+        with pl.StringCache():
+            df_months = scan_months(session, months).collect()
+            if category == TRANSFER_CATEGORY:
+                cleared = pl.lit(False)
+            else:
+                # A transfer moved out of 'transfer' by the user was no transfer: both of its
+                # legs count as cashflow again (the other leg keeps its category)
+                cleared = paired_legs(df_months, hit)
+            df_months = df_months.with_columns(
+                pl.when(hit).then(pl.lit(category)).otherwise(pl.col("category").cast(pl.String)).alias("category"),
+                pl.when(cleared).then(pl.lit(False)).otherwise(pl.col("is_transfer")).alias("is_transfer"),
+            )
+            self._publish(session, df_months, months=months)
+        return session.normalized_dir
+
+
+def _months_of(df: pl.DataFrame, pad_days: int = 0) -> Set[str]:
+    dates = df.select(pl.col("date").drop_nulls().unique()).to_series()
+    if pad_days:
+        dates = pl.concat([dates + timedelta(days=d) for d in (-pad_days, 0, pad_days)])
+    return set(dates.dt.strftime("%Y-%m").unique().to_list())
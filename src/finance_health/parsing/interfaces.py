@@ -6,21 +6,96 @@ from typing import Dict, List, Optional
 import polars as pl
 
 
-NORMALIZED_COLUMNS = [
-    "transaction_id",
-    "date",
-    "amount",
-    "currency",
-    "description",
-    "merchant",
-    "category",
-    "type",
-    "account_name",
-    "balance_after",
-    "source_file",
-    "session_id",
+CATEGORIES = [
+    "income",
+    "rent_mortgage",
+    "utilities",
+    "groceries",
+    "dining",
+    "transport",
+    "subscriptions",
+    "shopping",
+    "healthcare",
+    "fees",
+    "transfer",
+    "other",
 ]
 
+TRANSACTION_TYPES = ["debit", "credit"]
+
+# Fixed vocabularies are Enums; open-ended but highly repetitive text is Categorical.
+# Group-bys on these columns work on integer codes and each distinct string is stored once.
+NORMALIZED_SCHEMA: Dict[str, pl.DataType] = {
+    "transaction_id": pl.String,
+    "date": pl.Date,
+    "amount": pl.Float64,
+    # amount converted to BASE_CURRENCY by analytics.fx (null when no rate was available)
+    "amount_base": pl.Float64,
+    "currency": pl.Categorical,
+    "description": pl.String,
+    "merchant": pl.Categorical,
+    "category": pl.Enum(CATEGORIES),
+    "type": pl.Enum(TRANSACTION_TYPES),
+    "account_name": pl.Categorical,
+    "balance_after": pl.Float64,
+    "source_file": pl.Categorical,
+    "session_id": pl.Categorical,
+    # True on both legs of a transfer matched by analytics.transfers; only these are
+    # left out of income and spending (a 'transfer' category alone is not enough)
+    "is_transfer": pl.Boolean,
+    # Position in source_file, so same-day rows keep their statement order (analytics.reconcile)
+    "source_row": pl.UInt32,
+}
+
+NORMALIZED_COLUMNS = list(NORMALIZED_SCHEMA)
+
+
+
+def category_expr(col: str = "category") -> pl.Expr:
+    """Cast free-text categories to the CATEGORIES enum; unknown labels become 'other'."""
+    text = pl.col(col).cast(pl.String).str.strip_chars().str.to_lowercase()
+    return (
+        pl.when(text.is_in(CATEGORIES)).then(text)
+        .when(text.is_not_null()).then(pl.lit("other"))
+        .otherwise(pl.lit(None, dtype=pl.String))
+        .cast(NORMALIZED_SCHEMA["category"])
+        .alias(col)
+    )
+
+
+def type_expr(col: str = "type") -> pl.Expr:
+    """Cast transaction types to the debit/credit enum, falling back to the amount's sign."""
+    text = pl.col(col).cast(pl.String).str.strip_chars().str.to_lowercase()
+    by_sign = pl.when(pl.col("amount") < 0).then(pl.lit("debit")).when(pl.col("amount").is_not_null()).then(pl.lit("credit"))
+    return (
+        pl.when(text.is_in(TRANSACTION_TYPES)).then(text)
+        .otherwise(by_sign)
+        .cast(NORMALIZED_SCHEMA["type"])
+        .alias(col)
+    )
+
+
+def enforce_schema(df: pl.DataFrame) -> pl.DataFrame:
+    """Add missing columns, cast every column to NORMALIZED_SCHEMA and fix the column order."""
+    missing = [pl.lit(None, dtype=dtype).alias(col) for col, dtype in NORMALIZED_SCHEMA.items() if col not in df.columns]
+    if missing:
+        df = df.with_columns(missing)
+    casts = []
+    for col, dtype in NORMALIZED_SCHEMA.items():
+        if df.schema[col] == dtype:
+            continue
+        if col == "category":
+            casts.append(category_expr(col))
+        elif col == "type":
+            casts.append(type_expr(col))
+        elif dtype == pl.Categorical:
+            casts.append(pl.col(col).cast(pl.String, strict=False).cast(dtype))
+        else:
+            casts.append(pl.col(col).cast(dtype, strict=False))
+    if casts:
+        df = df.with_columns(casts)
+    return df.select(NORMALIZED_COLUMNS)
+
 
 @dataclass(frozen=True)
 class ParseResult:
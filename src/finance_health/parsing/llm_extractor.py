@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import hashlib
 from pathlib import Path
@@ -11,12 +12,20 @@ import polars as pl
 from dateparser import parse as _parse_date
 
 from ..settings.config import get_config
+from ..utils.llm import get_llm
 from ..utils.logging import setup_logger
+from ..utils.prompt_builder import chunk_rows, estimate_tokens, prompt_budget, to_csv
 from ..utils.text import clean_description, normalized_key
+from .interfaces import enforce_schema
 
 logger = setup_logger(__name__)
 
 
+# Reply tokens per extracted row (one minified JSON object); reserved in each chunk's budget
+EXTRACT_TOKENS_PER_ROW_OUT = 60
+# Extra attempts for a chunk whose request fails or whose reply holds no JSON array
+EXTRACT_RETRIES = 1
+
 JSON_FALLBACK_SCHEMA = [
     "date",
     "description",
@@ -34,24 +43,48 @@ JSON_FALLBACK_SCHEMA = [
 class LLMExtractor:
     def __post_init__(self):
         self.cfg = get_config()
-        try:
-            from ollama import Client  # type: ignore
-            self.client = Client(host=self.cfg.ollama_host)
-        except Exception as e:
-            logger.warning("Ollama not available: %s. Using deterministic fallback.", e)
-            self.client = None
+        # Shared gateway: pooled connection, keep_alive and per-model concurrency limit
+        self.client = get_llm()
+        if self.client is None:
+            logger.warning("Ollama not available. Using deterministic fallback.")
 
-    def _table_to_text(self, df: pl.DataFrame, max_rows: int = 500) -> str:
-        # Prefer pandas to ensure consistent CSV as text
-        pdf = df.head(max_rows).to_pandas()
-        return pdf.to_csv(index=False)
+    def _table_chunks(self, df: pl.DataFrame, filename: str) -> List[str]:
+        """CSV chunks of ``df`` that each fit the context window together with the
+        instructions and the JSON reply, so no row is silently truncated."""
+        fixed = [m["content"] for m in self._build_prompt(filename, "")]
+        budget = prompt_budget(self.cfg.ollama_num_ctx, 0, *fixed)
+        chunks = [to_csv(part) for part in chunk_rows(df, budget, EXTRACT_TOKENS_PER_ROW_OUT)]
+        logger.info(
+            "Extracting %s: %d row(s) in %d chunk(s), ~%d prompt tokens each (budget %d)",
+            filename, df.height, len(chunks), max((estimate_tokens(c) for c in chunks), default=0), budget,
+        )
+        return chunks
+
+    def _extract_chunk(self, filename: str, table_text: str) -> Optional[List[Dict[str, Any]]]:
+        """Rows extracted from one chunk, or None if every attempt failed."""
+        messages = self._build_prompt(filename, table_text)
+        model_name = getattr(self.cfg, "ollama_model_ingest", None) or self.cfg.ollama_model
+        for attempt in range(EXTRACT_RETRIES + 1):
+            try:
+                resp = self.client.chat(
+                    model=model_name, messages=messages, options={"num_ctx": self.cfg.ollama_num_ctx}, stream=False
+                )
+                items = self._parse_json_from_text(resp.get("message", {}).get("content", ""))
+            except Exception as e:
+                logger.error("LLM extraction of a %s chunk failed (attempt %d): %s", filename, attempt + 1, e)
+                continue
+            if items is not None:
+                return items
+            logger.warning("No JSON array in the reply for a %s chunk (attempt %d)", filename, attempt + 1)
+        return None
 
     def _build_prompt(self, filename: str, table_text: str) -> List[Dict[str, str]]:
         system = (
             "You are a local financial statement extractor. Extract transactions from the provided table text. "
             "Identify columns automatically (date, description, amount, currency, type, account_name, balance_after, merchant, category). "
             "Return strictly minified JSON only (no markdown/code fences), as an array of objects. "
-            "Dates must be ISO (YYYY-MM-DD). Amounts must be numbers (negative for debits). Currency default USD if unknown. "
+            "Dates must be ISO (YYYY-MM-DD). Amounts must be numbers (negative for debits). "
+            f"Currency as an ISO code, default {self.cfg.base_currency} if unknown. "
             "Infer merchant from description when possible. Leave category null if unsure."
         )
         user = (
@@ -64,7 +97,7 @@ class LLMExtractor:
             {"role": "user", "content": user},
         ]
 
-    def _parse_json_from_text(self, text: str) -> List[Dict[str, Any]]:
+    def _parse_json_from_text(self, text: str) -> Optional[List[Dict[str, Any]]]:
         # Try direct parse
         text = text.strip()
         try:
@@ -81,7 +114,7 @@ class LLMExtractor:
             except Exception:
                 pass
         # Nothing parsable
-        return []
+        return None
 
     def _to_polars(self, items: List[Dict[str, Any]], source_file: Path, session_id: str) -> pl.DataFrame:
         if not items:
@@ -91,7 +124,8 @@ class LLMExtractor:
         for it in items:
             obj = {k: it.get(k) for k in JSON_FALLBACK_SCHEMA}
             norm_items.append(obj)
-        df = pl.DataFrame(norm_items)
+        # Rows in the order they were extracted, which follows the statement
+        df = pl.DataFrame(norm_items).with_row_index("source_row")
         # Coerce types
         if "date" in df.columns:
             # Robust date parsing: try ISO first; fallback to dateparser for free-form
@@ -114,10 +148,11 @@ class LLMExtractor:
                 .cast(pl.Float64, strict=False)
             )
         # Defaults
+        base = self.cfg.base_currency
         if "currency" not in df.columns:
-            df = df.with_columns(pl.lit("USD").alias("currency"))
+            df = df.with_columns(pl.lit(base).alias("currency"))
         else:
-            df = df.with_columns(pl.col("currency").fill_null("USD"))
+            df = df.with_columns(pl.col("currency").cast(pl.String, strict=False).fill_null(base))
         if "description" in df.columns:
             df = df.with_columns(pl.col("description").cast(pl.String, strict=False))
             df = df.with_columns(pl.col("description").map_elements(clean_description).alias("description"))
@@ -191,28 +226,32 @@ class LLMExtractor:
             "balance_after",
             "source_file",
             "session_id",
+            "source_row",
         ]
         for col in wanted:
             if col not in df.columns:
                 df = df.with_columns(pl.lit(None).alias(col))
-        return df.select(wanted).drop_nulls(["date", "amount"])
+        return enforce_schema(df.select(wanted).drop_nulls(["date", "amount"]))
 
     def extract_to_normalized(self, df_raw: pl.DataFrame, source_file: Path, session_id: str) -> pl.DataFrame:
-        # Convert table to text
-        table_text = self._table_to_text(df_raw)
         if self.client is None:
             logger.warning("Ollama client missing; passing through with minimal coercion.")
             # Fallback: best-effort map existing df
             return self._to_polars([], source_file, session_id)
-        messages = self._build_prompt(source_file.name, table_text)
-        try:
-            model_name = getattr(self.cfg, "ollama_model_ingest", None) or self.cfg.ollama_model
-            resp = self.client.chat(model=model_name, messages=messages, stream=False)
-            content = resp.get("message", {}).get("content", "")
-        except Exception as e:
-            logger.error("LLM extraction failed: %s", e)
-            content = ""
-        items = self._parse_json_from_text(content)
+        chunks = self._table_chunks(df_raw, source_file.name)
+        # Chunks run concurrently up to the gateway's per-model limit
+        with ThreadPoolExecutor(max_workers=max(1, self.cfg.ollama_max_concurrency)) as pool:
+            results = list(pool.map(lambda text: self._extract_chunk(source_file.name, text), chunks))
+        failed = sum(r is None for r in results)
+        if failed:
+            # Rows of a failed chunk would be missing silently; the caller parses the whole
+            # file deterministically instead
+            logger.warning(
+                "LLM extraction failed for %d of %d chunk(s) of %s; not using the LLM result",
+                failed, len(results), source_file.name,
+            )
+            return pl.DataFrame()
+        items = [item for chunk_items in results for item in chunk_items]
         if not items:
             logger.warning("LLM returned no parsable items; falling back to empty result.")
         return self._to_polars(items, source_file, session_id)
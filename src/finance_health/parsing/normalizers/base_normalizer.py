@@ -5,7 +5,9 @@ import hashlib
 import polars as pl
 from datetime import datetime
 
+from ...settings.config import get_config
 from ...utils.text import clean_description, normalized_key
+from ..interfaces import enforce_schema
 
 
 class BaseNormalizer:
@@ -13,7 +15,7 @@ class BaseNormalizer:
 
     def normalize(self, df: pl.DataFrame, source_file: Path, session_id: str) -> pl.DataFrame:
         # Standardize column names
-        df = df.rename({c: c.strip().lower() for c in df.columns})
+        df = df.rename({c: c.strip().lower() for c in df.columns}).with_row_index("source_row")
 
         # Try to find date/amount/description columns with common aliases
         date_col = self._pick_column(df, ["date", "transaction date", "posted date"]) or "date"
@@ -46,7 +48,11 @@ class BaseNormalizer:
         type_col = self._pick_column(df, ["type", "debit/credit", "dr/cr"]) or None
 
         df = df.with_columns([
-            (pl.col(currency_col) if currency_col in df.columns else pl.lit("USD")).alias("currency"),
+            (
+                pl.col(currency_col).cast(pl.String).fill_null(get_config().base_currency)
+                if currency_col in df.columns
+                else pl.lit(get_config().base_currency)
+            ).alias("currency"),
             (pl.col(account_col) if account_col in df.columns else pl.lit(None)).alias("account_name"),
             (pl.col(balance_col).cast(pl.Float64) if balance_col in df.columns else pl.lit(None)).alias("balance_after"),
             (
@@ -84,7 +90,7 @@ class BaseNormalizer:
         # Select and order columns
         wanted = [
             "transaction_id", "date", "amount", "currency", "description", "merchant",
-            "category", "type", "account_name", "balance_after", "source_file", "session_id"
+            "category", "type", "account_name", "balance_after", "source_file", "session_id", "source_row"
         ]
         for col in wanted:
             if col not in df.columns:
@@ -92,8 +98,8 @@ class BaseNormalizer:
         df = df.select(wanted)
 
         # Dedupe
-        df = df.unique(subset=["transaction_id"], keep="first")
-        return df
+        df = df.unique(subset=["transaction_id"], keep="first", maintain_order=True)
+        return enforce_schema(df)
 
     def _pick_column(self, df: pl.DataFrame, candidates: list[str]) -> str | None:
         for c in candidates:
@@ -18,10 +18,17 @@ class AppConfig:
     ollama_host: str
     ollama_model: str
     ollama_model_ingest: str | None
-    advice_backend: str  # 'langchain' | 'ollama_direct'
+    advice_backend: str  # 'prefetch' | 'langchain' | 'ollama_direct'
     ollama_num_predict: int
     ollama_num_ctx: int
     ollama_temperature: float
+    ollama_keep_alive: str  # how long Ollama keeps a model loaded after a request, e.g. '30m'
+    ollama_max_concurrency: int  # concurrent requests per model through utils.llm
+    ollama_prewarm: bool
+    ollama_timeout_s: float  # per-request timeout of the utils.llm clients
+    search_embed_model: str | None  # Ollama embedding model for storage.search_index; None = hashed n-grams
+    base_currency: str
+    fx_rates_path: Path | None  # daily rate table (CSV/parquet) used by analytics.fx
 
 
 _config_singleton: Optional[AppConfig] = None
@@ -45,9 +52,9 @@ def get_config() -> AppConfig:
     ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
     ollama_model = os.getenv("OLLAMA_MODEL", "deepseek-r1:8b")
     ollama_model_ingest = os.getenv("OLLAMA_MODEL_INGEST", "llama3.2:latest")
-    advice_backend = os.getenv("ADVICE_BACKEND", "langchain").lower()
-    if advice_backend not in {"langchain", "ollama_direct"}:
-        advice_backend = "langchain"
+    advice_backend = os.getenv("ADVICE_BACKEND", "prefetch").lower()
+    if advice_backend not in {"prefetch", "langchain", "ollama_direct"}:
+        advice_backend = "prefetch"
 
     # Generation controls
     try:
@@ -63,6 +70,23 @@ def get_config() -> AppConfig:
     except Exception:
         ollama_temperature = 0.3
 
+    ollama_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m").strip() or "30m"
+    try:
+        ollama_max_concurrency = max(1, int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2")))
+    except Exception:
+        ollama_max_concurrency = 2
+    ollama_prewarm = os.getenv("OLLAMA_PREWARM", "true").strip().lower() in {"1", "true", "yes", "on"}
+    try:
+        ollama_timeout_s = max(1.0, float(os.getenv("OLLAMA_TIMEOUT_S", "600")))
+    except Exception:
+        ollama_timeout_s = 600.0
+
+    search_embed_model = os.getenv("SEARCH_EMBED_MODEL", "").strip() or None
+
+    base_currency = (os.getenv("BASE_CURRENCY", "USD").strip() or "USD").upper()
+    fx_rates_env = os.getenv("FX_RATES_PATH")
+    fx_rates_path = Path(fx_rates_env).resolve() if fx_rates_env else data_dir / "fx_rates.csv"
+
     _ensure_dirs(data_dir)
 
     _config_singleton = AppConfig(
@@ -76,5 +100,12 @@ def get_config() -> AppConfig:
         ollama_num_predict=ollama_num_predict,
         ollama_num_ctx=ollama_num_ctx,
         ollama_temperature=ollama_temperature,
+        ollama_keep_alive=ollama_keep_alive,
+        ollama_max_concurrency=ollama_max_concurrency,
+        ollama_prewarm=ollama_prewarm,
+        ollama_timeout_s=ollama_timeout_s,
+        search_embed_model=search_embed_model,
+        base_currency=base_currency,
+        fx_rates_path=fx_rates_path,
     )
     return _config_singleton
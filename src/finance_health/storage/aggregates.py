@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+import polars as pl
+
+from ..analytics.engine import FACT_DIMENSIONS, FACT_MEASURES, transaction_facts
+from ..utils.logging import setup_logger
+from .fingerprint import data_fingerprint
+from .layout import normalized_source, scan_normalized
+from .loader import session_paths
+from .schema import SessionPaths
+
+logger = setup_logger(__name__)
+
+AGGREGATES_VERSION = 5
+GRAINS = ("daily", "monthly")
+
+# Aggregates are stored as mergeable per-month partials: aggregates/daily/<YYYY-MM>.parquet
+# holds income/expense/tx_count by date, category, merchant and account for one month.
+# Sums and counts merge by addition and min/max dates by min/max, so the monthly table
+# (and the report built from it) only needs the partials of changed months recomputed.
+
+
+def month_key(month: date) -> str:
+    return month.strftime("%Y-%m")
+
+
+def _manifest_path(session: SessionPaths) -> Path:
+    return session.aggregates_dir / "manifest.json"
+
+
+def _partials_dir(session: SessionPaths) -> Path:
+    return session.aggregates_dir / "daily"
+
+
+def _partial_path(session: SessionPaths, key: str) -> Path:
+    return _partials_dir(session) / f"{key}.parquet"
+
+
+def _monthly_path(session: SessionPaths) -> Path:
+    return session.aggregates_dir / "monthly.parquet"
+
+
+def _source_fingerprint(session: SessionPaths) -> str | None:
+    source = normalized_source(session)
+    return data_fingerprint(source) if source is not None else None
+
+
+def _read_manifest(session: SessionPaths) -> dict:
+    path = _manifest_path(session)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except Exception:
+        return {}
+
+
+def _month_expr() -> pl.Expr:
+    return pl.col("date").dt.truncate("1mo")
+
+
+def _restrict_months(lf: pl.LazyFrame, months: Optional[Iterable[str]]) -> pl.LazyFrame:
+    if months is None:
+        return lf
+    return lf.filter(_month_expr().dt.strftime("%Y-%m").is_in(sorted(months)))
+
+
+def month_digests(data: pl.DataFrame | pl.LazyFrame, months: Optional[Iterable[str]] = None) -> dict[str, str]:
+    """Order-independent content digest per month, used to find months whose rows changed."""
+    lf = _restrict_months(data.lazy(), months)
+    schema = lf.collect_schema()
+    # Hash categoricals by value: their physical codes differ between processes
+    cols = [
+        pl.col(c).cast(pl.String) if dtype in (pl.Categorical, pl.Enum) else pl.col(c)
+        for c, dtype in schema.items()
+    ]
+    digests = (
+        lf.group_by(_month_expr().alias("month"))
+        .agg([pl.struct(cols).hash().sum().alias("digest"), pl.len().alias("n")])
+        .collect()
+    )
+    return {
+        month_key(row["month"]): f"{row['digest']:x}-{row['n']}"
+        for row in digests.iter_rows(named=True)
+        if row["month"] is not None
+    }
+
+
+def build_month_partials(
+    data: pl.DataFrame | pl.LazyFrame, months: Optional[Iterable[str]] = None
+) -> dict[str, pl.DataFrame]:
+    """Daily income/expense/tx_count by category, merchant and account, split by month.
+
+    When ``months`` is given only those months are scanned and aggregated.
+    """
+    facts = transaction_facts(_restrict_months(data.lazy(), months))
+    dims = [c for c in FACT_DIMENSIONS if c in facts.collect_schema() and c != "date"]
+    daily = (
+        facts.group_by(["date", "month", *dims])
+        .agg([pl.col(c).sum() for c in FACT_MEASURES])
+        .sort("date")
+        .collect()
+    )
+    daily = daily.filter(pl.col("month").is_not_null())
+    return {month_key(m): part for (m,), part in daily.partition_by("month", as_dict=True).items()}
+
+
+def merge_partials(partials: pl.LazyFrame) -> pl.LazyFrame:
+    """Merge daily partials into the monthly table (sums/counts add, dates take min/max)."""
+    dims = [c for c in FACT_DIMENSIONS if c in partials.collect_schema() and c != "date"]
+    return (
+        partials.group_by(["month", *dims])
+        .agg([
+            *[pl.col(c).sum() for c in FACT_MEASURES],
+            pl.col("date").min().alias("first_date"),
+            pl.col("date").max().alias("last_date"),
+        ])
+        .sort("month")
+    )
+
+
+def _scan_partials(session: SessionPaths) -> Optional[pl.LazyFrame]:
+    if not any(_partials_dir(session).glob("*.parquet")):
+        return None
+    return pl.scan_parquet(_partials_dir(session) / "*.parquet")
+
+
+def write_aggregates(
+    session: SessionPaths,
+    data: pl.DataFrame | pl.LazyFrame,
+    months: Optional[Iterable[str]] = None,
+) -> pl.DataFrame:
+    """Recompute the partials of ``months`` (all months when None), merge, and stamp the manifest.
+
+    ``data`` is the session's full normalized dataset (typically a lazy scan; only the
+    requested months are read from it) and must already be persisted. Returns the
+    merged monthly table.
+    """
+    manifest = _read_manifest(session)
+    full = months is None or manifest.get("version") != AGGREGATES_VERSION
+    if full:
+        digests = month_digests(data)
+        targets = set(digests)
+        stale = {p.stem for p in _partials_dir(session).glob("*.parquet")} - targets
+    else:
+        requested = set(months)
+        fresh = month_digests(data, requested)
+        digests = {k: v for k, v in (manifest.get("months") or {}).items() if k not in requested}
+        digests.update(fresh)
+        targets = set(fresh)
+        stale = requested - targets  # months that no longer have any rows
+
+    partials = build_month_partials(data, months=None if full else targets)
+    _partials_dir(session).mkdir(parents=True, exist_ok=True)
+    for key in stale:
+        _partial_path(session, key).unlink(missing_ok=True)
+    for key, part in partials.items():
+        part.write_parquet(_partial_path(session, key))
+
+    scanned = _scan_partials(session)
+    if scanned is None:
+        scanned = transaction_facts(data.lazy()).head(0)
+    monthly = merge_partials(scanned).collect()
+    monthly.write_parquet(_monthly_path(session))
+
+    _manifest_path(session).write_text(json.dumps({
+        "version": AGGREGATES_VERSION,
+        "fingerprint": _source_fingerprint(session),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "months": digests,
+    }, indent=2))
+    logger.info(
+        "Aggregates for session %s: %d/%d month partials recomputed",
+        session.id, len(partials), len(digests),
+    )
+    return monthly
+
+
+def refresh_aggregates(session: SessionPaths, data: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    """Bring aggregates in line with ``data``, recomputing only months whose content changed."""
+    manifest = _read_manifest(session)
+    previous = manifest.get("months") or {}
+    current = month_digests(data)
+    changed = {k for k in set(previous) | set(current) if previous.get(k) != current.get(k)}
+    return write_aggregates(session, data, months=changed if previous else None)
+
+
+def aggregates_fresh(session: SessionPaths) -> bool:
+    manifest = _read_manifest(session)
+    if manifest.get("version") != AGGREGATES_VERSION:
+        return False
+    fp = _source_fingerprint(session)
+    return fp is not None and manifest.get("fingerprint") == fp and _monthly_path(session).exists()
+
+
+def scan_aggregates(session_id: str, grain: str = "monthly") -> Optional[pl.LazyFrame]:
+    """Lazy scan of a materialized aggregate table, refreshing stale months first.
+
+    Returns None when the session has no normalized data.
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown aggregate grain: {grain}")
+    session = session_paths(session_id)
+    if normalized_source(session) is None:
+        return None
+    if not aggregates_fresh(session):
+        logger.info("Aggregates stale for session %s; refreshing", session_id)
+        refresh_aggregates(session, scan_normalized(session))
+    if grain == "monthly":
+        return pl.scan_parquet(_monthly_path(session))
+    scanned = _scan_partials(session)
+    return scanned if scanned is not None else pl.scan_parquet(_monthly_path(session)).head(0)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import shutil
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+from urllib.parse import quote
+
+import polars as pl
+
+from ..settings.config import get_config
+from ..utils.logging import setup_logger
+from .layout import scan_normalized
+from .repository import SessionRepository
+
+logger = setup_logger(__name__)
+
+# Hive-partitioned copy of every session's normalized data:
+#   dataset/session_id=<id>/account_name=<account>/month=<YYYY-MM>/part-0.parquet
+# Partition values live in the path only, so filters on them prune whole files and
+# pl.scan_parquet exposes all sessions as one lazily scanned table.
+PARTITION_COLUMNS = ["session_id", "account_name", "month"]
+HIVE_SCHEMA = {c: pl.String for c in PARTITION_COLUMNS}
+_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def dataset_dir() -> Path:
+    return get_config().data_dir / "dataset"
+
+
+def _encode(value: Optional[str]) -> str:
+    return _NULL_PARTITION if value is None or value == "" else quote(str(value), safe="")
+
+
+def _session_root(session_id: str) -> Path:
+    return dataset_dir() / f"session_id={_encode(session_id)}"
+
+
+def publish_session(session_id: str, df: pl.DataFrame, months: Optional[Iterable[str]] = None) -> int:
+    """Write a session's normalized rows into the partitioned dataset.
+
+    With ``months`` only those month partitions are replaced; otherwise the whole
+    session is rewritten. Returns the number of files written.
+    """
+    root = _session_root(session_id)
+    df = df.with_columns(pl.col("date").dt.strftime("%Y-%m").alias("month"))
+    if months is None:
+        if root.exists():
+            shutil.rmtree(root)
+    else:
+        months = set(months)
+        for month_dir in root.glob("account_name=*/month=*"):
+            if month_dir.name.split("=", 1)[1] in months:
+                shutil.rmtree(month_dir)
+        df = df.filter(pl.col("month").is_in(sorted(months)))
+
+    written = 0
+    for (account, month), part in df.partition_by(["account_name", "month"], as_dict=True).items():
+        if month is None:
+            continue
+        target = root / f"account_name={_encode(account)}" / f"month={month}"
+        target.mkdir(parents=True, exist_ok=True)
+        part.drop(PARTITION_COLUMNS).write_parquet(target / "part-0.parquet")
+        written += 1
+    return written
+
+
+def rebuild_dataset() -> int:
+    """Re-publish every session that has normalized data (e.g. sessions created before the dataset)."""
+    cfg = get_config()
+    count = 0
+    for session in SessionRepository(cfg.data_dir).list():
+        lf = scan_normalized(session)
+        if lf is not None:
+            publish_session(session.id, lf.collect())
+            count += 1
+    logger.info("Rebuilt dataset for %d session(s)", count)
+    return count
+
+
+def scan_history(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    session_ids: Optional[Sequence[str]] = None,
+    accounts: Optional[Sequence[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> Optional[pl.LazyFrame]:
+    """Lazy view over all sessions' transactions with session_id/account_name/month columns.
+
+    Filters are expressed on the partition columns first so whole files are skipped,
+    and ``columns`` limits what is read from the remaining ones. Returns None when
+    nothing has been published yet.
+    """
+    root = dataset_dir()
+    if not any(root.glob("session_id=*/account_name=*/month=*/*.parquet")):
+        return None
+    lf = pl.scan_parquet(root / "**" / "*.parquet", hive_partitioning=True, hive_schema=HIVE_SCHEMA)
+    if session_ids is not None:
+        lf = lf.filter(pl.col("session_id").is_in(list(session_ids)))
+    if accounts is not None:
+        lf = lf.filter(pl.col("account_name").is_in(list(accounts)))
+    if start is not None:
+        lf = lf.filter((pl.col("month") >= start.strftime("%Y-%m")) & (pl.col("date") >= start))
+    if end is not None:
+        lf = lf.filter((pl.col("month") <= end.strftime("%Y-%m")) & (pl.col("date") <= end))
+    if columns is not None:
+        lf = lf.select(list(columns))
+    return lf
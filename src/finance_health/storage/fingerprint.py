@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+
+def data_fingerprint(path: Path) -> str | None:
+    """Cheap fingerprint of a parquet file or directory of parquet files.
+
+    Built from relative path, size and mtime of every file so it can be checked on each
+    read without touching the data itself. Returns None if nothing exists at ``path``.
+    """
+    if not path.exists():
+        return None
+    files = [path] if path.is_file() else sorted(path.rglob("*.parquet"))
+    h = hashlib.sha1()
+    for f in files:
+        st = f.stat()
+        rel = f.name if f == path else f.relative_to(path).as_posix()
+        h.update(f"{rel}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import polars as pl
+
+from ..analytics.fx import convert_to_base
+from ..analytics.transfers import tag_transfers
+from ..parsing.interfaces import NORMALIZED_COLUMNS, enforce_schema
+from ..settings.config import get_config
+from ..utils.logging import setup_logger
+from .repository import SessionRepository
+from .schema import SessionPaths
+
+logger = setup_logger(__name__)
+
+# Normalized session data is stored sorted by date and partitioned by year/month:
+#   sessions/<id>/normalized/year=YYYY/month=MM/part-0.parquet
+# Files are zstd-compressed with column statistics, so date-range scans skip whole
+# partitions by path and remaining row groups by their min/max date. Sessions written
+# before this layout (a single normalized.parquet) or before a schema change (e.g. no
+# amount_base) are rewritten by convert_session()
+# (``python -m finance_health.storage.layout convert``).
+COMPRESSION = "zstd"
+COMPRESSION_LEVEL = 3
+ROW_GROUP_SIZE = 64_000
+# Every column is dictionary encoded (pyarrow falls back to plain pages when a dictionary
+# grows too large) except unique-per-row ids, where a dictionary only adds overhead
+PLAIN_COLUMNS = ["transaction_id"]
+PARTITION_COLUMNS = ["year", "month"]
+
+
+def normalized_source(session: SessionPaths) -> Optional[Path]:
+    """Partitioned directory if present, else the legacy single file, else None."""
+    if any(session.normalized_dir.glob("year=*/month=*/*.parquet")):
+        return session.normalized_dir
+    if session.normalized_path.exists():
+        return session.normalized_path
+    return None
+
+
+def _partition_dir(session: SessionPaths, year: int, month: int) -> Path:
+    return session.normalized_dir / f"year={year}" / f"month={month:02d}"
+
+
+def _write_file(df: pl.DataFrame, path: Path) -> None:
+    import pyarrow.parquet as pq
+
+    table = df.to_arrow()
+    names = table.schema.names
+    pq.write_table(
+        table,
+        path,
+        compression=COMPRESSION,
+        compression_level=COMPRESSION_LEVEL,
+        row_group_size=ROW_GROUP_SIZE,
+        write_statistics=True,
+        use_dictionary=[c for c in names if c not in PLAIN_COLUMNS],
+        sorting_columns=[pq.SortingColumn(names.index("date"))] if "date" in names else None,
+    )
+
+
+def write_normalized(session: SessionPaths, df: pl.DataFrame, months: Optional[Iterable[str]] = None) -> int:
+    """Write normalized rows in the partitioned layout.
+
+    ``df`` holds either the whole session (``months`` None: every partition is replaced)
+    or the complete rows of the given ``YYYY-MM`` months, whose partitions are replaced.
+    Returns the number of files written.
+    """
+    if months is None:
+        if session.normalized_dir.exists():
+            shutil.rmtree(session.normalized_dir)
+        targets = None
+    else:
+        targets = set(months)
+        for key in targets:
+            year, month = (int(p) for p in key.split("-"))
+            part_dir = _partition_dir(session, year, month)
+            if part_dir.exists():
+                shutil.rmtree(part_dir)
+
+    df = df.filter(pl.col("date").is_not_null()).sort("date", maintain_order=True)
+    keyed = df.with_columns([
+        pl.col("date").dt.year().alias("year"),
+        pl.col("date").dt.month().alias("month"),
+    ])
+    written = 0
+    for (year, month), part in keyed.partition_by(PARTITION_COLUMNS, as_dict=True).items():
+        if targets is not None and f"{year}-{month:02d}" not in targets:
+            continue
+        part_dir = _partition_dir(session, year, month)
+        part_dir.mkdir(parents=True, exist_ok=True)
+        _write_file(part.drop(PARTITION_COLUMNS), part_dir / "part-0.parquet")
+        written += 1
+    # A full write supersedes the legacy single-file layout
+    if months is None and session.normalized_path.exists():
+        session.normalized_path.unlink()
+    return written
+
+
+def _partitions(session: SessionPaths) -> List[tuple[tuple[int, int], Path]]:
+    out = []
+    for path in sorted(session.normalized_dir.glob("year=*/month=*/*.parquet")):
+        ym = (int(path.parent.parent.name.split("=", 1)[1]), int(path.parent.name.split("=", 1)[1]))
+        out.append((ym, path))
+    return out
+
+
+def _partition_files(session: SessionPaths, start: Optional[date], end: Optional[date]) -> List[Path]:
+    lo = (start.year, start.month) if start else None
+    hi = (end.year, end.month) if end else None
+    return [p for ym, p in _partitions(session) if (lo is None or ym >= lo) and (hi is None or ym <= hi)]
+
+
+def scan_normalized(
+    session: SessionPaths, start: Optional[date] = None, end: Optional[date] = None
+) -> Optional[pl.LazyFrame]:
+    """Lazy scan of a session's normalized rows, pruned to the partitions overlapping the range."""
+    source = normalized_source(session)
+    if source is None:
+        return None
+    if source == session.normalized_path:
+        lf = pl.scan_parquet(source)
+    else:
+        # Partition values are only in the path and are pruned here, so no hive parsing is needed
+        files = _partition_files(session, start, end) or _partition_files(session, None, None)[:1]
+        lf = pl.scan_parquet(files)
+    if start is not None:
+        lf = lf.filter(pl.col("date") >= start)
+    if end is not None:
+        lf = lf.filter(pl.col("date") <= end)
+    return lf
+
+
+def scan_months(session: SessionPaths, months: Iterable[str]) -> pl.LazyFrame:
+    """Lazy scan of exactly the given ``YYYY-MM`` partitions (empty if none of them exist)."""
+    wanted = set(months)
+    parts = _partitions(session)
+    files = [p for (y, m), p in parts if f"{y}-{m:02d}" in wanted]
+    if files:
+        return pl.scan_parquet(files)
+    if not parts:
+        raise FileNotFoundError(f"No partitioned data for session {session.id}")
+    return pl.scan_parquet(parts[0][1]).head(0)
+
+
+def convert_session(session: SessionPaths) -> bool:
+    """Rewrite a legacy normalized.parquet, or partitions missing schema columns, in the
+    current layout and schema. Returns True if converted."""
+    source = normalized_source(session)
+    if source is None:
+        return False
+    if source == session.normalized_dir:
+        if set(NORMALIZED_COLUMNS) <= set(scan_normalized(session).collect_schema().names()):
+            return False
+        # Partitions written before a schema change may differ from each other
+        df = pl.concat([pl.read_parquet(p) for _, p in _partitions(session)], how="diagonal_relaxed")
+    else:
+        df = pl.read_parquet(source)
+    df = enforce_schema(tag_transfers(convert_to_base(df)))
+    write_normalized(session, df)
+    logger.info("Converted session %s to the current layout and schema (%d rows)", session.id, df.height)
+    return True
+
+
+def convert_all_sessions() -> int:
+    cfg = get_config()
+    return sum(convert_session(s) for s in SessionRepository(cfg.data_dir).list())
+
+
+def _size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*.parquet"))
+
+
+def _timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def benchmark_layout(df: pl.DataFrame, repeat: int = 3) -> Dict[str, Any]:
+    """Compare on-disk size and scan times of the legacy single file vs the partitioned layout.
+
+    Measures a full KPI scan and a one-month date-range query over ``df``.
+    """
+    if df.is_empty():
+        raise ValueError("benchmark needs a non-empty frame")
+    last = df["date"].max()
+    start = date(last.year, last.month, 1)
+
+    def kpis(lf: pl.LazyFrame) -> pl.DataFrame:
+        return lf.select([
+            pl.col("amount").filter(pl.col("amount") > 0).sum(),
+            pl.col("amount").filter(pl.col("amount") < 0).sum().alias("expense"),
+        ]).collect()
+
+    with tempfile.TemporaryDirectory(prefix="fh_bench_") as tmp:
+        session = SessionPaths(id="bench", data_dir=Path(tmp))
+        session.session_dir.mkdir(parents=True)
+        df.write_parquet(session.normalized_path)
+        legacy = {
+            "bytes": _size(session.normalized_path),
+            "full_scan_s": _timed(lambda: kpis(pl.scan_parquet(session.normalized_path)), repeat),
+            "month_scan_s": _timed(
+                lambda: kpis(pl.scan_parquet(session.normalized_path).filter(pl.col("date") >= start)), repeat
+            ),
+        }
+        write_normalized(session, df)
+        partitioned = {
+            "bytes": _size(session.normalized_dir),
+            "full_scan_s": _timed(lambda: kpis(scan_normalized(session)), repeat),
+            "month_scan_s": _timed(lambda: kpis(scan_normalized(session, start=start)), repeat),
+        }
+    return {"rows": df.height, "legacy": legacy, "partitioned": partitioned}
+
+
+def _main(argv: List[str]) -> None:
+    usage = "usage: python -m finance_health.storage.layout (convert | benchmark <session_id>)"
+    if not argv:
+        print(usage)
+        return
+    if argv[0] == "convert":
+        from .dataset import rebuild_dataset
+
+        converted = convert_all_sessions()
+        if converted:
+            rebuild_dataset()
+        print(f"Converted {converted} session(s)")
+    elif argv[0] == "benchmark" and len(argv) == 2:
+        session = SessionRepository(get_config().data_dir).get(argv[1])
+        source = normalized_source(session) if session else None
+        if source is None:
+            print(f"No normalized data for session {argv[1]}")
+            return
+        result = benchmark_layout(scan_normalized(session).collect())
+        print(f"rows: {result['rows']}")
+        for name in ("legacy", "partitioned"):
+            r = result[name]
+            print(
+                f"{name:>12}: {r['bytes'] / 1e6:8.2f} MB  full scan {r['full_scan_s'] * 1e3:8.1f} ms  "
+                f"month scan {r['month_scan_s'] * 1e3:8.1f} ms"
+            )
+    else:
+        print(usage)
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+from datetime import date
 from pathlib import Path
+from typing import Optional, Sequence
 import polars as pl
 
+from .layout import scan_normalized
 from .repository import SessionRepository
+from .schema import SessionPaths
 from ..settings.config import get_config
 
 
@@ -13,8 +17,35 @@ def get_session(session_id: str):
     return repo.get(session_id)
 
 
-def load_normalized_df(session_id: str) -> pl.DataFrame:
-    session = get_session(session_id)
-    if session is None or not session.normalized_path.exists():
+def session_paths(session_id: str) -> SessionPaths:
+    # Paths derive from DATA_DIR and the id alone; no SQLite round-trip on the read path
+    return SessionPaths(id=session_id, data_dir=get_config().data_dir)
+
+
+def scan_session(
+    session_id: str,
+    columns: Optional[Sequence[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    accounts: Optional[Sequence[str]] = None,
+) -> Optional[pl.LazyFrame]:
+    """Lazy view of a session's normalized transactions, or None if it has no data.
+
+    ``start``/``end`` (inclusive) prune month partitions and row groups, ``accounts``
+    filters on account_name, and ``columns`` restricts what is read from disk.
+    """
+    lf = scan_normalized(session_paths(session_id), start=start, end=end)
+    if lf is None:
+        return None
+    if accounts is not None:
+        lf = lf.filter(pl.col("account_name").is_in(list(accounts)))
+    if columns is not None:
+        lf = lf.select(list(columns))
+    return lf
+
+
+def load_normalized_df(session_id: str, columns: Optional[Sequence[str]] = None) -> pl.DataFrame:
+    lf = scan_session(session_id, columns=columns)
+    if lf is None:
         return pl.DataFrame()
-    return pl.read_parquet(session.normalized_path)
+    return lf.collect()
@@ -15,5 +15,9 @@ def reset_database_and_sessions() -> None:
     sessions_dir = cfg.data_dir / "sessions"
     if sessions_dir.exists():
         shutil.rmtree(sessions_dir)
+    # Remove the cross-session dataset derived from them
+    dataset_dir = cfg.data_dir / "dataset"
+    if dataset_dir.exists():
+        shutil.rmtree(dataset_dir)
     # Recreate base directories
     sessions_dir.mkdir(parents=True, exist_ok=True)
@@ -3,11 +3,15 @@ from __future__ import annotations
 import json
 from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from .repository import SessionRepository
+from .session_cache import session_fingerprint
 from ..settings.config import get_config
 
+if TYPE_CHECKING:
+    from ..advice.graph import AdviceResult
+
 
 def _get_paths(session_id: str):
     cfg = get_config()
@@ -35,3 +39,18 @@ def load_report(session_id: str) -> Optional[Dict[str, Any]]:
     if not report_path.exists():
         return None
     return json.loads(report_path.read_text())
+
+
+def save_advice_result(session_id: str, result: AdviceResult) -> None:
+    """Store advice and score in the session report, stamped with the data fingerprint."""
+    report = load_report(session_id) or {}
+    report["health_score"] = {"score": result.score, "components": result.components}
+    report["advice"] = result.advice_markdown
+    report["advice_fingerprint"] = session_fingerprint(session_id)
+    save_report(session_id, report)
+
+
+def advice_current(session_id: str) -> bool:
+    """True when the report holds advice generated from the session's current data."""
+    report = load_report(session_id) or {}
+    return bool(report.get("advice")) and report.get("advice_fingerprint") == session_fingerprint(session_id)
@@ -7,11 +7,10 @@ from typing import Optional
 
 
 @dataclass(frozen=True)
-class Session:
+class SessionPaths:
+    """Filesystem layout of a session; needs no metadata DB lookup to construct."""
+
     id: str
-    created_at: datetime
-    title: Optional[str]
-    notes: Optional[str]
     data_dir: Path
 
     @property
@@ -30,6 +29,25 @@ class Session:
     def normalized_path(self) -> Path:
         return self.session_dir / "normalized.parquet"
 
+    @property
+    def normalized_dir(self) -> Path:
+        return self.session_dir / "normalized"
+
+    @property
+    def aggregates_dir(self) -> Path:
+        return self.session_dir / "aggregates"
+
+    @property
+    def search_dir(self) -> Path:
+        return self.session_dir / "search"
+
     @property
     def report_path(self) -> Path:
         return self.session_dir / "report.json"
+
+
+@dataclass(frozen=True)
+class Session(SessionPaths):
+    created_at: datetime
+    title: Optional[str]
+    notes: Optional[str]
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import json
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import polars as pl
+
+from ..settings.config import get_config
+from ..utils.llm import get_llm
+from ..utils.logging import setup_logger
+from .layout import normalized_source, scan_months, scan_normalized
+from .schema import SessionPaths
+
+logger = setup_logger(__name__)
+
+# Search index over merchant + description, beside the session parquet:
+#   sessions/<id>/search/meta.json                       backend, dim, texts per segment
+#   sessions/<id>/search/segment-NNNNN/texts.parquet     distinct normalized texts
+#   sessions/<id>/search/segment-NNNNN/vectors.f32       float32 (dim, texts), L2-normalized
+#   sessions/<id>/search/segment-NNNNN/postings.parquet  transaction_id, date, text_id
+# Statements repeat the same descriptions, so vectors are kept per distinct text. A build
+# writes one segment; each append adds a segment with the new transactions and vectors
+# for texts not indexed yet. Vectors are stored dimension-major and memory-mapped: a
+# hashed query has a few dozen non-zero buckets, so scoring reads only those rows.
+HASH_DIM = 512
+# Texts vectorized per step; bounds the temporary count matrix
+HASH_BATCH = 16_384
+# Texts vectorized and written per step when building a segment; bounds memory
+VECTOR_BLOCK = 65_536
+EMBED_BATCH = 256
+# Postings are sorted by text_id in small row groups, so a lookup skips most of them
+POSTINGS_ROW_GROUP = 16_384
+HASHED_BACKEND = "hashed-3gram"
+# Hits at or below this cosine similarity are dropped. Texts sharing no trigram score
+# about 0 (a bucket collision reaches ~0.15), while a word or a typo of one scores 0.3+
+SEARCH_MIN_SCORE = 0.2
+
+_TEXT_EXPR = (
+    pl.concat_str([pl.col("merchant").cast(pl.String), pl.col("description")], separator=" ", ignore_nulls=True)
+    .str.to_lowercase()
+    .str.replace_all(r"[^\w]+", " ")
+    .str.strip_chars()
+    .alias("text")
+)
+
+
+@dataclass(frozen=True)
+class IndexMeta:
+    backend: str  # HASHED_BACKEND or 'ollama:<model>'
+    dim: int
+    segments: List[int]  # distinct texts per segment; text ids continue across segments
+
+    @property
+    def texts(self) -> int:
+        return sum(self.segments)
+
+
+def _meta_path(session: SessionPaths) -> Path:
+    return session.search_dir / "meta.json"
+
+
+def _segment_dir(session: SessionPaths, segment: int) -> Path:
+    return session.search_dir / f"segment-{segment:05d}"
+
+
+def load_meta(session: SessionPaths) -> Optional[IndexMeta]:
+    try:
+        return IndexMeta(**json.loads(_meta_path(session).read_text()))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _save_meta(session: SessionPaths, meta: IndexMeta) -> None:
+    # Written last: readers only see segments the meta lists
+    tmp = _meta_path(session).with_suffix(".tmp")
+    tmp.write_text(json.dumps(asdict(meta)))
+    tmp.replace(_meta_path(session))
+
+
+def _configured_backend() -> str:
+    model = get_config().search_embed_model
+    return f"ollama:{model}" if model else HASHED_BACKEND
+
+
+def hash_vectors(texts: List[str], dim: int = HASH_DIM) -> np.ndarray:
+    """L2-normalized counts of byte trigrams of " text ", signed-hashed into ``dim`` buckets;
+    dimension-major (``dim`` x texts).
+
+    Fully vectorized: all texts of a batch are laid out in one byte buffer and trigrams
+    that would span two texts are masked out.
+    """
+    out = np.zeros((dim, len(texts)), dtype=np.float32)
+    for lo in range(0, len(texts), HASH_BATCH):
+        batch = [f" {t} ".encode("utf-8") for t in texts[lo:lo + HASH_BATCH]]
+        lengths = np.fromiter((len(b) for b in batch), dtype=np.int64, count=len(batch))
+        buf = np.frombuffer(b"".join(batch), dtype=np.uint8).astype(np.uint32)
+        owner = np.repeat(np.arange(len(batch)), lengths)
+        if buf.size < 3:
+            continue
+        valid = owner[:-2] == owner[2:]
+        codes = (buf[:-2] << 16 | buf[1:-1] << 8 | buf[2:])[valid]
+        rows = owner[:-2][valid]
+        # Knuth multiplicative hash; high bits pick the bucket, the lowest bit the sign
+        h = (codes * np.uint32(2654435761)).astype(np.uint32)
+        buckets = (h >> np.uint32(8)) % np.uint32(dim)
+        signs = np.where(h & np.uint32(1), 1.0, -1.0)
+        counts = np.bincount(buckets.astype(np.int64) * len(batch) + rows, weights=signs, minlength=dim * len(batch))
+        out[:, lo:lo + len(batch)] = counts.reshape(dim, len(batch))
+    norms = np.linalg.norm(out, axis=0, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+def _embed_vectors(texts: List[str], model: str) -> np.ndarray:
+    llm = get_llm()
+    if llm is None:
+        raise ValueError("Ollama is not available for embeddings")
+    parts = [np.asarray(llm.embed(model, texts[i:i + EMBED_BATCH]), dtype=np.float32)
+             for i in range(0, len(texts), EMBED_BATCH)]
+    out = np.concatenate(parts).T if parts else np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(out, axis=0, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+def _vectorize(texts: List[str], backend: str) -> np.ndarray:
+    """Unit vectors of ``texts``, dimension-major."""
+    if backend == HASHED_BACKEND:
+        return hash_vectors(texts)
+    return _embed_vectors(texts, backend.split(":", 1)[1])
+
+
+def _postings(df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    return df.lazy().select("transaction_id", "date", _TEXT_EXPR).collect()
+
+
+def _write_vectors(path: Path, texts: List[str], backend: str, dim: int) -> int:
+    """Vectorize ``texts`` block by block into a dimension-major float32 file; returns the
+    dimension (``dim`` when there are no texts)."""
+    out = None
+    for lo in range(0, len(texts), VECTOR_BLOCK):
+        block = _vectorize(texts[lo:lo + VECTOR_BLOCK], backend)
+        if out is None:
+            dim = block.shape[0]
+            out = np.memmap(path, dtype=np.float32, mode="w+", shape=(dim, len(texts)))
+        elif block.shape[0] != dim:
+            raise ValueError(f"embedding size changed from {dim} to {block.shape[0]}")
+        out[:, lo:lo + block.shape[1]] = block
+    if out is None:
+        path.write_bytes(b"")
+    else:
+        out.flush()
+    return dim
+
+
+def _write_segment(
+    session: SessionPaths, segment: int, postings: pl.DataFrame, texts: pl.DataFrame, backend: str, dim: int, offset: int
+) -> int:
+    """Write a segment for ``texts`` (new to the index) and ``postings`` (which may also
+    point at texts of earlier segments). Returns the vector dimension."""
+    seg_dir = _segment_dir(session, segment)
+    if seg_dir.exists():
+        shutil.rmtree(seg_dir)  # left over from an interrupted write
+    seg_dir.mkdir(parents=True)
+    dim = _write_vectors(seg_dir / "vectors.f32", texts["text"].to_list(), backend, dim)
+    texts.write_parquet(seg_dir / "texts.parquet")
+    ids = _text_ids(session, segment).vstack(texts.with_row_index("text_id", offset=offset))
+    postings.join(ids, on="text", how="left").select(
+        "transaction_id", "date", pl.col("text_id").cast(pl.UInt32)
+    ).sort("text_id").write_parquet(seg_dir / "postings.parquet", row_group_size=POSTINGS_ROW_GROUP)
+    return dim
+
+
+def _text_ids(session: SessionPaths, segments: int) -> pl.DataFrame:
+    """(text_id, text) of the first ``segments`` segments."""
+    files = [_segment_dir(session, i) / "texts.parquet" for i in range(segments)]
+    if not files:
+        return pl.DataFrame(schema={"text_id": pl.UInt32, "text": pl.String})
+    return pl.scan_parquet(files).with_row_index("text_id").collect()
+
+
+def build_index(session: SessionPaths, df: pl.DataFrame | pl.LazyFrame | None = None) -> Optional[IndexMeta]:
+    """(Re)build the session's index from ``df`` (default: all of its normalized rows)."""
+    started = time.perf_counter()
+    if df is None:
+        df = scan_normalized(session)
+        if df is None:
+            return None
+    postings = _postings(df)
+    texts = postings.select(pl.col("text").unique(maintain_order=True))
+    backend = _configured_backend()
+    drop_index(session)
+    try:
+        dim = _write_segment(session, 0, postings, texts, backend, HASH_DIM, offset=0)
+    except Exception as e:
+        if backend == HASHED_BACKEND:
+            raise
+        logger.warning("Embedding with %s failed (%s); using hashed n-grams", backend, e)
+        backend = HASHED_BACKEND
+        dim = _write_segment(session, 0, postings, texts, backend, HASH_DIM, offset=0)
+    meta = IndexMeta(backend=backend, dim=dim, segments=[texts.height])
+    _save_meta(session, meta)
+    logger.info(
+        "Indexed %d transaction(s), %d distinct text(s) for search in %.2fs",
+        postings.height, texts.height, time.perf_counter() - started,
+    )
+    return meta
+
+
+def drop_index(session: SessionPaths) -> None:
+    """Delete the session's index; the next search rebuilds it from the normalized rows."""
+    if session.search_dir.exists():
+        shutil.rmtree(session.search_dir)
+
+
+def update_index(session: SessionPaths, df_new: pl.DataFrame | pl.LazyFrame) -> Optional[IndexMeta]:
+    """Add newly appended rows as a segment, vectorizing only texts not indexed yet.
+
+    Falls back to a full build when there is no index yet or the backend changed.
+    """
+    meta = load_meta(session)
+    if meta is None or meta.backend != _configured_backend():
+        return build_index(session)
+    postings = _postings(df_new)
+    if postings.is_empty():
+        return meta
+    known = _text_ids(session, len(meta.segments))
+    unseen = postings.select(pl.col("text").unique(maintain_order=True)).join(known, on="text", how="anti")
+    dim = _write_segment(session, len(meta.segments), postings, unseen, meta.backend, meta.dim, meta.texts)
+    if dim != meta.dim:
+        logger.warning("Embedding size changed (%d -> %d); rebuilding the search index", meta.dim, dim)
+        return build_index(session)
+    meta = IndexMeta(backend=meta.backend, dim=meta.dim, segments=[*meta.segments, unseen.height])
+    _save_meta(session, meta)
+    logger.info("Added %d transaction(s), %d new text(s) to the search index", postings.height, unseen.height)
+    return meta
+
+
+def _scores(session: SessionPaths, meta: IndexMeta, q: np.ndarray) -> np.ndarray:
+    """Cosine similarity of ``q`` to every indexed text."""
+    nz = np.flatnonzero(q)
+    sparse = nz.size < meta.dim // 2
+    scores = np.empty(meta.texts, dtype=np.float32)
+    offset = 0
+    for i, n in enumerate(meta.segments):
+        if n:
+            vectors = np.memmap(_segment_dir(session, i) / "vectors.f32", dtype=np.float32, mode="r", shape=(meta.dim, n))
+            scores[offset:offset + n] = q[nz] @ vectors[nz] if sparse else q @ vectors
+        offset += n
+    return scores
+
+
+def search(session: SessionPaths, query: str, k: int = 20) -> pl.DataFrame:
+    """Top ``k`` transactions by cosine similarity of their merchant/description to ``query``.
+
+    Returns the transactions' normalized rows with a ``score`` column, best first; empty
+    when the session has no data. The index is built on first use if missing.
+    """
+    meta = load_meta(session) or build_index(session)
+    text = pl.select(pl.lit(query).alias("description"), pl.lit(None, pl.String).alias("merchant")).select(_TEXT_EXPR).item()
+    if meta is None or meta.texts == 0 or not text:
+        return pl.DataFrame()
+    scores = _scores(session, meta, _vectorize([text], meta.backend)[:, 0])
+    # Every text has at least one transaction, so the best k texts hold the best k rows
+    top = np.argpartition(-scores, k - 1)[:k] if scores.size > k else np.arange(scores.size)
+    top = top[scores[top] > SEARCH_MIN_SCORE]
+    if top.size == 0:
+        return pl.DataFrame()
+    hits = pl.DataFrame({"text_id": top.astype(np.uint32), "score": scores[top]})
+    postings = [_segment_dir(session, i) / "postings.parquet" for i in range(len(meta.segments))]
+    matched = (
+        pl.scan_parquet(postings)
+        .filter(pl.col("text_id").is_in(hits["text_id"].to_list()))
+        .join(hits.lazy(), on="text_id")
+        .sort(["score", "date"], descending=True)
+        .head(k)
+        .collect()
+    )
+    if matched.is_empty():
+        return pl.DataFrame()
+    # Only the month partitions holding a hit are read
+    months = matched["date"].dt.strftime("%Y-%m").unique().to_list()
+    source = scan_months(session, months) if normalized_source(session) == session.normalized_dir else scan_normalized(session)
+    rows = (
+        source.filter(pl.col("transaction_id").is_in(matched["transaction_id"].to_list()))
+        .join(matched.lazy().select("transaction_id", "score"), on="transaction_id")
+        .sort(["score", "date"], descending=True)
+        .collect()
+    )
+    return rows.select("score", pl.exclude("score"))
+
+
+def _main(argv: List[str]) -> None:
+    from .loader import session_paths
+
+    usage = "usage: python -m finance_health.storage.search_index (build <session_id> | search <session_id> <query>)"
+    if len(argv) == 2 and argv[0] == "build":
+        meta = build_index(session_paths(argv[1]))
+        print(meta if meta else f"No normalized data for session {argv[1]}")
+    elif len(argv) >= 3 and argv[0] == "search":
+        t0 = time.perf_counter()
+        result = search(session_paths(argv[1]), " ".join(argv[2:]))
+        print(result.select([c for c in ("score", "date", "merchant", "description", "amount") if c in result.columns]))
+        print(f"{(time.perf_counter() - t0) * 1e3:.1f} ms")
+    else:
+        print(usage)
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
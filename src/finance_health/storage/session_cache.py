@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+import polars as pl
+
+from ..utils.logging import setup_logger
+from .fingerprint import data_fingerprint
+from .layout import normalized_source
+from .loader import session_paths
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Upper bound on the estimated size of everything memoized in this process
+SESSION_CACHE_BUDGET_BYTES = 256 * 1024 * 1024
+
+# Per-process memo of session data and derived tables, keyed by (session_id, name).
+# Each entry records the fingerprint of the session's normalized parquet (paths, sizes,
+# mtimes) it was computed from; a lookup recomputes it when the files changed. Entries
+# are evicted least recently used first once the byte budget is exceeded.
+
+
+@dataclass
+class _Entry:
+    fingerprint: Optional[str]
+    value: Any
+    nbytes: int
+
+
+_entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+_total_bytes = 0
+_lock = threading.Lock()
+# One lock per key so concurrent callers (e.g. prefetched advice tools) share a computation
+_key_locks: dict[Tuple[str, str], threading.Lock] = {}
+
+
+def session_fingerprint(session_id: str) -> Optional[str]:
+    source = normalized_source(session_paths(session_id))
+    return data_fingerprint(source) if source is not None else None
+
+
+def _estimate_size(value: Any) -> int:
+    if isinstance(value, pl.DataFrame):
+        return int(value.estimated_size())
+    if is_dataclass(value) and not isinstance(value, type):
+        return sum(_estimate_size(getattr(value, f.name)) for f in fields(value))
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _drop(key: Tuple[str, str]) -> None:
+    global _total_bytes
+    entry = _entries.pop(key, None)
+    if entry is not None:
+        _total_bytes -= entry.nbytes
+
+
+def memoize(session_id: str, name: str, compute: Callable[[], T]) -> T:
+    """``compute()`` for this session, reused until the session's data changes.
+
+    Concurrent misses for the same key compute once; the others wait for the result.
+    Values must be treated as read-only: the same object is handed to every caller.
+    """
+    key = (session_id, name)
+    fingerprint = session_fingerprint(session_id)
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None and entry.fingerprint == fingerprint:
+                _entries.move_to_end(key)
+                return entry.value
+        value = compute()
+        _store(key, _Entry(fingerprint, value, _estimate_size(value)), name)
+    return value
+
+
+def _store(key: Tuple[str, str], entry: _Entry, name: str) -> None:
+    global _total_bytes
+    with _lock:
+        _drop(key)
+        if entry.nbytes > SESSION_CACHE_BUDGET_BYTES:
+            logger.info("Not caching %s for session %s: %d bytes exceeds the budget", name, key[0], entry.nbytes)
+            return
+        _entries[key] = entry
+        _total_bytes += entry.nbytes
+        while _total_bytes > SESSION_CACHE_BUDGET_BYTES:
+            _drop(next(iter(_entries)))
+
+
+def invalidate(session_id: Optional[str] = None) -> None:
+    """Forget cached values for one session, or for all sessions."""
+    with _lock:
+        for key in [k for k in _entries if session_id is None or k[0] == session_id]:
+            _drop(key)
+
+
+def cache_stats() -> dict[str, int]:
+    with _lock:
+        return {"entries": len(_entries), "bytes": _total_bytes, "budget_bytes": SESSION_CACHE_BUDGET_BYTES}
@@ -14,6 +14,11 @@ if _p.name == "src" and str(_p) not in sys.path:
 
 st.set_page_config(page_title="Finance Health", layout="wide")
 
+from finance_health.utils.llm import prewarm_models  # noqa: E402
+
+# Loads the ingest and advice models in the background once per process
+prewarm_models()
+
 st.title("🏦 Finance Health (Local)")
 st.caption("Import CSV/XLSX → analyze with Polars → local AI advice → Streamlit dashboards")
 
@@ -22,6 +27,7 @@ if hasattr(st, "page_link"):
     st.page_link("pages/02_dashboard.py", label="Dashboard", icon="📊")
     st.page_link("pages/03_advice.py", label="Advice", icon="🧠")
     st.page_link("pages/04_sessions.py", label="Sessions", icon="🗂️")
+    st.page_link("pages/06_ask.py", label="Ask", icon="🔎")
     st.page_link("pages/05_settings.py", label="Settings", icon="⚙️")
 else:
     st.write("Use the left sidebar 'Pages' to navigate.")
@@ -52,3 +52,25 @@ def categories_chart(df: pl.DataFrame, title: str = "Top Categories/Merchants"):
         .properties(title=title, height=300)
     )
     return chart
+
+
+def health_score_chart(df: pl.DataFrame):
+    """Health score per month, one line per trailing window (analytics.scoring.health_score_timeseries)."""
+    if df.is_empty():
+        return None
+    pdf = df.with_columns((pl.col("window_months").cast(pl.Utf8) + "-month").alias("window")).to_pandas()
+    selector = alt.selection_point(fields=["window"], bind="legend")
+    chart = (
+        alt.Chart(pdf)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("month:T", title="Month"),
+            y=alt.Y("score:Q", title="Health score", scale=alt.Scale(domain=[0, 100])),
+            color=alt.Color("window:N", title="Window", sort=["1-month", "3-month", "12-month"]),
+            opacity=alt.condition(selector, alt.value(1.0), alt.value(0.25)),
+            tooltip=["month:T", "window:N", "score:Q", "savings_rate_pct:Q", "expense_to_income_pct:Q"],
+        )
+        .add_params(selector)
+        .properties(height=280)
+    )
+    return chart
@@ -14,6 +14,7 @@ import tempfile
 import streamlit as st
 
 from finance_health.parsing.ingest import Ingestor
+from finance_health.storage.report_io import load_report
 from finance_health.storage.sessions import create_session
 from finance_health.ui.state import set_session_id
 
@@ -52,6 +53,19 @@ if uploaded_files:
                 parquet_path = ingestor.ingest_files(paths)
         st.success(f"Processed {len(paths)} file(s). Session: {sid}")
         st.caption(f"Saved normalized data: {parquet_path}")
+        quality = (load_report(sid) or {}).get("ingest_quality") or {}
+        if quality.get("confidence") is not None:
+            confidence = quality["confidence"]
+            message = f"Running balances reconcile for {confidence:.1%} of rows."
+            if confidence < 0.95:
+                st.warning(message + " Some rows may be missing, duplicated or have the wrong sign.")
+            else:
+                st.caption(message)
+            st.dataframe(quality["accounts"], use_container_width=True, hide_index=True)
+            if quality["issues"]:
+                count = quality.get("issue_count", len(quality["issues"]))
+                with st.expander(f"Rows that do not reconcile ({count})"):
+                    st.dataframe(quality["issues"], use_container_width=True, hide_index=True)
         if hasattr(st, "page_link"):
             st.page_link("pages/02_dashboard.py", label="Go to Dashboard", icon="👉")
         else:
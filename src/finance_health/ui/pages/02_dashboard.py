@@ -3,11 +3,15 @@ from __future__ import annotations
 import streamlit as st
 import polars as pl
 
-from finance_health.storage.loader import load_normalized_df
-from finance_health.analytics.metrics import compute_kpis, monthly_cashflow, category_breakdown, top_merchants
-from finance_health.analytics.scoring import compute_health_score
+from finance_health.storage.aggregates import scan_aggregates
+from finance_health.storage.loader import scan_session
+from finance_health.analytics.anomalies import detect_anomalies
+from finance_health.analytics.forecast import forecast_cashflow
+from finance_health.analytics.recurring import detect_recurring
+from finance_health.analytics.engine import compute_report_aggregates
 from finance_health.ui.components.kpi import render_kpis
-from finance_health.ui.components.charts import monthly_cashflow_chart, categories_chart
+from finance_health.analytics.scoring import health_score_timeseries
+from finance_health.ui.components.charts import monthly_cashflow_chart, categories_chart, health_score_chart
 from finance_health.ui.state import get_session_id
 
 st.title("📊 Dashboard")
@@ -18,34 +22,59 @@ if not sid:
     st.stop()
 
 with st.spinner("Loading data..."):
-    df = load_normalized_df(sid)
+    facts = scan_aggregates(sid)
 
-if df.is_empty():
+if facts is None:
     st.info("No data available for this session yet.")
     st.stop()
 
-kpis = compute_kpis(df)
-render_kpis(kpis)
+agg = compute_report_aggregates(facts)
+render_kpis(agg.kpis)
 
-month_df = monthly_cashflow(df)
+month_df = agg.monthly
 chart = monthly_cashflow_chart(month_df)
 if chart is not None:
     st.subheader("Monthly Cashflow")
     st.altair_chart(chart, use_container_width=True)
 
-cats = category_breakdown(df)
+cats = agg.categories
 cat_chart = categories_chart(cats, title="Top Categories/Merchants")
 if cat_chart is not None:
     st.subheader("Spending Breakdown")
     st.altair_chart(cat_chart, use_container_width=True)
 
-merchants = top_merchants(df)
+merchants = agg.merchants
 mer_chart = categories_chart(merchants, title="Top Merchants by Spend")
 if mer_chart is not None:
     st.subheader("Top Merchants")
     st.altair_chart(mer_chart, use_container_width=True)
 
-score = compute_health_score(df)
+rows = scan_session(sid, columns=["date", "merchant", "category", "amount", "amount_base", "is_transfer"])
+recurring = detect_recurring(rows) if rows is not None else pl.DataFrame()
+if not recurring.is_empty():
+    st.subheader("Recurring Charges")
+    active = recurring.filter(pl.col("active"))
+    st.caption(f"{active.height} active series, about ${active['monthly_cost'].sum():,.2f} per month")
+    st.dataframe(recurring.to_pandas(), use_container_width=True, hide_index=True)
+
+forecast = forecast_cashflow(facts, recurring)
+if not forecast.is_empty():
+    st.subheader("Cashflow Outlook")
+    short = forecast.filter(pl.col("net_lo") < 0)
+    if not short.is_empty():
+        st.warning(f"Net cashflow could turn negative in {short.height} of the next {forecast.height} months.")
+    st.dataframe(forecast.to_pandas(), use_container_width=True, hide_index=True)
+
+anomalies = detect_anomalies(rows, limit=20) if rows is not None else pl.DataFrame()
+if not anomalies.is_empty():
+    st.subheader("Watchouts")
+    st.dataframe(anomalies.to_pandas(), use_container_width=True, hide_index=True)
+
+score = agg.score
 st.subheader("Health Score")
 st.metric("Score", f"{score.score}")
 st.json(score.components)
+history_chart = health_score_chart(health_score_timeseries(month_df))
+if history_chart is not None:
+    st.caption("Score trend by month, over trailing 1/3/12-month windows")
+    st.altair_chart(history_chart, use_container_width=True)
@@ -2,9 +2,9 @@ from __future__ import annotations
 
 import streamlit as st
 
-from finance_health.storage.loader import load_normalized_df
-from finance_health.storage.report_io import load_report, save_report
-from finance_health.advice.graph import AdviceEngine
+from finance_health.storage.loader import scan_session
+from finance_health.storage.report_io import load_report, save_advice_result
+from finance_health.advice.graph import AdviceEngine, AdviceResult
 from finance_health.ui.state import get_session_id
 
 st.title("🧠 Advice")
@@ -14,38 +14,43 @@ if not sid:
     st.warning("No active session. Go to Import to process files or Sessions to select one.")
     st.stop()
 
-df = load_normalized_df(sid)
-if df.is_empty():
+df = scan_session(sid)
+if df is None:
     st.info("No data available for this session yet.")
     st.stop()
 
 existing = load_report(sid)
-if existing and existing.get("advice"):
+has_advice = bool(existing and existing.get("advice"))
+# Advice for unchanged data is served from the advice cache, so regenerating is cheap
+regenerate = has_advice and st.button("Regenerate Advice")
+if has_advice and not regenerate:
     st.success("Advice already generated for this session.")
     st.metric("Health Score", f"{existing['health_score']['score']}")
     st.json(existing["health_score"]["components"])
     st.markdown(existing["advice"])
-elif st.button("Generate Advice", type="primary"):
-    with st.spinner("Generating local advice with Ollama..."):
-        engine = AdviceEngine()
-        try:
-            result = engine.generate(df, session_id=sid)
-        except Exception as e:
-            st.error(f"Advice generation failed: {e}")
-            st.stop()
-        if result is None:
-            st.error("Advice generation returned no result.")
-            st.stop()
-        rep = load_report(sid) or {}
-        # Always update health_score from current df to avoid None
-        from finance_health.analytics.scoring import compute_health_score
-        hs = compute_health_score(df)
-        rep["health_score"] = {"score": hs.score, "components": hs.components}
-        rep["advice"] = result.advice_markdown
-        save_report(sid, rep)
+elif regenerate or st.button("Generate Advice", type="primary"):
+    engine = AdviceEngine()
+    try:
+        with st.spinner("Preparing summaries..."):
+            stream = engine.stream(df, session_id=sid)
+        st.metric("Health Score", f"{stream.score}")
+        st.json(stream.components)
+        # Tokens appear as they are generated; <think> spans are filtered on the fly
+        advice = st.write_stream(stream.chunks)
+        result = AdviceResult(
+            score=stream.score, components=stream.components, advice_markdown=advice, fallback=stream.fallback
+        )
+    except Exception as e:
+        st.error(f"Advice generation failed: {e}")
+        st.stop()
+    if not advice:
+        st.error("Advice generation returned no result.")
+        st.stop()
+    if result.fallback:
+        st.warning("Ollama is not available, so these are general tips. Nothing was saved.")
+        st.stop()
+    # Always update health_score from the current data to avoid None
+    save_advice_result(sid, result)
     st.success("Advice ready and saved.")
-    st.metric("Health Score", f"{hs.score}")
-    st.json(hs.components)
-    st.markdown(result.advice_markdown)
 else:
     st.caption("Click 'Generate Advice' to run the local model and see recommendations.")
@@ -1,6 +1,7 @@
 import streamlit as st
 from finance_health.settings.config import get_config
 from finance_health.storage.maintenance import reset_database_and_sessions
+from finance_health.utils.llm import get_llm
 
 st.title("⚙️ Settings")
 st.caption("Configure data directory, model, thresholds, and category rules.")
@@ -18,11 +19,20 @@ ADVICE_BACKEND={cfg.advice_backend}
 OLLAMA_NUM_PREDICT={cfg.ollama_num_predict}
 OLLAMA_NUM_CTX={cfg.ollama_num_ctx}
 OLLAMA_TEMPERATURE={cfg.ollama_temperature}
+OLLAMA_KEEP_ALIVE={cfg.ollama_keep_alive}
+OLLAMA_MAX_CONCURRENCY={cfg.ollama_max_concurrency}
+OLLAMA_PREWARM={cfg.ollama_prewarm}
+SEARCH_EMBED_MODEL={cfg.search_embed_model or ""}
 """.strip()
 )
 
 st.caption("Edit your .env to change values, then restart the app.")
 
+llm = get_llm()
+if llm is not None and llm.stats():
+    st.subheader("Model Calls")
+    st.dataframe([{"model": model, **stats} for model, stats in llm.stats().items()], use_container_width=True)
+
 st.divider()
 st.subheader("Maintenance")
 if st.button("Reset database and sessions", type="secondary"):
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import streamlit as st
+
+from finance_health.advice.nl_query import answer_question
+from finance_health.settings.config import get_config
+from finance_health.storage.loader import scan_session, session_paths
+from finance_health.storage.search_index import search
+from finance_health.ui.state import get_session_id
+
+SEARCH_COLUMNS = ["score", "date", "merchant", "description", "amount", "category", "account_name"]
+
+st.title("🔎 Ask")
+
+sid = get_session_id()
+if not sid:
+    st.warning("No active session. Go to Import to process files or Sessions to select one.")
+    st.stop()
+
+if scan_session(sid) is None:
+    st.info("No data available for this session yet.")
+    st.stop()
+
+ask_tab, search_tab = st.tabs(["Ask a question", "Search transactions"])
+
+with search_tab:
+    text = st.text_input("Merchant or description", placeholder="e.g. uber, netflix, coffee")
+    if text:
+        k = st.slider("Results", min_value=5, max_value=100, value=20, step=5)
+        # Similar spellings match too (n-gram vectors or embeddings, see storage.search_index)
+        hits = search(session_paths(sid), text, k=k)
+        if hits.is_empty():
+            st.info("No matching transactions.")
+        else:
+            cols = [c for c in SEARCH_COLUMNS if c in hits.columns]
+            st.dataframe(hits.select(cols).to_pandas(), use_container_width=True, hide_index=True)
+
+with ask_tab:
+    st.caption("Ask about your transactions, e.g. “How much did I spend on Uber in March?” or “Top 5 merchants last year”.")
+    question = st.text_input("Question")
+    if question:
+        try:
+            # Repeated or similar questions reuse a cached translation; the answer is always computed from the data
+            with st.spinner("Translating question..."):
+                answer = answer_question(sid, question)
+        except Exception as e:
+            st.error(f"Could not answer the question: {e}")
+            st.stop()
+
+        spec = answer.translation.spec
+        st.caption(f"Query: {spec.describe()}")
+        if answer.translation.source == "similar":
+            st.caption(f"Reused the translation of “{answer.translation.matched}”.")
+
+        result = answer.result
+        if result.is_empty() or result["transactions"].sum() == 0:
+            st.info("No matching transactions.")
+        elif not spec.group_by:
+            value = result["value"][0]
+            count = result["transactions"][0]
+            label = "Transactions" if spec.aggregate == "count" else f"{spec.aggregate.title()} of {spec.measure}"
+            # Amounts are in the base currency (amount_base)
+            amount = f"{value:,.2f} {get_config().base_currency}"
+            st.metric(label, f"{value:,.0f}" if spec.aggregate == "count" else amount)
+            st.caption(f"{count} matching transaction(s)")
+        else:
+            st.dataframe(result.to_pandas(), use_container_width=True, hide_index=True)
+
+        with st.expander("Query spec"):
+            st.json(spec.model_dump(mode="json", exclude_defaults=True))
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from ..settings.config import get_config
+from .logging import setup_logger
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    last_seconds: float = 0.0
+    load_seconds: float = 0.0  # time Ollama spent loading the model (cold starts)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class LLMGateway:
+    """Process-wide Ollama access: one pooled HTTP client, a concurrency limit per model,
+    keep_alive on every request, model pre-warming and per-model latency/token stats.
+
+    Every request is bounded by OLLAMA_TIMEOUT_S on the HTTP client itself, so a hung
+    request frees its slot; timeouts surface as TimeoutError."""
+
+    def __init__(self):
+        from ollama import Client  # lazy import; raises when Ollama is not installed
+
+        self.cfg = get_config()
+        limit = max(1, self.cfg.ollama_max_concurrency)
+        timeout = self.cfg.ollama_timeout_s
+        try:
+            import httpx
+
+            # Enough pooled connections for every model to run at its limit
+            pool = httpx.Limits(max_connections=limit * 4, max_keepalive_connections=limit * 4)
+            self.client = Client(host=self.cfg.ollama_host, limits=pool, timeout=timeout)
+        except ImportError:
+            self.client = Client(host=self.cfg.ollama_host, timeout=timeout)
+        self._limit = limit
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats: Dict[str, ModelStats] = {}
+        self._warmed: set[str] = set()
+
+    def _semaphore(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            return self._semaphores.setdefault(model, threading.BoundedSemaphore(self._limit))
+
+    def _record(self, model: str, started: float, resp: Any = None, error: bool = False) -> None:
+        elapsed = time.perf_counter() - started
+        get = resp.get if resp is not None else (lambda key, default=None: default)
+        with self._lock:
+            s = self._stats.setdefault(model, ModelStats())
+            s.calls += 1
+            s.errors += int(error)
+            s.seconds += elapsed
+            s.last_seconds = elapsed
+            s.load_seconds += (get("load_duration") or 0) / 1e9
+            s.prompt_tokens += get("prompt_eval_count") or 0
+            s.completion_tokens += get("eval_count") or 0
+
+    def _raise_timeout(self, model: str, error: Exception) -> None:
+        # httpx raises its own TimeoutException subclasses (ReadTimeout, ConnectTimeout, ...)
+        if isinstance(error, TimeoutError) or any(c.__name__ == "TimeoutException" for c in type(error).__mro__):
+            raise TimeoutError(f"no reply from {model} within {self.cfg.ollama_timeout_s:g}s") from error
+
+    def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        format: str = "",
+    ) -> Any:
+        """``Client.chat`` under the model's concurrency limit; streams yield the raw chunks.
+        ``format="json"`` constrains the reply to JSON."""
+        if stream:
+            return self._chat_stream(model, messages, options, format)
+        started = time.perf_counter()
+        with self._semaphore(model):
+            try:
+                resp = self.client.chat(
+                    model=model, messages=messages, options=options, keep_alive=self.cfg.ollama_keep_alive,
+                    format=format, stream=False,
+                )
+            except Exception as e:
+                self._record(model, started, error=True)
+                self._raise_timeout(model, e)
+                raise
+        self._record(model, started, resp)
+        return resp
+
+    def _chat_stream(
+        self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]], format: str = ""
+    ) -> Iterator[Any]:
+        started = time.perf_counter()
+        last = None
+        # The slot is held until the stream is exhausted or closed
+        with self._semaphore(model):
+            try:
+                for part in self.client.chat(
+                    model=model, messages=messages, options=options, keep_alive=self.cfg.ollama_keep_alive,
+                    format=format, stream=True,
+                ):
+                    last = part
+                    yield part
+            except Exception as e:
+                self._record(model, started, error=True)
+                self._raise_timeout(model, e)
+                raise
+        # The final chunk carries the durations and token counts
+        self._record(model, started, last)
+
+    @contextmanager
+    def slot(self, model: str) -> Iterator[Dict[str, Any]]:
+        """Hold one of the model's concurrency slots for a call made through another client
+        (the LangChain agents) and record it in the stats. Put the reply's metadata into
+        the yielded dict to count its tokens."""
+        started = time.perf_counter()
+        meta: Dict[str, Any] = {}
+        with self._semaphore(model):
+            try:
+                yield meta
+            except Exception as e:
+                self._record(model, started, error=True)
+                self._raise_timeout(model, e)
+                raise
+        self._record(model, started, meta)
+
+    def chat_model(self, model: str, **options: Any) -> Any:
+        """LangChain ChatOllama for ``model`` on the same host and keep_alive; invoke it
+        under ``slot`` so it shares the concurrency limit and stats."""
+        try:
+            from langchain_ollama import ChatOllama  # lazy import; optional dependency
+        except ImportError as e:
+            raise ImportError("langchain_ollama is not installed. Install or set ADVICE_BACKEND=ollama_direct.") from e
+        return ChatOllama(
+            model=model,
+            base_url=self.cfg.ollama_host,
+            keep_alive=self.cfg.ollama_keep_alive,
+            client_kwargs={"timeout": self.cfg.ollama_timeout_s},
+            **options,
+        )
+
+    def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        """Embedding vectors of ``texts`` under the model's concurrency limit."""
+        started = time.perf_counter()
+        with self._semaphore(model):
+            try:
+                resp = self.client.embed(model=model, input=texts, keep_alive=self.cfg.ollama_keep_alive)
+            except Exception as e:
+                self._record(model, started, error=True)
+                self._raise_timeout(model, e)
+                raise
+        self._record(model, started, resp)
+        return list(resp.get("embeddings") or [])
+
+    def prewarm(self, models: Iterable[str]) -> None:
+        """Load ``models`` in the background (an empty generate keeps them resident for keep_alive)."""
+        for model in dict.fromkeys(m for m in models if m):
+            with self._lock:
+                if model in self._warmed:
+                    continue
+                self._warmed.add(model)
+            threading.Thread(target=self._warm, args=(model,), name=f"prewarm-{model}", daemon=True).start()
+
+    def _warm(self, model: str) -> None:
+        started = time.perf_counter()
+        try:
+            self.client.generate(model=model, prompt="", keep_alive=self.cfg.ollama_keep_alive)
+            logger.info("Pre-warmed %s in %.1fs", model, time.perf_counter() - started)
+        except Exception as e:
+            logger.warning("Pre-warming %s failed: %s", model, e)
+            with self._lock:
+                self._warmed.discard(model)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {model: asdict(s) for model, s in self._stats.items()}
+
+
+_gateway_singleton: Optional[LLMGateway] = None
+_gateway_unavailable = False
+_gateway_lock = threading.Lock()
+
+
+def get_llm() -> Optional[LLMGateway]:
+    """The shared gateway, or None when the Ollama client is not installed."""
+    global _gateway_singleton, _gateway_unavailable
+    if _gateway_singleton is not None or _gateway_unavailable:
+        return _gateway_singleton
+    with _gateway_lock:
+        if _gateway_singleton is None and not _gateway_unavailable:
+            try:
+                _gateway_singleton = LLMGateway()
+            except ImportError as e:
+                logger.warning("Ollama not available: %s", e)
+                _gateway_unavailable = True
+    return _gateway_singleton
+
+
+def prewarm_models() -> None:
+    """Pre-warm the ingest and advice models when OLLAMA_PREWARM is enabled."""
+    cfg = get_config()
+    llm = get_llm() if cfg.ollama_prewarm else None
+    if llm is not None:
+        llm.prewarm([cfg.ollama_model_ingest or cfg.ollama_model, cfg.ollama_model])
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterator
+
+import polars as pl
+
+from .logging import setup_logger
+
+logger = setup_logger(__name__)
+
+# Rough size of a token for English text and CSV numbers; errs towards overestimating
+CHARS_PER_TOKEN = 3.5
+# Never budget a prompt below this, even when num_predict eats most of the context
+MIN_PROMPT_TOKENS = 512
+# Label of the rollup row; distinct from the "other" category
+ROLLUP_LABEL = "(all others)"
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def prompt_budget(num_ctx: int, num_predict: int, *fixed: str) -> int:
+    """Tokens left for the prompt in a ``num_ctx`` window after the reply and ``fixed`` texts."""
+    return max(num_ctx - num_predict - sum(estimate_tokens(t) for t in fixed), MIN_PROMPT_TOKENS)
+
+
+def round_floats(df: pl.DataFrame, decimals: int = 2) -> pl.DataFrame:
+    return df.with_columns(pl.col(pl.Float32, pl.Float64).round(decimals))
+
+
+def to_csv(df: pl.DataFrame, decimals: int | None = None) -> str:
+    """CSV text of ``df`` written directly by Polars (no pandas copy); floats rounded to
+    ``decimals`` when given, which keeps long fractions out of prompts."""
+    if decimals is not None:
+        df = round_floats(df, decimals)
+    return df.write_csv()
+
+
+@dataclass(frozen=True)
+class TableSection:
+    df: pl.DataFrame
+    weight: float = 1.0
+    max_rows: int = 12
+    min_rows: int = 1
+    # Fold rows that do not fit into one 'other' row (numeric columns summed); for
+    # rankings such as categories or merchants
+    rollup: bool = False
+    # 'tail' keeps the most recent rows of a time series instead of the first ones
+    keep: str = "head"
+    decimals: int = 2
+
+
+def compact_table(df: pl.DataFrame, decimals: int = 2) -> pl.DataFrame:
+    """Round floats and drop columns that carry no information (all null, or a copy of
+    an earlier column)."""
+    if df.is_empty():
+        return df
+    redundant = [c for c in df.columns if df[c].null_count() == df.height]
+    kept: list[str] = []
+    for c in df.columns:
+        if c in redundant:
+            continue
+        if any(df.schema[k] == df.schema[c] and df[k].equals(df[c]) for k in kept):
+            redundant.append(c)
+        else:
+            kept.append(c)
+    return round_floats(df.drop(redundant), decimals)
+
+
+def _take(section: TableSection, df: pl.DataFrame, rows: int) -> pl.DataFrame:
+    if rows >= df.height:
+        return df
+    if section.keep == "tail":
+        return df.tail(rows)
+    if not section.rollup or rows < 2:
+        return df.head(rows)
+    label = df.columns[0]
+    rest = df.slice(rows - 1)
+    numeric = [c for c, dtype in df.schema.items() if dtype.is_numeric() and c != label]
+    other = rest.select([
+        pl.lit(ROLLUP_LABEL).alias(label),
+        *[pl.col(c).sum() for c in numeric],
+    ])
+    return pl.concat([df.head(rows - 1).with_columns(pl.col(label).cast(pl.String)), other], how="diagonal_relaxed")
+
+
+def _rows_within(section: TableSection, df: pl.DataFrame, budget: int) -> int:
+    """Most rows (between min_rows and max_rows) whose CSV fits ``budget`` tokens."""
+    lo, hi = min(section.min_rows, df.height), min(section.max_rows, df.height)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(to_csv(_take(section, df, mid))) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def fit_tables(tables: Dict[str, TableSection], budget_tokens: int, fixed_text: str = "") -> Dict[str, str]:
+    """Render each table as CSV so that together with ``fixed_text`` they fit the budget.
+
+    Tables are compacted first; the remaining budget is split by weight, and whatever a
+    table does not need (it fits whole) is handed on to the others. Each table keeps as
+    many rows as fit its share, but never fewer than ``min_rows``. Empty tables render
+    as "<empty>". Sizes are logged for tuning.
+    """
+    compacted = {name: compact_table(s.df, s.decimals) for name, s in tables.items()}
+    available = budget_tokens - estimate_tokens(fixed_text)
+    rows: Dict[str, int] = {}
+    pending = {name for name, df in compacted.items() if not df.is_empty()}
+    # Water-filling: tables that fit whole within their share release the rest
+    while pending:
+        total_weight = sum(tables[n].weight for n in pending) or 1.0
+        shares = {n: max(available, 0) * tables[n].weight / total_weight for n in pending}
+        settled = False
+        for name in sorted(pending):
+            section, df = tables[name], compacted[name]
+            full = _take(section, df, section.max_rows)
+            cost = estimate_tokens(to_csv(full))
+            if cost <= shares[name]:
+                rows[name] = min(section.max_rows, df.height)
+                available -= cost
+                pending.discard(name)
+                settled = True
+        if not settled:
+            for name in pending:
+                rows[name] = _rows_within(tables[name], compacted[name], int(shares[name]))
+            break
+
+    rendered = {}
+    for name, df in compacted.items():
+        rendered[name] = to_csv(_take(tables[name], df, rows[name])) if name in rows else "<empty>\n"
+    total = estimate_tokens(fixed_text) + sum(estimate_tokens(t) for t in rendered.values())
+    logger.info(
+        "Prompt ~%d/%d tokens (fixed %d); %s",
+        total, budget_tokens, estimate_tokens(fixed_text),
+        ", ".join(
+            f"{name} {rows.get(name, 0)}/{tables[name].df.height} rows ~{estimate_tokens(text)} tok"
+            for name, text in rendered.items()
+        ),
+    )
+    return rendered
+
+
+def chunk_rows(df: pl.DataFrame, budget_tokens: int, tokens_per_row_out: int = 0) -> Iterator[pl.DataFrame]:
+    """Split ``df`` into consecutive row chunks whose CSV (plus ``tokens_per_row_out``
+    reply tokens per row) fits ``budget_tokens``; no row is dropped."""
+    if df.is_empty():
+        return
+    sample = df.head(min(df.height, 50))
+    header = estimate_tokens(to_csv(sample.head(0)))
+    per_row = (estimate_tokens(to_csv(sample)) - header) / sample.height + tokens_per_row_out
+    size = max(int((budget_tokens - header) / max(per_row, 1.0)), 1)
+    for offset in range(0, df.height, size):
+        yield df.slice(offset, size)
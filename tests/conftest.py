@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+import pytest
+
+from finance_health.settings import config as config_module
+from finance_health.settings.config import AppConfig
+from finance_health.utils import llm as llm_module
+
+
+@pytest.fixture
+def app_config(tmp_path, monkeypatch) -> Callable[..., AppConfig]:
+    """Build a fresh AppConfig over an empty DATA_DIR with Ollama treated as offline.
+
+    Keyword arguments are set as environment variables first, so a test can call it
+    again to change a setting (e.g. BASE_CURRENCY) for the rest of the test.
+    """
+    for name in ("DB_PATH", "FX_RATES_PATH", "SEARCH_EMBED_MODEL", "BASE_CURRENCY"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("OLLAMA_PREWARM", "false")
+    monkeypatch.setattr(llm_module, "_gateway_singleton", None)
+    monkeypatch.setattr(llm_module, "_gateway_unavailable", True)
+
+    def configure(**env: object) -> AppConfig:
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        monkeypatch.setattr(config_module, "_config_singleton", None)
+        return config_module.get_config()
+
+    return configure
+
+
+@pytest.fixture
+def write_statement(tmp_path) -> Callable[[str, Iterable[Sequence[object]]], Path]:
+    """Write a CSV statement named ``name`` under tmp_path and return its path.
+
+    Rows are (date, description, amount, currency, account) tuples.
+    """
+    def write(name: str, rows: Iterable[Sequence[object]]) -> Path:
+        lines = ["date,description,amount,currency,account"] + [",".join(map(str, r)) for r in rows]
+        path = tmp_path / name
+        path.write_text("\n".join(lines) + "\n")
+        return path
+
+    return write
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import polars as pl
+
+from finance_health.advice.cache import advice_cache_key, save_cached_advice
+from finance_health.advice.graph import AdviceEngine
+from finance_health.analytics.scoring import HealthScore
+
+PROMPT = "total_income: 3000.00, total_expense: 1200.00"
+
+
+def test_key_changes_with_prompt_backend_and_options(app_config):
+    app_config()
+    key = advice_cache_key(PROMPT, "ollama_direct")
+
+    assert advice_cache_key(PROMPT, "ollama_direct") == key
+    assert advice_cache_key(PROMPT + " ", "ollama_direct") != key
+    assert advice_cache_key(PROMPT, "prefetch") != key
+    assert advice_cache_key(PROMPT, "ollama_direct", {"temperature": 0.9}) != key
+    app_config(OLLAMA_MODEL="another-model")
+    assert advice_cache_key(PROMPT, "ollama_direct") != key
+
+
+def test_agent_backends_are_keyed_by_what_they_generate_from(app_config):
+    app_config(ADVICE_BACKEND="prefetch")
+    engine = AdviceEngine()
+    outputs = {"get_kpis": "income 3000", "get_anomalies_csv": "kind,amount"}
+
+    # The prefetch agent reads tool outputs, which can change while the summary does not
+    assert engine._cache_key(PROMPT, outputs) == engine._cache_key(PROMPT, dict(outputs))
+    assert engine._cache_key(PROMPT, {**outputs, "get_anomalies_csv": "kind,amount\nfee_spike,40"}) != (
+        engine._cache_key(PROMPT, outputs)
+    )
+    assert engine._cache_key(PROMPT, None) is None
+    app_config(ADVICE_BACKEND="langchain")
+    assert AdviceEngine()._cache_key(PROMPT, outputs) is None
+
+
+def test_cached_advice_is_served_while_ollama_is_offline(app_config):
+    app_config(ADVICE_BACKEND="ollama_direct")
+    engine = AdviceEngine()
+    hs = HealthScore(score=72.5, components={"savings_rate": 0.6})
+    save_cached_advice(advice_cache_key(PROMPT, "ollama_direct"), "## Advice\nSave more.")
+
+    hit = engine.complete(pl.DataFrame(), None, hs, PROMPT)
+    miss = engine.complete(pl.DataFrame(), None, hs, PROMPT + "\nchanged")
+
+    assert (hit.advice_markdown, hit.score, hit.fallback) == ("## Advice\nSave more.", 72.5, False)
+    assert miss.fallback
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import polars as pl
+
+from finance_health.parsing.ingest import Ingestor
+from finance_health.storage.aggregates import build_month_partials, merge_partials, month_digests, scan_aggregates
+from finance_health.storage.layout import scan_normalized
+from finance_health.storage.loader import session_paths
+
+
+def _sorted(df: pl.DataFrame) -> pl.DataFrame:
+    return df.with_columns(pl.col(pl.Categorical).cast(pl.String)).sort(df.columns, nulls_last=True)
+
+
+def test_append_recomputes_only_the_months_that_gained_rows(app_config, write_statement):
+    app_config()
+    ingestor = Ingestor()
+    ingestor.ingest_files([write_statement("jan_feb.csv", [
+        ("2025-01-05", "Salary ACME Corp", 3000, "USD", "Checking"),
+        ("2025-01-09", "Grocery Store", -80, "USD", "Checking"),
+        ("2025-02-05", "Salary ACME Corp", 3000, "USD", "Checking"),
+        ("2025-02-10", "Grocery Store", -95, "USD", "Checking"),
+    ])])
+    session = session_paths(ingestor.session_id)
+    january = session.aggregates_dir / "daily" / "2025-01.parquet"
+    before = january.stat().st_mtime_ns
+
+    ingestor.append_files([write_statement("feb.csv", [
+        ("2025-02-20", "Electric Company", -70, "USD", "Checking"),
+    ])])
+
+    assert january.stat().st_mtime_ns == before
+    monthly = scan_aggregates(ingestor.session_id).collect()
+    rebuilt = merge_partials(pl.concat(build_month_partials(scan_normalized(session)).values()).lazy()).collect()
+    assert _sorted(monthly).equals(_sorted(rebuilt))
+    february = monthly.filter(pl.col("month").dt.month() == 2)
+    assert february["expense"].sum() == 165.0
+    assert february["tx_count"].sum() == 3
+
+
+def test_month_digests_ignore_row_order_but_not_content():
+    df = pl.DataFrame({
+        "date": pl.date_range(pl.date(2025, 1, 25), pl.date(2025, 2, 5), eager=True),
+    }).with_columns(pl.int_range(pl.len()).cast(pl.Float64).alias("amount"))
+
+    digests = month_digests(df)
+
+    assert set(digests) == {"2025-01", "2025-02"}
+    assert month_digests(df.reverse()) == digests
+    first_of_february = pl.col("date") == pl.date(2025, 2, 1)
+    changed = month_digests(df.with_columns(pl.when(first_of_february).then(-1.0).otherwise("amount").alias("amount")))
+    assert changed["2025-01"] == digests["2025-01"]
+    assert changed["2025-02"] != digests["2025-02"]
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import date
+
+import polars as pl
+
+from finance_health.analytics.anomalies import ANOMALY_COLUMNS, detect_anomalies
+
+
+def _rows(rows: list) -> pl.DataFrame:
+    return pl.DataFrame(rows, schema=["date", "merchant", "category", "amount"], orient="row")
+
+
+HISTORY = _rows(
+    [(date(2024, m, 3), "Blue Bottle", None, -4.5 - m / 10) for m in range(1, 6)]
+    + [(date(2024, m, 12), "Bistro", "dining", -a) for m, a in zip(range(1, 6), [100.0, 110.0, 90.0, 105.0, 98.0])]
+    + [(date(2024, m, 28), "Bank", "fees", -5.0) for m in range(1, 6)]
+)
+
+
+def _kinds(anomalies: pl.DataFrame) -> set:
+    return {(r["kind"], r["merchant"] or r["category"]) for r in anomalies.iter_rows(named=True)}
+
+
+def test_steady_history_has_no_anomalies():
+    assert detect_anomalies(HISTORY).is_empty()
+
+
+def test_each_rule_flags_its_case():
+    june = _rows([
+        (date(2024, 6, 3), "Blue Bottle", None, -60.0),
+        (date(2024, 6, 12), "Bistro", "dining", -420.0),
+        (date(2024, 6, 28), "Bank", "fees", -35.0),
+        (date(2024, 6, 15), "Electronics Hub", "shopping", -900.0),
+    ])
+
+    anomalies = detect_anomalies(pl.concat([HISTORY, june]))
+
+    assert anomalies.columns == ANOMALY_COLUMNS
+    assert {
+        ("unusual_charge", "Blue Bottle"),
+        ("category_spike", "dining"),
+        ("fee_spike", "fees"),
+        ("new_merchant_large", "Electronics Hub"),
+    } <= _kinds(anomalies)
+    assert anomalies["score"].to_list() == sorted(anomalies["score"].to_list(), reverse=True)
+    coffee = anomalies.filter((pl.col("kind") == "unusual_charge") & (pl.col("merchant") == "Blue Bottle"))
+    assert coffee["amount"].to_list() == [60.0]
+    assert 4.5 < coffee["baseline"][0] < 5.0
+
+
+def test_a_large_first_charge_early_in_the_history_is_not_flagged():
+    early = _rows([(date(2024, 1, 10), "Electronics Hub", "shopping", -900.0)])
+
+    assert ("new_merchant_large", "Electronics Hub") not in _kinds(detect_anomalies(pl.concat([HISTORY, early])))
+
+
+def test_limit_keeps_the_highest_scores():
+    june = _rows([(date(2024, 6, 3), "Blue Bottle", None, -60.0), (date(2024, 6, 28), "Bank", "fees", -35.0)])
+    anomalies = detect_anomalies(pl.concat([HISTORY, june]))
+
+    assert detect_anomalies(pl.concat([HISTORY, june]), limit=1).equals(anomalies.head(1))
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from datetime import date
+
+import polars as pl
+
+from finance_health.parsing.interfaces import enforce_schema
+from finance_health.storage.dataset import dataset_dir, publish_session, scan_history
+
+
+def _rows(session_id: str, accounts: list) -> pl.DataFrame:
+    return enforce_schema(pl.DataFrame({
+        "date": [date(2025, 1, 2 + i) for i in range(len(accounts))],
+        "amount": [-10.0 * (i + 1) for i in range(len(accounts))],
+        "account_name": accounts,
+        "session_id": [session_id] * len(accounts),
+    }))
+
+
+def test_partition_values_round_trip_through_the_path(app_config):
+    app_config()
+    accounts = ["Chase / Joint", "Café 50%+tips", None]
+    publish_session("s1", _rows("s1", accounts))
+
+    # Separators and escapes in names stay inside a single directory level
+    assert len(list(dataset_dir().glob("session_id=s1/account_name=*/month=2025-01/part-0.parquet"))) == 3
+    history = scan_history().sort("date").collect()
+    assert history["account_name"].to_list() == accounts
+    assert history["session_id"].to_list() == ["s1"] * 3
+    assert scan_history(accounts=["Chase / Joint"]).collect()["amount"].to_list() == [-10.0]
+
+
+def test_republishing_months_replaces_only_those_partitions(app_config):
+    app_config()
+    publish_session("s1", _rows("s1", ["Checking", "Checking"]))
+    february = _rows("s1", ["Checking"]).with_columns(pl.lit(date(2025, 2, 1)).alias("date"))
+    publish_session("s1", pl.concat([february, february]), months={"2025-02"})
+
+    history = scan_history(session_ids=["s1"], columns=["month", "amount"]).collect()
+
+    assert history.group_by("month").len().sort("month").rows() == [("2025-01", 2), ("2025-02", 2)]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import polars as pl
+import pytest
+
+from finance_health.analytics.forecast import (
+    FORECAST_COLUMNS,
+    exponential_smoothing,
+    forecast_cashflow,
+    recurring_projection,
+    seasonal_naive,
+)
+
+
+def _monthly(months: int, income: float = 3000.0, rent: float = 1000.0) -> pl.DataFrame:
+    dates = [date(2024 + (m // 12), m % 12 + 1, 1) for m in range(months)]
+    return pl.DataFrame({
+        "date": dates + dates,
+        "amount": [income] * months + [-rent] * months,
+        "category": ["income"] * months + ["rent_mortgage"] * months,
+    })
+
+
+def test_seasonal_naive_repeats_last_year_or_averages_recent_months():
+    year = np.arange(1.0, 14.0)[None, :]  # 13 months: 1..13
+
+    forecast, _ = seasonal_naive(year, horizon=3)
+    short, _ = seasonal_naive(np.array([[1.0, 2.0, 6.0, 7.0]]), horizon=2)
+
+    assert forecast.tolist() == [[2.0, 3.0, 4.0]]
+    assert short.tolist() == [[5.0, 5.0]]
+
+
+def test_exponential_smoothing_tracks_a_level_shift():
+    flat, flat_sigma, _ = exponential_smoothing(np.full((1, 6), 50.0), horizon=2)
+    shifted, _, alpha = exponential_smoothing(np.array([[10.0] * 6 + [40.0] * 6]), horizon=1)
+
+    assert flat.tolist() == [[50.0, 50.0]]
+    assert flat_sigma.tolist() == [0.0]
+    # The best alpha follows the new level closely
+    assert alpha[0] == pytest.approx(0.9)
+    assert shifted[0, 0] == pytest.approx(40.0, abs=0.1)
+
+
+def test_forecast_of_steady_cashflow():
+    forecast = forecast_cashflow(_monthly(6), horizon=3)
+
+    assert forecast.columns == FORECAST_COLUMNS
+    assert forecast["month"].to_list() == [date(2024, 7, 1), date(2024, 8, 1), date(2024, 9, 1)]
+    assert forecast["income"].to_list() == pytest.approx([3000.0] * 3)
+    assert forecast["expense"].to_list() == pytest.approx([1000.0] * 3)
+    assert forecast["net"].to_list() == pytest.approx([2000.0] * 3)
+    assert (forecast["net_lo"] <= forecast["net"]).all() and (forecast["net"] <= forecast["net_hi"]).all()
+
+
+def test_committed_recurring_charges_floor_the_expense():
+    recurring = pl.DataFrame({
+        "active": [True],
+        "next_date": [date(2024, 7, 15)],
+        "period_days": [30.0],
+        "next_amount": [1500.0],
+    })
+
+    committed = recurring_projection(recurring, first_month=2024 * 12 + 6, horizon=2)
+    forecast = forecast_cashflow(_monthly(6), recurring, horizon=2)
+
+    assert committed.tolist() == [1500.0, 1500.0]
+    assert forecast["expense"].to_list() == pytest.approx([1500.0, 1500.0])
+    assert forecast["recurring_expense"].to_list() == [1500.0, 1500.0]
+
+
+def test_too_little_history_gives_no_forecast():
+    assert forecast_cashflow(_monthly(2)).is_empty()
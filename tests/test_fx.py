@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from datetime import date
+
+import polars as pl
+import pytest
+
+from finance_health.analytics.fx import convert_to_base
+
+
+def _write_rates(path, rows):
+    pl.DataFrame(rows, schema=["date", "currency", "rate", "base"], orient="row").write_csv(path)
+    return path
+
+
+def test_convert_uses_latest_rate_on_or_before_each_date(app_config, tmp_path):
+    rates = _write_rates(tmp_path / "rates.csv", [
+        ("2024-01-10", "EUR", 1.10, "USD"),
+        ("2024-01-20", "EUR", 1.20, "USD"),
+    ])
+    app_config(FX_RATES_PATH=rates, BASE_CURRENCY="USD")
+    df = pl.DataFrame({
+        "date": [date(2024, 1, 25), date(2024, 1, 5), date(2024, 1, 10), date(2024, 1, 15), date(2024, 1, 15), date(2024, 1, 15)],
+        "amount": [100.0, 100.0, 100.0, 100.0, 50.0, 7.0],
+        "currency": ["EUR", "EUR", "eur", "EUR", "USD", None],
+    })
+
+    out = convert_to_base(df)
+
+    # Input order is kept; no rate before the first quote stays null; base and currency-less rows keep their amount
+    assert out["date"].to_list() == df["date"].to_list()
+    assert out["amount_base"].to_list() == pytest.approx([120.0, None, 110.0, 110.0, 50.0, 7.0], nan_ok=True)
+
+
+def test_convert_lazy_frame_stays_lazy(app_config, tmp_path):
+    rates = _write_rates(tmp_path / "rates.csv", [("2024-01-01", "EUR", 2.0, "USD")])
+    app_config(FX_RATES_PATH=rates, BASE_CURRENCY="USD")
+    lf = pl.LazyFrame({"date": [date(2024, 2, 1)], "amount": [3.0], "currency": ["EUR"]})
+
+    out = convert_to_base(lf)
+
+    assert isinstance(out, pl.LazyFrame)
+    assert out.collect()["amount_base"].to_list() == [6.0]
+
+
+def test_changing_base_currency_uses_that_base_rates(app_config, tmp_path):
+    rates = _write_rates(tmp_path / "rates.csv", [
+        ("2024-01-01", "EUR", 1.10, "USD"),
+        ("2024-01-01", "GBP", 1.20, "EUR"),
+    ])
+    df = pl.DataFrame({
+        "date": [date(2024, 1, 2)] * 2,
+        "amount": [100.0, 100.0],
+        "currency": ["EUR", "GBP"],
+    })
+
+    app_config(FX_RATES_PATH=rates, BASE_CURRENCY="USD")
+    usd = convert_to_base(df)["amount_base"].to_list()
+    # Same table, new base: the rates cached for USD must not be reused
+    app_config(FX_RATES_PATH=rates, BASE_CURRENCY="EUR")
+    eur = convert_to_base(df)["amount_base"].to_list()
+
+    assert usd[0] == pytest.approx(110.0) and usd[1] is None
+    assert eur == pytest.approx([100.0, 120.0])
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import polars as pl
+import pytest
+
+from finance_health.parsing.ingest import Ingestor
+from finance_health.storage.loader import scan_session
+
+
+def _ingested(write_statement) -> Ingestor:
+    ingestor = Ingestor()
+    ingestor.ingest_files([write_statement("card.csv", [
+        ("2025-01-05", "Blue Bottle Coffee", -4.5, "USD", "Card"),
+        ("2025-02-05", "Blue Bottle Coffee", -5.0, "USD", "Card"),
+        ("2025-02-07", "Grocery Store", -60, "USD", "Card"),
+    ])])
+    return ingestor
+
+
+def test_recategorize_updates_every_month_of_the_merchant(app_config, write_statement):
+    app_config()
+    ingestor = _ingested(write_statement)
+    merchant = scan_session(ingestor.session_id).collect()["merchant"].cast(pl.String)[0]
+
+    ingestor.recategorize(merchant, "dining")
+
+    rows = scan_session(ingestor.session_id).collect()
+    hit = rows.filter(pl.col("merchant").cast(pl.String) == merchant)
+    assert hit.height == 2
+    assert hit["category"].cast(pl.String).to_list() == ["dining", "dining"]
+
+
+def test_recategorize_rejects_an_unknown_category(app_config, write_statement):
+    app_config()
+    ingestor = _ingested(write_statement)
+    before = scan_session(ingestor.session_id).collect()
+
+    with pytest.raises(ValueError, match="Unknown category"):
+        ingestor.recategorize(before["merchant"].cast(pl.String)[0], "coffee")
+
+    assert scan_session(ingestor.session_id).collect().equals(before)
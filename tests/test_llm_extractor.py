@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import polars as pl
+
+from finance_health.parsing.llm_extractor import LLMExtractor
+
+
+class _ScriptedClient:
+    """Replies with one extracted row per chunk; chunks containing ``fail_on`` raise
+    the first ``failures`` times they are sent."""
+
+    def __init__(self, fail_on: str, failures: int):
+        self.fail_on = fail_on
+        self.failures = failures
+        self.calls = 0
+
+    def chat(self, model, messages, options=None, stream=False):
+        self.calls += 1
+        if self.fail_on in messages[-1]["content"] and self.failures > 0:
+            self.failures -= 1
+            raise TimeoutError("model timed out")
+        row = {"date": "2025-01-05", "description": "Grocery Store", "amount": -12.5, "currency": "USD"}
+        return {"message": {"content": json.dumps([row])}}
+
+
+def _statement(rows: int) -> pl.DataFrame:
+    return pl.DataFrame({
+        "date": [f"2025-01-{i % 28 + 1:02d}" for i in range(rows)],
+        "description": ["Broken row" if i == rows - 1 else f"Grocery Store #{i}" for i in range(rows)],
+        "amount": [-12.5] * rows,
+    })
+
+
+def _extractor(app_config, client: _ScriptedClient) -> LLMExtractor:
+    app_config(OLLAMA_NUM_CTX=1024)
+    extractor = LLMExtractor()
+    extractor.client = client
+    return extractor
+
+
+def test_a_chunk_that_keeps_failing_discards_the_whole_llm_result(app_config):
+    client = _ScriptedClient(fail_on="Broken row", failures=10)
+    extractor = _extractor(app_config, client)
+    raw = _statement(60)
+    chunks = extractor._table_chunks(raw, "jan.csv")
+    assert len(chunks) > 1
+
+    out = extractor.extract_to_normalized(raw, Path("jan.csv"), "s1")
+
+    # Empty, so the ingestor parses the whole file deterministically instead of losing rows
+    assert out.is_empty()
+    assert client.calls == len(chunks) + 1
+
+
+def test_a_failed_chunk_is_retried(app_config):
+    client = _ScriptedClient(fail_on="Broken row", failures=1)
+    extractor = _extractor(app_config, client)
+    raw = _statement(60)
+    chunks = extractor._table_chunks(raw, "jan.csv")
+
+    out = extractor.extract_to_normalized(raw, Path("jan.csv"), "s1")
+
+    assert out.height == len(chunks)
+    assert client.calls == len(chunks) + 1
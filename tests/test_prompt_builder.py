@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import polars as pl
+import pytest
+
+from finance_health.utils.prompt_builder import (
+    ROLLUP_LABEL,
+    TableSection,
+    chunk_rows,
+    estimate_tokens,
+    fit_tables,
+    to_csv,
+)
+
+
+def _ranking(n: int) -> pl.DataFrame:
+    return pl.DataFrame({
+        "category": [f"category-{i:03d}" for i in range(n)],
+        "amount": [1000.0 - i for i in range(n)],
+        "share": [round(1 / (i + 1), 6) for i in range(n)],
+    })
+
+
+def _rows(csv: str) -> int:
+    return len(csv.strip().splitlines()) - 1  # without the header
+
+
+def test_fit_tables_stays_within_budget_and_keeps_min_rows():
+    tables = {
+        "big": TableSection(_ranking(200), weight=2.0, max_rows=200, min_rows=3),
+        "other": TableSection(_ranking(200), max_rows=200, min_rows=3),
+        "small": TableSection(_ranking(2), max_rows=10),
+        "empty": TableSection(pl.DataFrame()),
+    }
+    fixed = "x" * 400
+
+    rendered = fit_tables(tables, budget_tokens=600, fixed_text=fixed)
+
+    assert estimate_tokens(fixed) + sum(estimate_tokens(t) for t in rendered.values()) <= 600
+    assert rendered["empty"] == "<empty>\n"
+    assert _rows(rendered["small"]) == 2  # fits whole
+    assert 3 <= _rows(rendered["other"]) < 200
+    # The heavier table gets the larger share
+    assert _rows(rendered["big"]) > _rows(rendered["other"])
+
+
+def test_fit_tables_renders_everything_when_it_fits():
+    df = _ranking(5)
+
+    rendered = fit_tables({"t": TableSection(df, max_rows=10)}, budget_tokens=10_000)
+
+    assert rendered["t"] == to_csv(df, decimals=2)
+
+
+def test_fit_tables_rollup_keeps_totals():
+    df = _ranking(50)
+
+    rendered = fit_tables({"t": TableSection(df, max_rows=6, rollup=True)}, budget_tokens=10_000)
+
+    out = pl.read_csv(rendered["t"].encode())
+    assert out.height == 6
+    assert out["category"][-1] == ROLLUP_LABEL
+    assert out["amount"].sum() == pytest.approx(df["amount"].sum())
+
+
+@pytest.mark.parametrize("budget", [1, 40, 200, 5_000])
+def test_chunk_rows_fits_budget_and_drops_no_rows(budget):
+    df = _ranking(120)
+
+    chunks = list(chunk_rows(df, budget, tokens_per_row_out=2))
+
+    assert pl.concat(chunks).equals(df)
+    for chunk in chunks:
+        # A single row is always emitted, even when it alone exceeds the budget
+        if chunk.height > 1:
+            assert estimate_tokens(to_csv(chunk)) + 2 * chunk.height <= budget
+
+
+def test_chunk_rows_of_empty_frame_yields_nothing():
+    assert list(chunk_rows(pl.DataFrame(), 100)) == []
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+import polars as pl
+import pytest
+from pydantic import ValidationError
+
+from finance_health.advice import nl_query
+from finance_health.analytics.query import QuerySpec, compile_query, resolve_dates
+
+ROWS = pl.DataFrame({
+    "date": [date(2025, 1, 5), date(2025, 1, 20), date(2025, 2, 3), date(2025, 2, 14), date(2025, 2, 28), date(2025, 3, 2)],
+    "amount": [-12.0, -30.0, -18.0, -250.0, 3000.0, -500.0],
+    # The February Uber ride was charged in another currency
+    "amount_base": [None, None, -16.5, None, None, None],
+    "merchant": ["Uber", "Whole Foods", "Uber Trip", "Whole Foods", "ACME Payroll", "Savings"],
+    "description": ["UBER *TRIP", "WHOLE FOODS", "UBER *TRIP", "WHOLE FOODS", "SALARY", "TO SAVINGS"],
+    "category": ["transport", "groceries", "transport", "groceries", "income", "transfer"],
+    "account_name": ["Card", "Card", "Card", "Card", "Checking", "Checking"],
+    "is_transfer": [False, False, False, False, False, True],
+})
+LATEST = date(2025, 3, 2)
+
+
+def _run(**spec) -> pl.DataFrame:
+    return compile_query(QuerySpec(**spec), ROWS.lazy(), LATEST).collect()
+
+
+def test_spending_filters_and_groups():
+    assert _run(merchants=["uber"])["value"].to_list() == [pytest.approx(28.5)]
+    assert _run(categories=["groceries"], min_amount=100)["transactions"].to_list() == [1]
+    assert _run(month=1)["value"].to_list() == [pytest.approx(42.0)]
+    by_month = _run(group_by=["month"])
+    # Chronological; the March transfer between own accounts is not spending
+    assert by_month["month"].to_list() == [date(2025, 1, 1), date(2025, 2, 1)]
+    assert by_month["value"].to_list() == pytest.approx([42.0, 266.5])
+    assert _run(measure="net", period="last_month")["value"].to_list() == [pytest.approx(3000.0 - 266.5)]
+
+
+def test_transfers_count_only_when_asked_for_by_category():
+    assert _run(categories=["transfer"])["value"].to_list() == [pytest.approx(500.0)]
+
+
+def test_top_merchants_are_largest_first_within_the_limit():
+    top = _run(group_by=["merchant"], limit=2)
+
+    # Uber Trip ranks by its base-currency amount, 16.5 against Uber's 12
+    assert top["merchant"].to_list() == ["Whole Foods", "Uber Trip"]
+
+
+def test_spec_validation():
+    with pytest.raises(ValidationError):
+        QuerySpec(period="last_month", month=2)
+    with pytest.raises(ValidationError):
+        QuerySpec(sql="DROP TABLE")
+    with pytest.raises(ValidationError):
+        QuerySpec(categories=["coffee"])
+    # A month without a year is the most recent such month
+    assert resolve_dates(QuerySpec(month=12), LATEST) == (date(2024, 12, 1), date(2024, 12, 31))
+
+
+class _Translator:
+    def __init__(self):
+        self.questions = []
+
+    def chat(self, model, messages, options=None, format=None):
+        question = messages[-1]["content"]
+        self.questions.append(question)
+        merchant = "lyft" if "lyft" in question.lower() else "uber"
+        return {"message": {"content": json.dumps({"merchants": [merchant], "month": 3})}}
+
+
+def test_similar_questions_reuse_the_cached_translation(app_config, monkeypatch):
+    app_config()
+    translator = _Translator()
+    monkeypatch.setattr(nl_query, "get_llm", lambda: translator)
+    monkeypatch.setattr(nl_query, "_caches", {})
+
+    first = nl_query.translate_question("How much did I spend on Uber in March?")
+    reworded = nl_query.translate_question("how much did I spend on the Uber in March")
+    typo = nl_query.translate_question("How much did I spend on Ubr in March?")
+    other = nl_query.translate_question("How much did I spend on Lyft in March?")
+
+    assert [t.source for t in (first, reworded, typo, other)] == ["model", "cache", "similar", "model"]
+    assert typo.spec == first.spec
+    assert other.spec.merchants == ["lyft"]
+    assert len(translator.questions) == 2
+    # Persisted: a fresh process reads the same translations
+    monkeypatch.setattr(nl_query, "_caches", {})
+    assert nl_query.translate_question("how much did i spend on uber in march").source == "cache"
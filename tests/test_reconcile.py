@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from finance_health.analytics.reconcile import reconcile_balances
+from finance_health.parsing.normalizers.base_normalizer import BaseNormalizer
+
+# Same-day rows whose balances only add up in statement order (or its reverse)
+STATEMENT = [
+    ("2025-01-02", "Opening deposit", 1000.0, 1000.0),
+    ("2025-01-03", "Salary ACME", 2000.0, 3000.0),
+    ("2025-01-03", "Coffee Shop", -5.0, 2995.0),
+    ("2025-01-03", "Rent January", -1200.0, 1795.0),
+    ("2025-01-03", "Grocery Store", -60.0, 1735.0),
+    ("2025-01-04", "Electric bill", -80.0, 1655.0),
+]
+
+
+def _normalized(rows) -> pl.DataFrame:
+    raw = pl.DataFrame({
+        "date": [r[0] for r in rows],
+        "description": [r[1] for r in rows],
+        "amount": [r[2] for r in rows],
+        "balance": [r[3] for r in rows],
+        "account": ["Checking"] * len(rows),
+    })
+    return BaseNormalizer().normalize(raw, Path("checking.csv"), "s1")
+
+
+def test_normalizer_keeps_statement_order(app_config):
+    app_config()
+    df = _normalized(STATEMENT)
+
+    assert df["source_row"].to_list() == list(range(len(STATEMENT)))
+    assert df["description"].to_list() == [r[1] for r in STATEMENT]
+
+
+def test_same_day_rows_reconcile_in_source_order_whatever_the_row_order(app_config):
+    app_config()
+    shuffled = _normalized(STATEMENT).sample(fraction=1.0, shuffle=True, seed=7)
+
+    result = reconcile_balances(shuffled)
+
+    assert result.confidence == 1.0
+    assert result.issues.is_empty()
+
+
+@pytest.mark.parametrize(
+    ("rows", "kind", "discrepancy"),
+    [
+        # The grocery row is missing: the balance moved by 60 more than the rows
+        ([r for r in STATEMENT if r[1] != "Grocery Store"], "gap", -60.0),
+        # Rent was read as a credit
+        ([(d, s, -a if s == "Rent January" else a, b) for d, s, a, b in STATEMENT], "sign_error", -2400.0),
+    ],
+)
+def test_breaks_are_classified(app_config, rows, kind, discrepancy):
+    app_config()
+
+    result = reconcile_balances(_normalized(rows))
+
+    assert result.issues["kind"].to_list() == [kind]
+    assert result.issues["discrepancy"].to_list() == [pytest.approx(discrepancy)]
+    assert result.confidence < 1.0
+
+
+def test_issue_count_is_not_capped_by_the_issue_limit(app_config):
+    app_config()
+    rows = [(d, s, -a, b) if d == "2025-01-03" else (d, s, a, b) for d, s, a, b in STATEMENT]
+
+    report = reconcile_balances(_normalized(rows)).to_dict(issue_limit=1)
+
+    assert len(report["issues"]) == 1
+    assert report["issue_count"] > 1
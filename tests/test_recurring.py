@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import polars as pl
+import pytest
+
+from finance_health.analytics.recurring import RECURRING_COLUMNS, detect_recurring
+
+
+def _charges(merchant: str, start: date, step_days: int, amounts: list) -> pl.DataFrame:
+    return pl.DataFrame({
+        "date": [start + timedelta(days=step_days * i) for i in range(len(amounts))],
+        "merchant": [merchant] * len(amounts),
+        "amount": [-a for a in amounts],
+    })
+
+
+def test_detects_cadence_drift_and_next_charge():
+    df = pl.concat([
+        _charges("Netflix", date(2024, 1, 15), 30, [15.49] * 5 + [17.99]),  # one price increase
+        _charges("Gym", date(2024, 3, 1), 7, [12.0] * 10),
+        # Irregular spending at one merchant is not recurring
+        pl.DataFrame({
+            "date": [date(2024, 1, 2), date(2024, 1, 3), date(2024, 2, 20), date(2024, 4, 1)],
+            "merchant": ["Grocery Store"] * 4,
+            "amount": [-80.0, -12.0, -140.0, -55.0],
+        }),
+    ])
+
+    recurring = detect_recurring(df)
+
+    assert recurring.columns == RECURRING_COLUMNS
+    by_merchant = {row["merchant"]: row for row in recurring.iter_rows(named=True)}
+    assert set(by_merchant) == {"Netflix", "Gym"}
+    netflix = by_merchant["Netflix"]
+    assert (netflix["cadence"], netflix["charges"], netflix["last_amount"]) == ("monthly", 6, 17.99)
+    assert netflix["amount_drift"] == pytest.approx(17.99 / 15.49 - 1, abs=1e-4)
+    assert netflix["next_date"] == netflix["last_date"] + timedelta(days=30)
+    gym = by_merchant["Gym"]
+    assert gym["cadence"] == "weekly"
+    assert gym["monthly_cost"] == pytest.approx(12.0 * 30.44 / 7, abs=0.01)
+
+
+def test_a_series_that_stopped_is_inactive():
+    df = pl.concat([
+        _charges("Old Streaming", date(2024, 1, 10), 30, [9.99] * 4),
+        # The data runs on for months after the last charge
+        _charges("Phone", date(2024, 1, 5), 30, [40.0] * 10),
+    ])
+
+    recurring = detect_recurring(df)
+
+    active = dict(zip(recurring["merchant"], recurring["active"]))
+    assert active == {"Phone": True, "Old Streaming": False}
+    # Active series first
+    assert recurring["merchant"].to_list() == ["Phone", "Old Streaming"]
+
+
+def test_too_few_charges_or_no_merchant_column():
+    assert detect_recurring(_charges("Netflix", date(2024, 1, 15), 30, [15.49, 15.49])).is_empty()
+    assert detect_recurring(pl.DataFrame({"date": [date(2024, 1, 1)], "amount": [-5.0]})).is_empty()
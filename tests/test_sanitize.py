@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pytest
+
+from finance_health.advice.sanitize import StreamSanitizer, sanitize_output
+
+SAMPLES = [
+    "Keep fees <10 a month.\n<think>secret plan</think>\nDone",
+    "<think>plan\nstuff</think>\n\n## At a glance\n- a < b and x<y\n\n\n\n- <b>bold</b> ok\n\n",
+    "  \n<THINK>x</Think>Hello <br/> world\n\n\n\nBye\n\n  ",
+    "## Key\n- 5 < 6 <= 7 > 2\n<div class='x'>t</div>\n",
+    "<think>closed</think>ok<",
+    "a <3 b </ y <b<think>x</think>>",
+    "## Hi\n<think>cut off mid thought",
+]
+
+
+def _streamed(chunks: list[str]) -> str:
+    sanitizer = StreamSanitizer()
+    return "".join(sanitizer.feed(chunk) for chunk in chunks) + sanitizer.finish()
+
+
+def test_sanitize_output_keeps_prose_angle_brackets():
+    assert sanitize_output(SAMPLES[0]) == "Keep fees <10 a month.\n\nDone"
+    assert sanitize_output(SAMPLES[-1]) == "## Hi"
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_stream_matches_batch_at_every_split(text):
+    expected = sanitize_output(text)
+    for cut in range(len(text) + 1):
+        assert _streamed([text[:cut], text[cut:]]) == expected, cut
+    assert _streamed(list(text)) == expected
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import numpy as np
+
+from finance_health.parsing.ingest import Ingestor
+from finance_health.storage.loader import session_paths
+from finance_health.storage.search_index import HASH_DIM, hash_vectors, load_meta, search
+
+
+def test_hash_vectors_are_unit_norm_dimension_major_and_deterministic():
+    texts = ["uber trip", "uber trp", "whole foods market", ""]
+
+    v = hash_vectors(texts)
+
+    assert v.shape == (HASH_DIM, len(texts))
+    assert v.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(v[:, :3], axis=0), 1.0, rtol=1e-5)
+    assert not v[:, 3].any()  # empty text: zero vector
+    np.testing.assert_array_equal(v, hash_vectors(texts))
+    sims = v.T @ v
+    # A typo stays close; unrelated text does not
+    assert sims[0, 1] > 0.5 > sims[0, 2]
+
+
+def test_search_finds_rows_added_by_update_index(app_config, write_statement):
+    app_config()
+    ingestor = Ingestor()
+    ingestor.ingest_files([write_statement("jan.csv", [
+        ("2025-01-03", "Blue Bottle Coffee", -4.5, "USD", "Checking"),
+        ("2025-01-05", "Whole Foods Market", -80.0, "USD", "Checking"),
+    ])])
+    ingestor.append_files([write_statement("feb.csv", [
+        ("2025-02-02", "Netflix subscription", -15.99, "USD", "Checking"),
+        ("2025-02-04", "Blue Bottle Coffee", -5.0, "USD", "Checking"),
+    ])])
+    session = session_paths(ingestor.session_id)
+
+    meta = load_meta(session)
+    assert meta is not None and len(meta.segments) == 2
+    assert meta.segments[1] == 1  # only the new text is vectorized again
+
+    hits = search(session, "netflx", k=5)
+    assert hits["amount"][0] == -15.99
+    # Both coffee rows share one text: the newest first
+    assert search(session, "coffee", k=5)["amount"][:2].to_list() == [-5.0, -4.5]
+    assert search(session, "qqqzzzxx", k=5).is_empty()
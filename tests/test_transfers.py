@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import date
+
+import polars as pl
+import pytest
+
+from finance_health.analytics.metrics import compute_kpis
+from finance_health.analytics.recurring import detect_recurring
+from finance_health.analytics.transfers import tag_transfers
+from finance_health.parsing.ingest import Ingestor
+from finance_health.storage.loader import scan_session
+
+
+def test_pairs_opposite_legs_across_accounts():
+    df = pl.DataFrame({
+        "date": [date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 5), date(2024, 1, 5), date(2024, 1, 9)],
+        "amount": [-500.0, 500.0, -40.0, 40.0, -25.0],
+        "account_name": ["Checking", "Savings", "Card", "Card", "Checking"],
+        "category": [None, "income", "dining", "other", "transfer"],
+    })
+
+    tagged = tag_transfers(df)
+
+    # Same-account refunds are not transfers; a row only categorized 'transfer' is not matched
+    assert tagged["is_transfer"].to_list() == [True, True, False, False, False]
+    assert tagged["category"].to_list()[:2] == ["transfer", "transfer"]
+    kpis = compute_kpis(tagged)
+    assert kpis.total_income == pytest.approx(40.0)
+    assert kpis.total_expense == pytest.approx(65.0)
+
+
+def test_a_nearer_refund_on_the_same_account_does_not_hide_the_transfer():
+    df = pl.DataFrame({
+        "date": [date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 3)],
+        "amount": [-100.0, 100.0, 100.0],
+        "account_name": ["Checking", "Checking", "Savings"],
+    })
+
+    assert tag_transfers(df)["is_transfer"].to_list() == [True, False, True]
+
+
+def test_legs_further_apart_than_the_tolerance_are_not_paired():
+    df = pl.DataFrame({
+        "date": [date(2024, 1, 1), date(2024, 1, 10)],
+        "amount": [-500.0, 500.0],
+        "account_name": ["Checking", "Savings"],
+    })
+
+    assert tag_transfers(df)["is_transfer"].to_list() == [False, False]
+
+
+def test_recurring_transfers_are_not_recurring_charges():
+    months = [date(2024, m, 3) for m in range(1, 6)]
+    df = pl.DataFrame({
+        "date": months * 3,
+        "merchant": ["Savings"] * 5 + ["Savings"] * 5 + ["Netflix"] * 5,
+        "amount": [-500.0] * 5 + [500.0] * 5 + [-15.0] * 5,
+        # The Netflix charges were in another currency
+        "amount_base": [None] * 10 + [-13.5] * 5,
+        "account_name": ["Checking"] * 5 + ["Savings"] * 5 + ["Card"] * 5,
+    })
+
+    recurring = detect_recurring(tag_transfers(df))
+
+    assert recurring["merchant"].to_list() == ["Netflix"]
+    assert recurring["last_amount"].to_list() == [pytest.approx(13.5)]
+
+
+def test_append_pairs_a_new_leg_with_a_stored_leg_in_the_previous_month(app_config, write_statement):
+    app_config()
+    first = write_statement("checking.csv", [
+        ("2025-01-15", "Salary ACME Corp", 3000, "USD", "Checking"),
+        ("2025-01-30", "Transfer to savings", -500, "USD", "Checking"),
+    ])
+    second = write_statement("savings.csv", [
+        ("2025-02-01", "Transfer from checking", 500, "USD", "Savings"),
+        ("2025-02-03", "Grocery Store", -60, "USD", "Savings"),
+    ])
+    ingestor = Ingestor()
+    ingestor.ingest_files([first])
+    ingestor.append_files([second])
+
+    rows = scan_session(ingestor.session_id).collect().sort("date")
+
+    assert rows.filter(pl.col("is_transfer"))["amount"].to_list() == [-500.0, 500.0]
+    kpis = compute_kpis(rows)
+    assert kpis.total_income == pytest.approx(3000.0)
+    assert kpis.total_expense == pytest.approx(60.0)
+
+
+def test_recategorizing_one_leg_clears_both(app_config, write_statement):
+    app_config()
+    statement = write_statement("accounts.csv", [
+        ("2025-01-30", "Landlord Payment", -900, "USD", "Checking"),
+        ("2025-02-01", "Incoming Deposit", 900, "USD", "Savings"),
+    ])
+    ingestor = Ingestor()
+    ingestor.ingest_files([statement])
+    rows = scan_session(ingestor.session_id).collect().sort("date")
+    assert rows["is_transfer"].to_list() == [True, True]
+
+    ingestor.recategorize(rows["merchant"].cast(pl.String)[0], "rent_mortgage")
+
+    rows = scan_session(ingestor.session_id).collect().sort("date")
+    assert rows["is_transfer"].to_list() == [False, False]
+    assert rows["category"].cast(pl.String).to_list() == ["rent_mortgage", "transfer"]
+    kpis = compute_kpis(rows)
+    assert (kpis.total_income, kpis.total_expense) == (pytest.approx(900.0), pytest.approx(900.0))